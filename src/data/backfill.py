@@ -8,3 +8,30 @@ Historical data backfill and cache module
 - 数据预处理和清洗
 - 支持多时间周期数据
 """
+
+from __future__ import annotations
+from pathlib import Path
+from typing import Dict, Union
+import numpy as np
+
+
+def load_cache(path: Union[str, Path]) -> Dict[str, np.ndarray]:
+    """
+    读取本地历史数据缓存为按列的数组字典
+
+    支持 .npz（列名即数组名）与带表头的 .csv；
+    哨兵预热需要的列：px_a, px_b, vol_a, next_rate_a, ts（秒）。
+    """
+    path = Path(path)
+    if path.suffix == ".npz":
+        with np.load(path, allow_pickle=False) as z:
+            return {k: z[k] for k in z.files}
+    if path.suffix == ".csv":
+        table = np.genfromtxt(path, delimiter=",", names=True, dtype=float)
+        return {name: np.atleast_1d(table[name]) for name in table.dtype.names}
+    raise ValueError(f"unsupported cache format: {path.suffix}")
+
+
+def save_cache(path: Union[str, Path], columns: Dict[str, np.ndarray]) -> None:
+    """把按列的数组字典写为 .npz 缓存"""
+    np.savez(Path(path), **{k: np.asarray(v) for k, v in columns.items()})
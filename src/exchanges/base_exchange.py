@@ -30,6 +30,8 @@ class OrderParams:
     # 下面两个给“编排器/风控”参考：交易所不一定直接使用
     max_slippage_bp: Optional[float] = None
     timeout_ms: int = 1500
+    # 对冲腿等需优先发出的订单（交易所适配层可据此在限流时优先放行）
+    urgent: bool = False
 
 # ---- 统一返回结构 ----
 class OrderAck(TypedDict, total=False):
@@ -36,6 +36,10 @@ from ..base_exchange import (
     OrderParams, OrderAck, Position, Balance, FundingInfo, Ticker, Orderbook, Fill, SymbolInfo,
     ExchangeError, RetryableError, NonRetryableError,
 )
+from .instruments import InstrumentRegistry, PAGE_LIMIT
+from .tickers import TickerCache
+from .ws import PublicStream, PrivateStream
+from .ratelimit import RateLimiter, PRIO_CRITICAL, PRIO_ORDER, PRIO_QUERY
 
 # ============ 符号映射 ===============
 
@@ -60,15 +64,136 @@ load_dotenv(dotenv_path=dotenv_path, override=False, verbose=True)
 class BybitConfig:
     """Bybit 交易所配置"""
     # API 凭证
-    api_key: os.getenv("BYBIT_API_KEY")
-    api_secret: os.getenv("BYBIT_API_SECRET")
-    testnet_url: str = os.getenv("BYBIT_TESTNET_URL")
-    mainnet_url: str = os.getenv("BYBIT_MAINNET_URL")
+    api_key: Optional[str] = os.getenv("BYBIT_API_KEY")
+    api_secret: Optional[str] = os.getenv("BYBIT_API_SECRET")
+    testnet_url: str = os.getenv("BYBIT_TESTNET_URL", "https://api-testnet.bybit.com")
+    mainnet_url: str = os.getenv("BYBIT_MAINNET_URL", "https://api.bybit.com")
 
     # 网络配置
     testnet: bool = False  # True 则使用测试网
-    base_url: str = testnet_url if testnet else mainnet_url
-    
+    base_url: str = ""     # 为空时按 testnet 选择
+    recv_window_ms: int = 5000
+    timeout_sec: float = 10.0
+    max_retries: int = 2
+    retry_backoff_sec: float = 0.5
+    user_agent: str = "xperp-lab/bybit"
+
+    # 合约元数据缓存（后台按 TTL 刷新，落盘加速重启；路径为空则落在用户缓存目录）
+    # autoload 为 False 时构造不发请求，需显式调用 BybitExchange.start_instruments()
+    instruments_ttl_sec: float = 3600.0
+    instruments_cache: Optional[str] = os.getenv("BYBIT_INSTRUMENTS_CACHE")
+    instruments_autoload: bool = False
+
+    # 行情快照：get_ticker / get_funding_info 允许的陈旧度（秒）
+    ticker_max_age_sec: float = 1.0
+
+    # WebSocket：盘口订阅档数（1/50/200/500）、单次连接最大尝试次数（0 为无限）
+    ws_depth: int = 50
+    ws_retries: int = 10
+
+    # 客户端限流：未收到响应头前每接口每秒上限、IP 级上限（每 5 秒）、查询不可动用的 IP 额度比例
+    rate_limit_default: int = 10
+    rate_limit_ip: int = 600
+    rate_limit_reserve: float = 0.2
+    rate_limit_max_wait_sec: float = 5.0
+
+    def __post_init__(self):
+        if not self.base_url:
+            self.base_url = self.testnet_url if self.testnet else self.mainnet_url
+        if self.instruments_cache is None:
+            name = "instruments_linear_testnet.json" if self.testnet else "instruments_linear.json"
+            self.instruments_cache = str(_user_cache_dir() / name)
+
+
+def _user_cache_dir() -> Path:
+    """用户缓存目录：$XDG_CACHE_HOME（缺省 ~/.cache）/xperp-lab/bybit"""
+    base = os.getenv("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(base) / "xperp-lab" / "bybit"
+
+
+def _parse_symbol_info(info: Dict[str, Any]) -> SymbolInfo:
+    """instruments-info 原始条目 -> SymbolInfo（symbol 映射为内部标准符号）"""
+    lot_size = info.get("lotSizeFilter", {})
+    price_filter = info.get("priceFilter", {})
+    leverage_filter = info.get("leverageFilter", {})
+    
+    return SymbolInfo(
+        symbol=REVERSE_ALIASES.get(info.get("symbol", ""), info.get("symbol", "")),
+        price_tick_size=float(price_filter.get("tickSize", 0.5)),
+        qty_step_size=float(lot_size.get("qtyStep", 0.001)),
+        min_qty=float(lot_size.get("minOrderQty", 0.001)),
+        min_notional=float(lot_size.get("minNotionalValue", 5)) if lot_size.get("minNotionalValue") else None,
+        max_leverage=float(leverage_filter.get("maxLeverage", 50)) if leverage_filter.get("maxLeverage") else None,
+        margin_tiers=None,  # Bybit 需要单独接口获取
+        raw=info
+    )
+
+# Bybit 订单状态 -> 统一状态
+ORDER_STATUS = {
+    "New": "new",
+    "PartiallyFilled": "partial",
+    "Filled": "filled",
+    "Cancelled": "canceled",
+    "Rejected": "rejected",
+}
+
+
+def _parse_order(order: Dict[str, Any]) -> OrderAck:
+    """订单原始条目（REST /v5/order/realtime 或 WS order 主题）-> OrderAck"""
+    return OrderAck(
+        ok=True,
+        order_id=order.get("orderId"),
+        client_order_id=order.get("orderLinkId"),
+        status=ORDER_STATUS.get(order.get("orderStatus", ""), "unknown"),
+        filled_qty=float(order.get("cumExecQty", 0)),
+        avg_fill_price=float(order.get("avgPrice", 0)) if order.get("avgPrice") and float(order.get("avgPrice", 0)) > 0 else None,
+        raw=order
+    )
+
+
+def _parse_fill(trade: Dict[str, Any]) -> Fill:
+    """成交原始条目（REST /v5/execution/list 或 WS execution 主题）-> Fill"""
+    return Fill(
+        symbol=REVERSE_ALIASES.get(trade.get("symbol", ""), trade.get("symbol", "")),
+        order_id=trade.get("orderId"),
+        trade_id=trade.get("execId"),
+        side=trade.get("side", "").lower(),
+        price=float(trade.get("execPrice", 0)),
+        qty=float(trade.get("execQty", 0)),
+        fee=float(trade.get("execFee", 0)) if trade.get("execFee") else None,
+        liquidity="maker" if trade.get("isMaker") else "taker",
+        ts=int(trade.get("execTime") or time.time() * 1000),
+        raw=trade
+    )
+
+
+def _parse_position(p: Dict[str, Any]) -> Position:
+    """持仓原始条目（REST 为 avgPrice，WS 为 entryPrice）-> Position"""
+    side_map = {"Buy": "long", "Sell": "short"}
+    liq = p.get("liqPrice")
+    return Position(
+        symbol=REVERSE_ALIASES.get(p.get("symbol", ""), p.get("symbol", "")),
+        side=side_map.get(p.get("side", ""), None),
+        size=float(p.get("size", 0)),
+        entry_price=float(p.get("avgPrice") or p.get("entryPrice") or 0),
+        leverage=float(p.get("leverage") or 1),
+        unrealized_pnl=float(p.get("unrealisedPnl") or 0),
+        liquidation_px=float(liq) if liq and float(liq) > 0 else None,
+        margin_mode=str(p.get("tradeMode", "")).lower(),  # 0=cross, 1=isolated
+        raw=p
+    )
+
+
+def _parse_balance(coin: Dict[str, Any]) -> Balance:
+    """钱包中单个币种条目 -> Balance"""
+    return Balance(
+        asset=coin.get("coin", "USDT"),
+        balance=float(coin.get("walletBalance") or 0),
+        available=float(coin.get("availableToWithdraw") or 0),
+        margin=float(coin.get("totalPositionIM", 0)) if coin.get("totalPositionIM") else None,
+        raw=coin
+    )
+
 # ================== 实现类 ==================
 
 class BybitExchange(BaseExchange):
@@ -98,8 +223,37 @@ class BybitExchange(BaseExchange):
         self._lock = threading.Lock()
         self._clock_skew_ms = 0
         
+        # 按接口分组的令牌桶，由 X-Bapi-Limit* 响应头校准
+        self._limiter = RateLimiter(
+            default_limit=self.cfg.rate_limit_default,
+            ip_limit=self.cfg.rate_limit_ip,
+            reserve_frac=self.cfg.rate_limit_reserve,
+            max_wait_sec=self.cfg.rate_limit_max_wait_sec,
+        )
+        
         # 交易所↔内部符号映射
         self._symbol_map = SYMBOL_ALIASES
+        
+        # 合约元数据注册表：下单校验只查内存
+        self._instruments = InstrumentRegistry(
+            self._fetch_instruments_page,
+            _parse_symbol_info,
+            ttl_sec=self.cfg.instruments_ttl_sec,
+            path=self.cfg.instruments_cache,
+        )
+        if self.cfg.instruments_autoload:
+            self._instruments.start()
+        
+        # 全市场行情快照：get_ticker / get_funding_info 共用一次无 symbol 的 tickers 请求
+        self._tickers = TickerCache(
+            self._fetch_all_tickers,
+            max_age_sec=self.cfg.ticker_max_age_sec,
+            timeout_sec=self.cfg.timeout_sec * (self.cfg.max_retries + 1),
+        )
+        
+        # WebSocket 公共/私有频道（ws_sub_public / ws_sub_private 建立）
+        self._ws_public: List[PublicStream] = []
+        self._ws_private: Optional[PrivateStream] = None
     
     # ----------------- 私有工具方法 -----------------
     
@@ -134,7 +288,9 @@ class BybitExchange(BaseExchange):
         endpoint: str,
         *,
         params: Optional[Dict[str, Any]] = None,
-        auth: bool = True
+        auth: bool = True,
+        priority: Optional[int] = None,
+        full: bool = False
     ) -> Any:
         """
         发送 HTTP 请求到 Bybit API
@@ -144,10 +300,14 @@ class BybitExchange(BaseExchange):
             endpoint: API 端点路径
             params: 请求参数
             auth: 是否需要签名认证
+            priority: 限流优先级（PRIO_*）；缺省 POST 为下单级、GET 为查询级，撤单由调用方显式传 PRIO_CRITICAL
+            full: 返回完整响应体（含顶层 time 等字段）
         
         Returns:
-            API 响应的 result 部分
+            API 响应的 result 部分（full=True 时为完整响应体）
         """
+        if priority is None:
+            priority = PRIO_ORDER if method.upper() == "POST" else PRIO_QUERY
         url = self.cfg.base_url.rstrip("/") + endpoint
         params = params or {}
         
@@ -159,32 +319,36 @@ class BybitExchange(BaseExchange):
             "User-Agent": self.cfg.user_agent,
         }
         
-        # 添加签名
+        # 签名原文中的参数部分（与时间戳无关，只算一次）
         if auth:
-            timestamp = self._ts_ms()
-            
             if method.upper() == "GET":
                 param_str = urlencode(sorted(params.items()))
             else:
                 import json
                 param_str = json.dumps(params) if params else ""
-            
-            signature = self._sign(timestamp, param_str)
-            
-            headers.update({
-                "X-BAPI-API-KEY": self.cfg.api_key,
-                "X-BAPI-SIGN": signature,
-                "X-BAPI-TIMESTAMP": str(timestamp),
-                "X-BAPI-RECV-WINDOW": str(self.cfg.recv_window_ms),
-            })
         
         # 重试逻辑
         for attempt in range(self.cfg.max_retries + 1):
+            # 先取令牌：额度不足时在本线程等待，而不是发出后被限流拒绝
+            if not self._limiter.acquire(endpoint, priority):
+                raise RetryableError(f"Rate limit budget exhausted for {endpoint}")
+            
+            # 添加签名（每次尝试重新取时间戳，避免限流等待后超出 recv_window）
+            if auth:
+                timestamp = self._ts_ms()
+                signature = self._sign(timestamp, param_str)
+                headers.update({
+                    "X-BAPI-API-KEY": self.cfg.api_key,
+                    "X-BAPI-SIGN": signature,
+                    "X-BAPI-TIMESTAMP": str(timestamp),
+                    "X-BAPI-RECV-WINDOW": str(self.cfg.recv_window_ms),
+                })
             try:
                 if method.upper() == "GET":
                     r = self._http.get(url, params=params, headers=headers, timeout=self.cfg.timeout_sec)
                 else:
                     r = self._http.post(url, json=params, headers=headers, timeout=self.cfg.timeout_sec)
+                self._limiter.update(endpoint, r.headers, skew_ms=self._clock_skew_ms)
                 
                 # 解析响应
                 data = r.json()
@@ -192,11 +356,16 @@ class BybitExchange(BaseExchange):
                 
                 # Bybit 返回码: 0 = 成功
                 if ret_code == 0:
-                    return data.get("result", {})
+                    return data if full else data.get("result", {})
                 
                 # 错误处理
                 ret_msg = data.get("retMsg", "Unknown error")
                 
+                # 限流拒绝（10006）：令牌桶已按响应头的重置时间校准，下一轮 acquire 自会等待，不再额外退避
+                if ret_code == 10006 and attempt < self.cfg.max_retries:
+                    self._log.warning(f"Rate limited: {ret_msg} (attempt {attempt+1}/{self.cfg.max_retries})")
+                    continue
+                
                 # 可重试错误（如限流、超时等）
                 if ret_code in [10006, 10016, 10018]:  # 限流相关
                     raise RetryableError(f"Bybit error {ret_code}: {ret_msg}")
@@ -221,31 +390,38 @@ class BybitExchange(BaseExchange):
     
     # ----------------- 行情 / 资金费 -----------------
     
-    def get_ticker(self, symbol: str) -> Ticker:
-        """获取行情 Ticker"""
-        ex_symbol = self._map_symbol_out(symbol)
+    def _fetch_all_tickers(self) -> Dict[str, Any]:
+        """拉取全部 linear 合约行情（不带 symbol，一次请求）；time 为交易所响应时间（毫秒）"""
         data = self._request("GET", "/v5/market/tickers", params={
             "category": "linear",
-            "symbol": ex_symbol
-        }, auth=False)
-        
-        if not data or "list" not in data or len(data["list"]) == 0:
+        }, auth=False, full=True)
+        result = data.get("result") or {}
+        result["time"] = data.get("time")
+        return result
+    
+    def get_ticker(self, symbol: str, max_age_sec: Optional[float] = None) -> Ticker:
+        """获取行情 Ticker（来自行情快照，max_age_sec 缺省用 cfg.ticker_max_age_sec）"""
+        rec = self._tickers.get(self._map_symbol_out(symbol), max_age_sec)
+        if rec is None:
             raise NonRetryableError(f"No ticker data for {symbol}")
         
-        ticker = data["list"][0]
-        
         return Ticker(
             symbol=symbol,
-            last=float(ticker.get("lastPrice", 0)),
-            mark=float(ticker.get("markPrice", 0)) if ticker.get("markPrice") else None,
-            index=float(ticker.get("indexPrice", 0)) if ticker.get("indexPrice") else None,
-            ts=int(ticker.get("time", self._ts_ms())),
-            raw=ticker
+            last=rec.last,
+            mark=rec.mark,
+            index=rec.index,
+            ts=rec.ts,
+            raw=rec.raw
         )
     
     def get_orderbook(self, symbol: str, depth: int = 50) -> Orderbook:
-        """获取订单簿"""
+        """获取订单簿（已通过 ws_sub_public 订阅且连接正常时直接读本地盘口）"""
         ex_symbol = self._map_symbol_out(symbol)
+        for stream in self._ws_public:
+            book = stream.books.get(ex_symbol)
+            if book is not None and depth <= stream.depth and stream.connected:
+                bids, asks = book.levels(depth)
+                return Orderbook(symbol=symbol, bids=bids, asks=asks, ts=book.ts, raw=None)
         
         # Bybit 支持的深度: 1, 25, 50, 100, 200, 500
         valid_depths = [1, 25, 50, 100, 200, 500]
@@ -268,52 +444,47 @@ class BybitExchange(BaseExchange):
             raw=data
         )
     
-    def get_funding_info(self, symbol: str) -> FundingInfo:
-        """获取资金费率信息"""
-        ex_symbol = self._map_symbol_out(symbol)
-        data = self._request("GET", "/v5/market/tickers", params={
-            "category": "linear",
-            "symbol": ex_symbol
-        }, auth=False)
-        
-        if not data or "list" not in data or len(data["list"]) == 0:
+    def get_funding_info(self, symbol: str, max_age_sec: Optional[float] = None) -> FundingInfo:
+        """获取资金费率信息（与 get_ticker 共用行情快照）"""
+        rec = self._tickers.get(self._map_symbol_out(symbol), max_age_sec)
+        if rec is None:
             raise NonRetryableError(f"No funding info for {symbol}")
         
-        info = data["list"][0]
-        
         return FundingInfo(
             symbol=symbol,
-            funding_rate=float(info.get("fundingRate", 0)),
-            next_funding_ts=int(info.get("nextFundingTime", 0)) if info.get("nextFundingTime") else None,
-            raw=info
+            funding_rate=rec.funding_rate,
+            next_funding_ts=rec.next_funding_ts,
+            raw=rec.raw
         )
     
+    def start_instruments(self) -> None:
+        """加载全部合约元数据（磁盘缓存优先）并启动后台按 TTL 刷新；重复调用无副作用"""
+        self._instruments.start()
+    
     def get_symbol_info(self, symbol: str) -> SymbolInfo:
-        """获取合约信息"""
+        """获取合约信息（优先查内存注册表，未知合约才单独请求并补入）"""
         ex_symbol = self._map_symbol_out(symbol)
-        data = self._request("GET", "/v5/market/instruments-info", params={
+        info = self._instruments.get(ex_symbol)
+        if info is None:
+            data = self._request("GET", "/v5/market/instruments-info", params={
+                "category": "linear",
+                "symbol": ex_symbol
+            }, auth=False)
+            
+            if not data or "list" not in data or len(data["list"]) == 0:
+                raise NonRetryableError(f"No symbol info for {symbol}")
+            
+            info = self._instruments.put(data["list"][0])
+        
+        return info
+    
+    def _fetch_instruments_page(self, cursor: Optional[str]) -> Dict[str, Any]:
+        """拉取一页 linear 合约信息（供注册表分页加载）"""
+        return self._request("GET", "/v5/market/instruments-info", params={
             "category": "linear",
-            "symbol": ex_symbol
+            "limit": PAGE_LIMIT,
+            "cursor": cursor,
         }, auth=False)
-        
-        if not data or "list" not in data or len(data["list"]) == 0:
-            raise NonRetryableError(f"No symbol info for {symbol}")
-        
-        info = data["list"][0]
-        lot_size = info.get("lotSizeFilter", {})
-        price_filter = info.get("priceFilter", {})
-        leverage_filter = info.get("leverageFilter", {})
-        
-        return SymbolInfo(
-            symbol=symbol,
-            price_tick_size=float(price_filter.get("tickSize", 0.5)),
-            qty_step_size=float(lot_size.get("qtyStep", 0.001)),
-            min_qty=float(lot_size.get("minOrderQty", 0.001)),
-            min_notional=float(lot_size.get("minNotionalValue", 5)) if lot_size.get("minNotionalValue") else None,
-            max_leverage=float(leverage_filter.get("maxLeverage", 50)) if leverage_filter.get("maxLeverage") else None,
-            margin_tiers=None,  # Bybit 需要单独接口获取
-            raw=info
-        )
     
     # ----------------- 账户 / 持仓 -----------------
     
@@ -327,13 +498,7 @@ class BybitExchange(BaseExchange):
         
         for account in data.get("list", []):
             for coin in account.get("coin", []):
-                out.append(Balance(
-                    asset=coin.get("coin", "USDT"),
-                    balance=float(coin.get("walletBalance", 0)),
-                    available=float(coin.get("availableToWithdraw", 0)),
-                    margin=float(coin.get("totalPositionIM", 0)) if coin.get("totalPositionIM") else None,
-                    raw=coin
-                ))
+                out.append(_parse_balance(coin))
         
         return out
     
@@ -349,23 +514,9 @@ class BybitExchange(BaseExchange):
         out: List[Position] = []
         
         for p in data.get("list", []):
-            size = float(p.get("size", 0))
-            if size == 0:  # 跳过无持仓
+            if float(p.get("size", 0)) == 0:  # 跳过无持仓
                 continue
-            
-            side_map = {"Buy": "long", "Sell": "short"}
-            
-            out.append(Position(
-                symbol=self._map_symbol_in(p.get("symbol", "")),
-                side=side_map.get(p.get("side", ""), None),
-                size=size,
-                entry_price=float(p.get("avgPrice", 0)),
-                leverage=float(p.get("leverage", 1)),
-                unrealized_pnl=float(p.get("unrealisedPnl", 0)),
-                liquidation_px=float(p.get("liqPrice", 0)) if p.get("liqPrice") and float(p.get("liqPrice", 0)) > 0 else None,
-                margin_mode=p.get("tradeMode", "").lower(),  # 0=cross, 1=isolated
-                raw=p
-            ))
+            out.append(_parse_position(p))
         
         return out
     
@@ -403,9 +554,8 @@ class BybitExchange(BaseExchange):
     
     def place_order(self, p: OrderParams) -> OrderAck:
         """下单"""
-        # 参数校验
-        info = self.get_symbol_info(p.symbol)
-        self.validate_order(p, info)
+        # 参数校验（合约信息来自内存注册表）
+        self.validate_order(p, self.get_symbol_info(p.symbol))
         
         ex_symbol = self._map_symbol_out(p.symbol)
         
@@ -433,9 +583,11 @@ class BybitExchange(BaseExchange):
         if p.client_order_id:
             payload["orderLinkId"] = p.client_order_id
         
-        # 发送请求
+        # 发送请求（对冲腿/平仓单在限流时优先）
+        priority = PRIO_CRITICAL if (p.urgent or p.reduce_only) else PRIO_ORDER
         try:
-            data = self._request("POST", "/v5/order/create", params=payload, auth=True)
+            data = self._request("POST", "/v5/order/create", params=payload, auth=True,
+                                 priority=priority)
             
             return OrderAck(
                 ok=True,
@@ -502,7 +654,8 @@ class BybitExchange(BaseExchange):
             payload["orderLinkId"] = client_order_id
         
         try:
-            data = self._request("POST", "/v5/order/cancel", params=payload, auth=True)
+            data = self._request("POST", "/v5/order/cancel", params=payload, auth=True,
+                                 priority=PRIO_CRITICAL)
             return OrderAck(
                 ok=True,
                 order_id=data.get("orderId", order_id),
@@ -541,26 +694,7 @@ class BybitExchange(BaseExchange):
             if not data or "list" not in data or len(data["list"]) == 0:
                 return OrderAck(ok=False, error="Order not found")
             
-            order = data["list"][0]
-            
-            # Bybit 订单状态映射
-            status_map = {
-                "New": "new",
-                "PartiallyFilled": "partial",
-                "Filled": "filled",
-                "Cancelled": "canceled",
-                "Rejected": "rejected",
-            }
-            
-            return OrderAck(
-                ok=True,
-                order_id=order.get("orderId"),
-                client_order_id=order.get("orderLinkId"),
-                status=status_map.get(order.get("orderStatus", ""), "unknown"),
-                filled_qty=float(order.get("cumExecQty", 0)),
-                avg_fill_price=float(order.get("avgPrice", 0)) if order.get("avgPrice") and float(order.get("avgPrice", 0)) > 0 else None,
-                raw=order
-            )
+            return _parse_order(data["list"][0])
         except Exception as e:
             return OrderAck(ok=False, error=str(e))
     
@@ -577,28 +711,7 @@ class BybitExchange(BaseExchange):
         try:
             data = self._request("GET", "/v5/order/realtime", params=params, auth=True)
             
-            out: List[OrderAck] = []
-            
-            status_map = {
-                "New": "new",
-                "PartiallyFilled": "partial",
-                "Filled": "filled",
-                "Cancelled": "canceled",
-                "Rejected": "rejected",
-            }
-            
-            for order in data.get("list", []):
-                out.append(OrderAck(
-                    ok=True,
-                    order_id=order.get("orderId"),
-                    client_order_id=order.get("orderLinkId"),
-                    status=status_map.get(order.get("orderStatus", ""), "unknown"),
-                    filled_qty=float(order.get("cumExecQty", 0)),
-                    avg_fill_price=float(order.get("avgPrice", 0)) if order.get("avgPrice") and float(order.get("avgPrice", 0)) > 0 else None,
-                    raw=order
-                ))
-            
-            return out
+            return [_parse_order(order) for order in data.get("list", [])]
         except Exception as e:
             self._log.error(f"get_open_orders error: {e}")
             return []
@@ -618,39 +731,42 @@ class BybitExchange(BaseExchange):
         try:
             data = self._request("GET", "/v5/execution/list", params=params, auth=True)
             
-            out: List[Fill] = []
-            
-            for trade in data.get("list", []):
-                out.append(Fill(
-                    symbol=self._map_symbol_in(trade.get("symbol", "")),
-                    order_id=trade.get("orderId"),
-                    trade_id=trade.get("execId"),
-                    side=trade.get("side", "").lower(),
-                    price=float(trade.get("execPrice", 0)),
-                    qty=float(trade.get("execQty", 0)),
-                    fee=float(trade.get("execFee", 0)) if trade.get("execFee") else None,
-                    liquidity="maker" if trade.get("isMaker") else "taker",
-                    ts=int(trade.get("execTime", self._ts_ms())),
-                    raw=trade
-                ))
-            
-            return out
+            return [_parse_fill(trade) for trade in data.get("list", [])]
         except Exception as e:
             self._log.error(f"get_fills error: {e}")
             return []
     
-    # ----------------- WebSocket（占位） -----------------
+    # ----------------- WebSocket -----------------
     
     def ws_sub_public(
         self,
         symbols: List[str],
         on_ticker: Optional[Callable[[Ticker], None]] = None,
         on_orderbook: Optional[Callable[[Orderbook], None]] = None,
+        on_trades: Optional[Callable[[dict], None]] = None,
+        on_liquidation: Optional[Callable[[dict], None]] = None,
     ) -> None:
-        """订阅公共 WebSocket"""
-        # TODO: 实现 Bybit WebSocket 公共频道订阅
-        # wss://stream.bybit.com/v5/public/linear
-        raise NotImplementedError("WS public not implemented yet")
+        """
+        订阅公共 WebSocket（orderbook / tickers，可选 publicTrade / allLiquidation）
+        
+        本地维护盘口与行情快照：之后 get_orderbook / get_ticker / get_funding_info 直接读内存。
+        回调在 WebSocket 线程中执行；on_trades / on_liquidation 收到原始推送，
+        可直接接 SentinelEngine.on_trades / on_liquidation，on_ticker 可接 observe_feed。
+        断线自动重连并重订。
+        """
+        stream = PublicStream(
+            [self._map_symbol_out(s) for s in symbols],
+            testnet=self.cfg.testnet,
+            depth=self.cfg.ws_depth,
+            tickers=self._tickers,
+            map_in=self._map_symbol_in,
+            on_ticker=on_ticker,
+            on_orderbook=on_orderbook,
+            on_trades=on_trades,
+            on_liquidation=on_liquidation,
+            retries=self.cfg.ws_retries,
+        )
+        self._ws_public.append(stream)
     
     def ws_sub_private(
         self,
@@ -659,10 +775,53 @@ class BybitExchange(BaseExchange):
         on_position: Optional[Callable[[Position], None]] = None,
         on_balance: Optional[Callable[[Balance], None]] = None,
     ) -> None:
-        """订阅私有 WebSocket"""
-        # TODO: 实现 Bybit WebSocket 私有频道订阅
-        # wss://stream.bybit.com/v5/private
-        raise NotImplementedError("WS private not implemented yet")
+        """
+        订阅私有 WebSocket（order / execution / position / wallet）
+        
+        成交按 execId 去重；断线重连后从最后一笔成交时间起用 REST 补齐成交，
+        再推送一次 REST 持仓与余额，稳态下无需轮询 get_fills / get_positions。
+        回调在 WebSocket 线程或补齐线程中执行。
+        """
+        def resync() -> None:
+            if on_position is not None:
+                for p in self.get_positions():
+                    on_position(p)
+            if on_balance is not None:
+                for b in self.get_balances():
+                    on_balance(b)
+        
+        def wallet(account: Dict[str, Any]) -> None:
+            for coin in account.get("coin", []):
+                on_balance(_parse_balance(coin))
+        
+        self._ws_private = PrivateStream(
+            api_key=self.cfg.api_key,
+            api_secret=self.cfg.api_secret,
+            testnet=self.cfg.testnet,
+            on_order=None if on_order is None else (lambda o: on_order(_parse_order(o))),
+            on_execution=None if on_fill is None else (lambda e: on_fill(_parse_fill(e))),
+            on_position=None if on_position is None else (lambda p: on_position(_parse_position(p))),
+            on_wallet=None if on_balance is None else wallet,
+            fetch_executions=self._fetch_executions,
+            on_resync=resync,
+            retries=self.cfg.ws_retries,
+        )
+    
+    def _fetch_executions(self, since_ms: int) -> List[Dict[str, Any]]:
+        """拉取 since_ms 起的全部 linear 成交（分页）"""
+        out: List[Dict[str, Any]] = []
+        cursor: Optional[str] = None
+        while True:
+            data = self._request("GET", "/v5/execution/list", params={
+                "category": "linear",
+                "startTime": since_ms,
+                "limit": 100,
+                "cursor": cursor,
+            }, auth=True) or {}
+            out.extend(data.get("list", []))
+            cursor = data.get("nextPageCursor") or None
+            if not cursor:
+                return out
     
     # ----------------- 可选扩展 -----------------
     
@@ -680,8 +839,7 @@ class BybitExchange(BaseExchange):
         # 构建批量订单
         request_list = []
         for p in orders:
-            info = self.get_symbol_info(p.symbol)
-            self.validate_order(p, info)
+            self.validate_order(p, self.get_symbol_info(p.symbol))
             
             ex_symbol = self._map_symbol_out(p.symbol)
             
@@ -711,7 +869,7 @@ class BybitExchange(BaseExchange):
             data = self._request("POST", "/v5/order/create-batch", params={
                 "category": "linear",
                 "request": request_list
-            }, auth=True)
+            }, auth=True, priority=PRIO_CRITICAL if any(p.urgent for p in orders) else PRIO_ORDER)
             
             results = []
             for item in data.get("result", {}).get("list", []):
@@ -741,7 +899,8 @@ class BybitExchange(BaseExchange):
             else:
                 params["settleCoin"] = "USDT"
             
-            self._request("POST", "/v5/order/cancel-all", params=params, auth=True)
+            self._request("POST", "/v5/order/cancel-all", params=params, auth=True,
+                          priority=PRIO_CRITICAL)
             return True
         except Exception as e:
             self._log.error(f"cancel_all error: {e}")
@@ -749,6 +908,13 @@ class BybitExchange(BaseExchange):
     
     def close(self) -> None:
         """关闭连接"""
+        self._instruments.stop()
+        for stream in self._ws_public:
+            stream.close()
+        self._ws_public.clear()
+        if self._ws_private is not None:
+            self._ws_private.close()
+            self._ws_private = None
         try:
             self._http.close()
         except Exception:
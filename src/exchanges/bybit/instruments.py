@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+"""
+instruments.py — Bybit 合约元数据注册表
+
+启动时分页拉取全部 linear 合约（/v5/market/instruments-info），常驻内存，
+后台按 TTL 刷新，并落盘 JSON 以便重启时秒级恢复。
+下单前的精度/最小量校验直接查内存，不走网络。
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+# 一页最多 1000 条（Bybit V5 instruments-info 上限）
+PAGE_LIMIT = 1000
+
+
+class InstrumentRegistry:
+    """
+    合约元数据注册表：Bybit 符号 -> 原始合约信息 + 解析后的 SymbolInfo
+
+    Args:
+        fetch_page: 拉取一页的函数，入参为 cursor（首页为 None），返回 API result（含 list/nextPageCursor）
+        parse: 原始合约信息 -> SymbolInfo
+        ttl_sec: 刷新周期（秒），同时作为磁盘缓存的新鲜度上限
+        path: 磁盘缓存文件（JSON），为空则不落盘
+    """
+
+    def __init__(
+        self,
+        fetch_page: Callable[[Optional[str]], Dict[str, Any]],
+        parse: Callable[[Dict[str, Any]], Any],
+        ttl_sec: float = 3600.0,
+        path: Optional[Union[str, Path]] = None,
+    ) -> None:
+        self._fetch_page = fetch_page
+        self._parse = parse
+        self.ttl_sec = float(ttl_sec)
+        self.path = Path(path) if path else None
+        self._log = logging.getLogger(self.__class__.__name__)
+        self._raw: Dict[str, Dict[str, Any]] = {}
+        self._info: Dict[str, Any] = {}
+        self.loaded_at = 0.0
+        self._refresh_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ----------------- 查询 -----------------
+
+    def get(self, symbol: str) -> Optional[Any]:
+        """按 Bybit 符号取 SymbolInfo，未知返回 None（纯内存查询）"""
+        return self._info.get(symbol)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self._info
+
+    def __len__(self) -> int:
+        return len(self._info)
+
+    @property
+    def age_sec(self) -> float:
+        """距上次成功加载的秒数"""
+        return time.time() - self.loaded_at if self.loaded_at else float("inf")
+
+    def put(self, raw: Dict[str, Any]) -> Any:
+        """写入单个合约（如按需补查的新上线合约），返回解析后的 SymbolInfo"""
+        info = self._parse(raw)
+        self._raw[raw["symbol"]] = raw
+        self._info[raw["symbol"]] = info
+        return info
+
+    # ----------------- 加载 / 刷新 -----------------
+
+    def _swap(self, items: List[Dict[str, Any]], loaded_at: float) -> None:
+        # 整表构建后一次性替换引用，读者无需加锁
+        raw = {it["symbol"]: it for it in items}
+        info = {sym: self._parse(it) for sym, it in raw.items()}
+        self._raw, self._info = raw, info
+        self.loaded_at = loaded_at
+
+    def refresh(self) -> int:
+        """分页拉取全部合约并替换内存表，成功后落盘；返回合约数"""
+        with self._refresh_lock:
+            items: List[Dict[str, Any]] = []
+            cursor: Optional[str] = None
+            while True:
+                data = self._fetch_page(cursor) or {}
+                items.extend(data.get("list", []))
+                cursor = data.get("nextPageCursor") or None
+                if not cursor:
+                    break
+            if not items:
+                raise RuntimeError("instruments-info returned no instruments")
+            self._swap(items, time.time())
+            self.save()
+            self._log.info(f"Loaded {len(items)} linear instruments")
+            return len(items)
+
+    def save(self) -> None:
+        """写入磁盘缓存（临时文件 + 原子替换）"""
+        if self.path is None:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"loaded_at": self.loaded_at, "list": list(self._raw.values())}, f)
+            os.replace(tmp, self.path)
+        except OSError as e:
+            self._log.warning(f"Failed to persist instruments cache {self.path}: {e}")
+
+    def load_disk(self) -> bool:
+        """从磁盘缓存恢复（不论新旧）；返回是否成功"""
+        if self.path is None or not self.path.exists():
+            return False
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+            self._swap(data["list"], float(data.get("loaded_at", 0.0)))
+            return bool(self._info)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            self._log.warning(f"Ignoring instruments cache {self.path}: {e}")
+            return False
+
+    def start(self) -> None:
+        """
+        启动：优先用磁盘缓存立即可用；无缓存时同步拉取一次。
+        之后由后台线程按 TTL 刷新（缓存已过期时立即刷新）。
+        """
+        if not self.load_disk():
+            try:
+                self.refresh()
+            except Exception as e:
+                self._log.error(f"Initial instruments load failed: {e}")
+        if self._thread is None and self.ttl_sec > 0:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="bybit-instruments", daemon=True)
+            self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            # 距到期的剩余时间；加载失败时 30 秒后重试
+            wait = self.ttl_sec - self.age_sec if self.loaded_at else 0.0
+            if wait > 0 and self._stop.wait(wait):
+                break
+            try:
+                self.refresh()
+            except Exception as e:
+                self._log.warning(f"Instruments refresh failed: {e}")
+                if self._stop.wait(min(30.0, self.ttl_sec)):
+                    break
+
+    def stop(self) -> None:
+        """停止后台刷新线程"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+ratelimit.py — Bybit REST 客户端限流
+
+按接口分组的令牌桶，由响应头驱动：
+- X-Bapi-Limit: 当前窗口内该接口的上限
+- X-Bapi-Limit-Status: 当前窗口剩余次数
+- X-Bapi-Limit-Reset-Timestamp: 窗口重置时间（毫秒）
+
+请求前先取令牌，不足时在调用线程上等到可用，而不是发出去再被 10006 拒绝。
+另有一个所有接口共享的 IP 级桶；查询类请求不能动用其最后 reserve_frac 的额度，
+且有更高优先级请求在等待时让行，保证撤单/对冲单优先发出。
+"""
+
+from __future__ import annotations
+
+import math
+import time
+import threading
+from typing import Dict, List, Mapping, Optional
+
+# 优先级：撤单/对冲单 > 普通下单/改单 > 查询
+PRIO_CRITICAL = 0
+PRIO_ORDER = 1
+PRIO_QUERY = 2
+
+# 共享 IP 级桶的分组名
+IP_GROUP = "__ip__"
+
+
+class _Bucket:
+    """单个分组的令牌桶；已知服务端窗口时以响应头为准"""
+    __slots__ = ("limit", "window", "tokens", "stamp", "reset_at")
+
+    def __init__(self, limit: float, window: float, now: float):
+        self.limit = float(limit)
+        self.window = float(window)
+        self.tokens = float(limit)
+        self.stamp = now
+        self.reset_at: Optional[float] = None
+
+    def refill(self, now: float) -> None:
+        if self.reset_at is not None:
+            # 服务端窗口：到重置时间恢复满额，之前不补充
+            if now >= self.reset_at:
+                self.tokens = self.limit
+                self.reset_at = None
+                self.stamp = now
+            return
+        if now > self.stamp:
+            self.tokens = min(self.limit, self.tokens + (now - self.stamp) * self.limit / self.window)
+            self.stamp = now
+
+    def wait_for(self, need: float, now: float) -> float:
+        """令牌达到 need 还需等待的秒数"""
+        if self.tokens >= need:
+            return 0.0
+        if self.reset_at is not None:
+            return max(0.0, self.reset_at - now)
+        return (need - self.tokens) * self.window / self.limit
+
+
+class RateLimiter:
+    """
+    分组令牌桶限流器（线程安全）
+
+    Args:
+        default_limit: 未收到响应头前每个分组的每窗口上限
+        window_sec: 分组窗口长度（Bybit 接口限频按秒计）
+        ip_limit / ip_window_sec: 所有接口共享的 IP 级上限（<=0 关闭）
+        reserve_frac: 查询类请求不可动用的 IP 级额度比例
+        max_wait_sec: 单次最长等待，超过返回 False
+    """
+
+    def __init__(self, default_limit: int = 10, window_sec: float = 1.0,
+                 ip_limit: int = 600, ip_window_sec: float = 5.0,
+                 reserve_frac: float = 0.2, max_wait_sec: float = 5.0) -> None:
+        self.default_limit = int(default_limit)
+        self.window_sec = float(window_sec)
+        self.reserve_frac = float(reserve_frac)
+        self.max_wait_sec = float(max_wait_sec)
+        self._cond = threading.Condition()
+        self._buckets: Dict[str, _Bucket] = {}
+        self._waiting: Dict[str, List[int]] = {}
+        self._ip: Optional[_Bucket] = None
+        if ip_limit > 0:
+            self._ip = _Bucket(ip_limit, ip_window_sec, time.monotonic())
+        self.waits = 0
+        self.waited_sec = 0.0
+
+    def _bucket(self, group: str, now: float) -> _Bucket:
+        b = self._buckets.get(group)
+        if b is None:
+            b = self._buckets[group] = _Bucket(self.default_limit, self.window_sec, now)
+            self._waiting[group] = [0, 0, 0]
+        return b
+
+    def _floor(self, bucket: _Bucket, priority: int) -> float:
+        """该优先级不可动用的额度"""
+        return math.ceil(bucket.limit * self.reserve_frac) if priority >= PRIO_QUERY else 0.0
+
+    def acquire(self, group: str, priority: int = PRIO_QUERY) -> bool:
+        """
+        为一次请求取令牌（分组桶 + IP 级桶），不足时阻塞等待
+
+        Returns:
+            bool: 是否在 max_wait_sec 内取到
+        """
+        start = time.monotonic()
+        deadline = start + self.max_wait_sec
+        waited = False
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                b = self._bucket(group, now)
+                b.refill(now)
+                waiting = self._waiting[group]
+                # 同组有更高优先级请求在等待时让行
+                wait = 0.0 if not any(waiting[:priority]) else self.window_sec
+                wait = max(wait, b.wait_for(1.0, now))
+                ip = self._ip
+                if ip is not None:
+                    ip.refill(now)
+                    wait = max(wait, ip.wait_for(1.0 + self._floor(ip, priority), now))
+                if wait <= 0.0:
+                    b.tokens -= 1.0
+                    if ip is not None:
+                        ip.tokens -= 1.0
+                    if any(waiting):
+                        # 唤醒让行中的低优先级请求重新判断
+                        self._cond.notify_all()
+                    if waited:
+                        self.waits += 1
+                        self.waited_sec += now - start
+                    return True
+                if now + wait > deadline:
+                    return False
+                waiting[priority] += 1
+                waited = True
+                try:
+                    self._cond.wait(wait)
+                finally:
+                    waiting[priority] -= 1
+
+    def update(self, group: str, headers: Mapping[str, str], skew_ms: int = 0) -> None:
+        """
+        用响应头校准分组桶（无限频头时忽略）
+
+        Args:
+            skew_ms: 交易所时钟 - 本地时钟（毫秒），与签名时间戳使用同一校正
+        """
+        status = headers.get("X-Bapi-Limit-Status")
+        if status is None:
+            return
+        limit = headers.get("X-Bapi-Limit")
+        reset = headers.get("X-Bapi-Limit-Reset-Timestamp")
+        with self._cond:
+            now = time.monotonic()
+            b = self._bucket(group, now)
+            b.refill(now)
+            if limit:
+                b.limit = float(limit)
+            # 服务端剩余额度已计入本次及此前的请求；本地桶只会更保守
+            b.tokens = min(b.tokens, float(status))
+            if reset:
+                # 重置时间为交易所时钟（毫秒），换算为本地单调时钟
+                server_now = time.time() + skew_ms / 1000.0
+                b.reset_at = now + max(0.0, float(reset) / 1000.0 - server_now)
+            self._cond.notify_all()
+
+    def state(self) -> Dict[str, Dict[str, float]]:
+        """各分组当前额度（调试/监控用）"""
+        with self._cond:
+            now = time.monotonic()
+            out = {}
+            buckets = dict(self._buckets)
+            if self._ip is not None:
+                buckets[IP_GROUP] = self._ip
+            for group, b in buckets.items():
+                b.refill(now)
+                out[group] = {"limit": b.limit, "tokens": b.tokens,
+                              "reset_in": None if b.reset_at is None else b.reset_at - now}
+            return out
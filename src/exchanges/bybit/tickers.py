@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+tickers.py — Bybit 行情快照缓存
+
+一次不带 symbol 的 /v5/market/tickers 调用拿到全部 linear 合约的行情，
+按合约解析成记录并打上新鲜度时间戳；get_ticker / get_funding_info 在
+允许的陈旧度内直接读内存。并发的相同刷新合并为一个在途请求（single-flight）。
+也可直接喂入 WebSocket tickers 主题（快照 + 增量合并）。
+
+记录的 ts 统一为交易所时间（REST 取响应 time，WebSocket 取消息 ts），
+REST 刷新不会覆盖更新的 WebSocket 记录；全量快照中没有的合约视为未知/已下架，
+在 miss_ttl_sec 内不再为它重新拉取。
+"""
+
+from __future__ import annotations
+
+import time
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+def _opt_float(v: Any) -> Optional[float]:
+    return float(v) if v not in (None, "") else None
+
+
+class TickerRecord:
+    """单个合约的解析后行情（raw 为合并后的原始字段）"""
+    __slots__ = ("symbol", "last", "mark", "index", "funding_rate", "next_funding_ts",
+                 "ts", "fetched_at", "raw")
+
+    def __init__(self, raw: Dict[str, Any], ts: int, fetched_at: float):
+        self.raw = raw
+        self.symbol = raw.get("symbol", "")
+        self.last = float(raw.get("lastPrice") or 0)
+        self.mark = _opt_float(raw.get("markPrice"))
+        self.index = _opt_float(raw.get("indexPrice"))
+        self.funding_rate = float(raw.get("fundingRate") or 0)
+        nft = raw.get("nextFundingTime")
+        self.next_funding_ts = int(nft) if nft else None
+        self.ts = ts                  # 交易所/抓取时间（毫秒）
+        self.fetched_at = fetched_at  # 本地写入时间（time.monotonic 秒）
+
+
+class _Flight:
+    __slots__ = ("done", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.error: Optional[BaseException] = None
+
+
+class TickerCache:
+    """
+    全市场行情快照
+
+    Args:
+        fetch_all: 拉取全部 linear 行情的函数，返回 API result（含 list，可带交易所时间 time）
+        max_age_sec: 默认允许的陈旧度（秒）
+        timeout_sec: 等待在途请求的最长时间
+        miss_ttl_sec: 未知合约的负缓存时长（秒）
+    """
+
+    def __init__(self, fetch_all: Callable[[], Dict[str, Any]], max_age_sec: float = 1.0,
+                 timeout_sec: float = 10.0, miss_ttl_sec: float = 60.0) -> None:
+        self._fetch_all = fetch_all
+        self.max_age_sec = float(max_age_sec)
+        self.timeout_sec = float(timeout_sec)
+        self.miss_ttl_sec = float(miss_ttl_sec)
+        self._records: Dict[str, TickerRecord] = {}
+        # 未知/已下架合约 -> 确认缺失的时间（time.monotonic 秒）
+        self._missing: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        # 记录表写入锁（REST 快照替换与 WebSocket 合并互斥，读不加锁）
+        self._write_lock = threading.Lock()
+        self._inflight: Optional[_Flight] = None
+        self.fetches = 0
+
+    def get(self, symbol: str, max_age_sec: Optional[float] = None) -> Optional[TickerRecord]:
+        """
+        取合约行情；超过陈旧度时刷新（并发调用共享同一次请求）。
+        刷新后仍无此合约返回 None，并在 miss_ttl_sec 内直接返回 None 而不再刷新。
+        """
+        max_age = self.max_age_sec if max_age_sec is None else max_age_sec
+        rec = self._records.get(symbol)
+        if rec is not None and time.monotonic() - rec.fetched_at <= max_age:
+            return rec
+        if rec is None:
+            missed = self._missing.get(symbol)
+            if missed is not None and time.monotonic() - missed < self.miss_ttl_sec:
+                return None
+        self.refresh()
+        rec = self._records.get(symbol)
+        if rec is None:
+            self._missing[symbol] = time.monotonic()
+        return rec
+
+    def refresh(self) -> None:
+        """拉取全市场行情；已有在途请求时等待其结果而不重复请求"""
+        with self._lock:
+            flight = self._inflight
+            leader = flight is None
+            if leader:
+                flight = self._inflight = _Flight()
+        if leader:
+            try:
+                data = self._fetch_all() or {}
+                self.fetches += 1
+                self._apply_snapshot(data)
+            except BaseException as e:
+                flight.error = e
+            finally:
+                with self._lock:
+                    self._inflight = None
+                flight.done.set()
+        elif not flight.done.wait(self.timeout_sec):
+            raise TimeoutError("ticker snapshot refresh timed out")
+        if flight.error is not None:
+            raise flight.error
+
+    def _apply_snapshot(self, data: Dict[str, Any]) -> None:
+        """写入一次全量 REST 快照：跳过更新的已有记录，移除快照中没有的旧记录"""
+        items = data.get("list") or []
+        if not items:
+            return
+        now = time.monotonic()
+        ts = int(data.get("time") or time.time() * 1000)
+        with self._write_lock:
+            records = self._records
+            fresh = {}
+            for it in items:
+                sym = it["symbol"]
+                prev = records.get(sym)
+                # WebSocket 推送可能比这次 REST 响应更新
+                fresh[sym] = prev if prev is not None and prev.ts > ts else TickerRecord(it, ts, now)
+            # 快照之后才到的 WebSocket 记录保留，其余不在快照中的视为已下架
+            for sym, prev in records.items():
+                if sym not in fresh and prev.ts > ts:
+                    fresh[sym] = prev
+            self._records = fresh
+            for sym in fresh.keys() & self._missing.keys():
+                del self._missing[sym]
+
+    def on_ws_ticker(self, msg: Dict[str, Any]) -> Optional[TickerRecord]:
+        """
+        WebSocket tickers.{symbol} 回调：snapshot 替换、delta 合并到已有原始字段
+        """
+        data = msg.get("data") or {}
+        symbol = data.get("symbol")
+        if not symbol:
+            return None
+        ts = int(msg.get("ts") or time.time() * 1000)
+        with self._write_lock:
+            prev = self._records.get(symbol)
+            if msg.get("type") == "delta" and prev is not None:
+                raw = dict(prev.raw)
+                raw.update(data)
+            else:
+                raw = dict(data)
+            rec = TickerRecord(raw, ts, time.monotonic())
+            self._records[symbol] = rec
+            self._missing.pop(symbol, None)
+        return rec
@@ -0,0 +1,439 @@
+# -*- coding: utf-8 -*-
+"""
+ws.py — Bybit V5 WebSocket 订阅（基于内置的 pybit WebSocket）
+
+- PublicStream: orderbook / tickers（及可选 publicTrade / allLiquidation）公共频道，
+  维护每个合约的本地 L2 盘口与行情快照，归一化为 Orderbook / Ticker 回调
+- PrivateStream: order / execution / position / wallet 私有频道；按 execId 去重，
+  重连（重新鉴权）后按最后成交时间用 REST 补齐断线期间的成交
+
+原始消息直接交给本模块处理（绕过 pybit 内部的列表盘口合并与逐条 deepcopy），
+因此订阅/鉴权回执也由本模块记录（失败时 error 日志）。断线由后台守护线程检测并重连，
+重连时 pybit 按记录的订阅自动重订，盘口以新快照重建；重连依赖 pybit 内部接口，
+集中在 _reconnect 中并限定已核对的版本。
+"""
+
+from __future__ import annotations
+
+import sys
+import time
+import logging
+import threading
+import importlib.util
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from ..base_exchange import Ticker, Orderbook
+from ...sentinel.book import BookSide
+from .tickers import TickerCache
+
+# pybit 可选：优先用已安装的包，否则加载仓库内置的 pybit-5.12.0
+_VENDORED = Path(__file__).parent / "pybit-5.12.0"
+
+
+def _load_pybit():
+    try:
+        from pybit.unified_trading import WebSocket
+        return WebSocket
+    except ImportError:
+        pass
+    try:
+        spec = importlib.util.spec_from_file_location(
+            "pybit", _VENDORED / "__init__.py", submodule_search_locations=[str(_VENDORED)]
+        )
+        module = importlib.util.module_from_spec(spec)
+        sys.modules["pybit"] = module
+        spec.loader.exec_module(module)
+        from pybit.unified_trading import WebSocket
+        return WebSocket
+    except Exception:
+        sys.modules.pop("pybit", None)
+        return None
+
+
+WebSocket = _load_pybit()
+PYBIT_VERSION: Optional[str] = getattr(sys.modules.get("pybit"), "VERSION", None) if WebSocket else None
+
+# _reconnect 使用的 pybit 内部接口（_reset / _connect / WS_URL）已在这些主版本上核对
+_RECONNECT_VERSIONS = ("5.",)
+
+
+def _reconnect(ws) -> bool:
+    """
+    用 pybit 内部接口重连一个已断开的 WebSocket（pybit 会重新鉴权并按已记录的订阅重订）
+
+    Returns:
+        bool: 是否支持（pybit 版本未核对或缺少内部接口时返回 False，不做任何操作）
+    """
+    if not (PYBIT_VERSION or "").startswith(_RECONNECT_VERSIONS):
+        return False
+    if not all(hasattr(ws, attr) for attr in ("_reset", "_connect", "WS_URL")):
+        return False
+    ws._reset()
+    ws._connect(ws.WS_URL)
+    return True
+
+
+class LocalBook:
+    """单个合约的本地 L2 盘口（两侧为有序连续数组）"""
+    __slots__ = ("symbol", "bids", "asks", "ts", "update_id", "seq")
+
+    def __init__(self, symbol: str, depth: int):
+        self.symbol = symbol
+        self.bids = BookSide(is_bid=True, depth=depth)
+        self.asks = BookSide(is_bid=False, depth=depth)
+        self.ts = 0
+        self.update_id = 0
+        self.seq = 0
+
+    def levels(self, depth: int):
+        """前 depth 档 [[price, qty], ...]（买、卖）"""
+        b = self.bids
+        a = self.asks
+        kb = min(depth, len(b))
+        ka = min(depth, len(a))
+        return ([[p, q] for p, q in zip(b.prices()[:kb].tolist(), b.qtys()[:kb].tolist())],
+                [[p, q] for p, q in zip(a.prices()[:ka].tolist(), a.qtys()[:ka].tolist())])
+
+
+def _levels(rows) -> np.ndarray:
+    return np.asarray(rows, dtype=float).reshape(-1, 2)
+
+
+class _Stream:
+    """WebSocket 连接的公共部分：原始消息分发与断线守护"""
+
+    name = "stream"
+
+    def __init__(self, check_sec: float) -> None:
+        self._log = logging.getLogger(self.__class__.__name__)
+        self._handlers: Dict[str, Callable[[Dict[str, Any]], None]] = {}
+        self.messages = 0
+        self.reconnects = 0
+        self._check_sec = check_sec
+        self._stop = threading.Event()
+        self.ws = None
+
+    def _start_watch(self) -> None:
+        self._watch = threading.Thread(target=self._supervise, args=(self._check_sec,),
+                                       name=f"bybit-ws-{self.name}", daemon=True)
+        self._watch.start()
+
+    @property
+    def connected(self) -> bool:
+        return self.ws.is_connected()
+
+    def _on_control(self, msg: Dict[str, Any]) -> None:
+        """订阅/鉴权回执等非数据消息（callback_function 绕过了 pybit 的回执处理）"""
+        op = msg.get("op") or msg.get("type")
+        if msg.get("success") is False or msg.get("type") == "error":
+            self._log.error(f"Bybit {self.name} WebSocket {op} failed: {msg.get('ret_msg') or msg}")
+        elif op == "auth" and msg.get("success") and self.ws is not None:
+            # 与 pybit 自身的回执处理保持一致（首次鉴权回执可能早于构造完成）
+            self.ws.auth = True
+
+    def _on_message(self, msg: Dict[str, Any]) -> None:
+        topic = msg.get("topic")
+        if topic is None:
+            self._on_control(msg)
+            return
+        self.messages += 1
+        dot = topic.find(".")
+        handler = self._handlers.get(topic if dot < 0 else topic[:dot])
+        if handler is None:
+            return
+        try:
+            handler(msg)
+        except Exception as e:
+            self._log.error(f"Error handling {topic}: {e}")
+
+    def _supervise(self, check_sec: float) -> None:
+        """断线检测：连接断开且 pybit 未在重连时主动重连（重连后自动重订）"""
+        ws = self.ws
+        while not self._stop.wait(check_sec):
+            if ws.is_connected() or ws.attempting_connection:
+                continue
+            self._log.warning(f"Bybit {self.name} WebSocket disconnected, reconnecting")
+            try:
+                if not _reconnect(ws):
+                    self._log.error(f"Reconnect not supported for pybit {PYBIT_VERSION}; "
+                                    f"Bybit {self.name} WebSocket supervisor stopped")
+                    return
+                self.reconnects += 1
+            except Exception as e:
+                self._log.error(f"Bybit {self.name} WebSocket reconnect failed: {e}")
+
+    def close(self) -> None:
+        self._stop.set()
+        try:
+            self.ws.exit()
+        except Exception:
+            pass
+
+
+class PublicStream(_Stream):
+    """
+    公共频道订阅
+
+    Args:
+        symbols: Bybit 符号列表
+        testnet: 是否测试网
+        depth: 盘口订阅档数（linear 支持 1/50/200/500）
+        tickers: 行情快照（TickerCache），tickers 推送合并进它；为空则内部新建
+        map_in: Bybit 符号 -> 内部标准符号
+        on_ticker / on_orderbook: 归一化回调
+        on_trades / on_liquidation: 原始 publicTrade / allLiquidation 消息回调
+            （可直接接 SentinelEngine.on_trades / on_liquidation）
+        retries: 单次连接的最大尝试次数（0 为无限）
+        check_sec: 断线检测周期（秒）
+    """
+
+    name = "public"
+
+    def __init__(
+        self,
+        symbols: List[str],
+        *,
+        testnet: bool,
+        depth: int = 50,
+        tickers=None,
+        map_in: Callable[[str], str] = lambda s: s,
+        on_ticker: Optional[Callable[[Ticker], None]] = None,
+        on_orderbook: Optional[Callable[[Orderbook], None]] = None,
+        on_trades: Optional[Callable[[dict], None]] = None,
+        on_liquidation: Optional[Callable[[dict], None]] = None,
+        retries: int = 10,
+        check_sec: float = 1.0,
+    ) -> None:
+        if WebSocket is None:
+            raise RuntimeError("pybit / websocket-client not available")
+        super().__init__(check_sec)
+        self.symbols = list(symbols)
+        self.depth = int(depth)
+        self.books: Dict[str, LocalBook] = {}
+        self.stale_deltas = 0   # 无快照或 update_id 未前进而丢弃的增量
+        self.gaps = 0           # update_id 不连续的增量（仍应用，记 warning）
+        self._tickers = tickers if tickers is not None else TickerCache(dict)
+        self._map_in = map_in
+        self._on_ticker = on_ticker
+        self._on_orderbook = on_orderbook
+        self._on_trades = on_trades
+        self._on_liquidation = on_liquidation
+        self._handlers = {
+            "orderbook": self._handle_orderbook,
+            "tickers": self._handle_ticker,
+            "publicTrade": self._handle_trades,
+            "allLiquidation": self._handle_liquidation,
+        }
+
+        self.ws = WebSocket(channel_type="linear", testnet=testnet, retries=retries,
+                            callback_function=self._on_message)
+        cb = self._on_message  # 占位：实际分发走 callback_function
+        self.ws.orderbook_stream(self.depth, self.symbols, cb)
+        self.ws.ticker_stream(self.symbols, cb)
+        if on_trades is not None:
+            self.ws.trade_stream(self.symbols, cb)
+        if on_liquidation is not None:
+            self.ws.all_liquidation_stream(self.symbols, cb)
+        self._start_watch()
+
+    # ----------------- 消息处理 -----------------
+
+    def _handle_orderbook(self, msg: Dict[str, Any]) -> None:
+        data = msg["data"]
+        symbol = data["s"]
+        update_id = int(data.get("u", 0))
+        book = self.books.get(symbol)
+        # 快照（或服务重启后 u=1 的重置）整体替换，否则逐档增量
+        if msg.get("type") == "snapshot" or update_id == 1:
+            if book is None:
+                book = self.books[symbol] = LocalBook(symbol, self.depth)
+            b = _levels(data["b"])
+            a = _levels(data["a"])
+            book.bids.snapshot(b[:, 0], b[:, 1])
+            book.asks.snapshot(a[:, 0], a[:, 1])
+        else:
+            # 尚无快照时无从应用；update_id 未前进为重复/过期推送
+            if book is None or update_id <= book.update_id:
+                self.stale_deltas += 1
+                return
+            if update_id != book.update_id + 1:
+                self.gaps += 1
+                self._log.warning(f"Orderbook {symbol} update_id gap: {book.update_id} -> {update_id}")
+            # 增量通常只有几档，逐档更新比先转数组更省
+            bids, asks = book.bids, book.asks
+            for p, q in data["b"]:
+                bids.set_level(float(p), float(q))
+            for p, q in data["a"]:
+                asks.set_level(float(p), float(q))
+        book.ts = int(msg.get("cts") or msg["ts"])
+        book.update_id = update_id
+        book.seq = int(data.get("seq", 0))
+        if self._on_orderbook is not None:
+            bids, asks = book.levels(self.depth)
+            self._on_orderbook(Orderbook(
+                symbol=self._map_in(symbol),
+                bids=bids,
+                asks=asks,
+                ts=book.ts,
+                raw=msg,
+            ))
+
+    def _handle_ticker(self, msg: Dict[str, Any]) -> None:
+        rec = self._tickers.on_ws_ticker(msg)
+        if rec is not None and self._on_ticker is not None:
+            self._on_ticker(Ticker(
+                symbol=self._map_in(rec.symbol),
+                last=rec.last,
+                mark=rec.mark,
+                index=rec.index,
+                ts=rec.ts,
+                raw=rec.raw,
+            ))
+
+    def _handle_trades(self, msg: Dict[str, Any]) -> None:
+        self._on_trades(msg)
+
+    def _handle_liquidation(self, msg: Dict[str, Any]) -> None:
+        self._on_liquidation(msg)
+
+
+class PrivateStream(_Stream):
+    """
+    私有频道订阅（order / execution / position / wallet），回调收到原始条目
+
+    成交按 execId 去重（保留最近 dedup_size 个，超出时淘汰最早的）并记录最后成交时间 execTime；
+    除首次连接外，每次鉴权成功（即重连）后在后台线程调用 fetch_executions(since_ms)
+    补齐断线期间的成交，再调用 on_resync 刷新持仓/余额。
+
+    Args:
+        api_key / api_secret: API 凭证
+        testnet: 是否测试网
+        on_order / on_execution / on_position / on_wallet: 原始条目回调（WebSocket 或补齐线程中执行）
+        fetch_executions: since_ms -> 成交原始条目列表（REST，需自行分页）
+        on_resync: 重连补齐成交后调用
+        retries: 单次连接的最大尝试次数（0 为无限）
+        dedup_size: execId 去重窗口大小
+        check_sec: 断线检测周期（秒）
+    """
+
+    name = "private"
+
+    def __init__(
+        self,
+        *,
+        api_key: str,
+        api_secret: str,
+        testnet: bool,
+        on_order: Optional[Callable[[dict], None]] = None,
+        on_execution: Optional[Callable[[dict], None]] = None,
+        on_position: Optional[Callable[[dict], None]] = None,
+        on_wallet: Optional[Callable[[dict], None]] = None,
+        fetch_executions: Optional[Callable[[int], List[dict]]] = None,
+        on_resync: Optional[Callable[[], None]] = None,
+        retries: int = 10,
+        dedup_size: int = 10000,
+        check_sec: float = 1.0,
+    ) -> None:
+        if WebSocket is None:
+            raise RuntimeError("pybit / websocket-client not available")
+        super().__init__(check_sec)
+        self._on_order = on_order
+        self._on_execution = on_execution
+        self._on_position = on_position
+        self._on_wallet = on_wallet
+        self._fetch_executions = fetch_executions
+        self._on_resync = on_resync
+        # 按插入顺序保存的 execId（值无意义），超出窗口时淘汰最早的
+        self._seen: "OrderedDict[str, None]" = OrderedDict()
+        self._dedup_size = int(dedup_size)
+        self._exec_lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self.last_exec_ms = 0
+        self.started_ms = int(time.time() * 1000)
+        self.auths = 0
+        self.duplicates = 0
+        self.recovered = 0
+        self._handlers = {
+            "order": self._handle_rows(on_order),
+            "execution": self._handle_executions,
+            "position": self._handle_rows(on_position),
+            "wallet": self._handle_rows(on_wallet),
+        }
+
+        self.ws = WebSocket(channel_type="private", testnet=testnet, retries=retries,
+                            api_key=api_key, api_secret=api_secret,
+                            callback_function=self._on_message)
+        cb = self._on_message  # 占位：实际分发走 callback_function
+        self.ws.order_stream(cb)
+        self.ws.execution_stream(cb)
+        self.ws.position_stream(cb)
+        self.ws.wallet_stream(cb)
+        self._start_watch()
+
+    @staticmethod
+    def _handle_rows(fn: Optional[Callable[[dict], None]]):
+        def handle(msg: Dict[str, Any]) -> None:
+            if fn is not None:
+                for row in msg.get("data") or ():
+                    fn(row)
+        return handle
+
+    def _on_control(self, msg: Dict[str, Any]) -> None:
+        super()._on_control(msg)
+        if msg.get("op") != "auth" or not msg.get("success"):
+            return
+        self.auths += 1
+        # 首次鉴权是初始连接；之后每次鉴权都意味着断线重连，需要补齐
+        if self.auths > 1:
+            threading.Thread(target=self.catch_up, name="bybit-ws-catchup", daemon=True).start()
+
+    # ----------------- 成交去重 / 补齐 -----------------
+
+    def _deliver_execution(self, row: Dict[str, Any]) -> bool:
+        """按 execId 去重后投递一条成交；返回是否为新成交"""
+        eid = row.get("execId")
+        with self._exec_lock:
+            if eid in self._seen:
+                self.duplicates += 1
+                return False
+            if eid is not None:
+                self._seen[eid] = None
+                if len(self._seen) > self._dedup_size:
+                    self._seen.popitem(last=False)
+            t = int(row.get("execTime") or 0)
+            if t > self.last_exec_ms:
+                self.last_exec_ms = t
+        if self._on_execution is not None:
+            self._on_execution(row)
+        return True
+
+    def _handle_executions(self, msg: Dict[str, Any]) -> None:
+        for row in msg.get("data") or ():
+            self._deliver_execution(row)
+
+    def catch_up(self) -> int:
+        """从最后成交时间起用 REST 补齐成交（含边界，靠 execId 去重）；返回新补到的条数"""
+        if self._fetch_executions is None:
+            return 0
+        with self._sync_lock:
+            since = self.last_exec_ms or self.started_ms
+            try:
+                rows = self._fetch_executions(since)
+            except Exception as e:
+                self._log.error(f"Bybit execution catch-up failed: {e}")
+                return 0
+            rows.sort(key=lambda r: int(r.get("execTime") or 0))
+            n = sum(self._deliver_execution(r) for r in rows)
+            self.recovered += n
+            if n:
+                self._log.warning(f"Recovered {n} executions missed during reconnect")
+            if self._on_resync is not None:
+                try:
+                    self._on_resync()
+                except Exception as e:
+                    self._log.error(f"Bybit private resync failed: {e}")
+            return n
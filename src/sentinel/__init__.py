@@ -7,25 +7,70 @@ Real-time Market Condition Analysis Module
 
 主要组件：
 - detectors: 各类异常检测器（波动、价差、盘口、资金费、链上、新闻）
+- book: 数组化 L2 盘口，增量维护前 N 档名义金额
 - engine: 哨兵编排引擎，聚合各检测器结果并计算市场状态分数
+- bank: 多标的哨兵组，二维数组状态、逐 tick 向量化更新
+- rolling: 检测器共享的增量滑窗统计内核
+- dispatch: 告警异步分发（后台线程合并发送 webhook）
+- textmatch: Aho-Corasick 关键词自动机（新闻检测用）
+- sources: 可回放的本地外部数据源（新闻、链上转账）
+- watchlist: 链上被关注地址索引（哈希索引 + 可选布隆过滤）
+- instrument: 检测器运行指标（延迟直方图、调用/告警计数）
+- shm: 独立进程运行引擎（共享内存 tick 环形缓冲 + 结果槽位）
+- calibrate: 历史数据上的参数网格标定（前缀和共享 + 进程池）
 """
 
 from .engine import SentinelEngine
+from .bank import SentinelBank
 from .detectors import (
     VolSpikeDetector,
+    RealizedVolDetector,
     SpreadBlowoutDetector, 
+    LeadLagDetector,
     FundingShockDetector,
     OrderbookImbalanceDetector,
     WhaleOnchainDetector,
-    NewsDetector
+    NewsDetector,
+    FeedHealthDetector,
+    LiquidationDetector,
+    VpinDetector,
+)
+from .textmatch import KeywordAutomaton
+from .sources import ReplaySource, NewsReplaySource, TransferReplaySource
+from .watchlist import AddressIndex, BloomFilter
+from .shm import SentinelProcess, TickRing, RegimeSlot
+from .rolling import (
+    RollingStats, RollingQuantile, RollingStatsBank, RollingQuantileBank,
+    TimeWindowStats, TimeWindowQuantile,
 )
 
 __all__ = [
     "SentinelEngine",
+    "SentinelBank",
     "VolSpikeDetector",
+    "RealizedVolDetector",
     "SpreadBlowoutDetector",
+    "LeadLagDetector",
     "FundingShockDetector", 
     "OrderbookImbalanceDetector",
     "WhaleOnchainDetector",
-    "NewsDetector"
+    "NewsDetector",
+    "FeedHealthDetector",
+    "LiquidationDetector",
+    "VpinDetector",
+    "RollingStats",
+    "RollingQuantile",
+    "RollingStatsBank",
+    "RollingQuantileBank",
+    "TimeWindowStats",
+    "TimeWindowQuantile",
+    "KeywordAutomaton",
+    "ReplaySource",
+    "NewsReplaySource",
+    "TransferReplaySource",
+    "AddressIndex",
+    "BloomFilter",
+    "SentinelProcess",
+    "TickRing",
+    "RegimeSlot",
 ]
@@ -0,0 +1,193 @@
+"""
+多标的哨兵组
+Multi-symbol sentinel bank
+
+以 struct-of-arrays 方式同时维护 N 个标的的检测器状态：
+- 价格/成交量/价差窗口为 (win, N) 二维环形缓冲
+- 每个 tick 传入长度 N 的价格、成交量、资金费向量，一次向量化算出全部标的的分数与等级
+- 冷却按标的独立计算
+- 输入中的 NaN/缺失标的按列屏蔽：该标的本 tick 不推入窗口、不参与判定，其他标的不受影响
+
+检测口径与 SentinelEngine 的 vol_spike / spread_blowout / funding_shock 一致。
+"""
+
+from __future__ import annotations
+from typing import Dict, List, Optional
+from time import time
+import logging
+import numpy as np
+
+from .detectors import VolSpikeCfg, SpreadBlowoutCfg, FundingShockCfg
+from .engine import ALERT_DTYPE
+from .rolling import RollingStatsBank, RollingQuantileBank
+from ..types import RegimeBatchResult
+
+
+class SentinelBank:
+    """多标的哨兵组：N 个标的的检测器状态保存在二维数组中，逐 tick 向量化更新。"""
+
+    def __init__(self, symbols: List[str], cfg: dict):
+        """
+        初始化哨兵组
+
+        Args:
+            symbols: 标的列表，顺序即各输入向量的列顺序
+            cfg: 与 SentinelEngine 相同结构的配置字典
+        """
+        self.symbols = list(symbols)
+        self.n = len(self.symbols)
+        self._index = {s: i for i, s in enumerate(self.symbols)}
+        self.cfg = cfg
+        self.logger = logging.getLogger(__name__)
+
+        d = cfg.get("detectors", {})
+        self.vol_cfg = VolSpikeCfg(**d.get("vol_spike", {}))
+        self.spread_cfg = SpreadBlowoutCfg(**d.get("spread_blowout", {}))
+        self.funding_cfg = FundingShockCfg(**d.get("funding_shock", {}))
+
+        # 二维环形缓冲：收益率/成交量/价差用滑动 Welford，资金费用按列有序窗口求中位数
+        self.returns = RollingStatsBank(max(1, self.vol_cfg.win - 1), self.n)
+        self.volumes = RollingStatsBank(self.vol_cfg.win, self.n)
+        self.spreads = RollingStatsBank(self.spread_cfg.win, self.n)
+        self.funding = RollingQuantileBank(self.funding_cfg.win, self.n)
+        # 各标的最近一个有效对数价格（NaN 表示尚无有效价格）
+        self._last_logp = np.full(self.n, np.nan)
+
+        self.weights = cfg.get("weights", {})
+        self.cooldown_sec = int(cfg.get("cooldown_sec", 300))
+        self.thresholds = cfg.get("score_thresholds", {"tighten": 60, "pause": 80})
+
+        # 按标的独立冷却
+        self._last_fire_ts = np.zeros(self.n, dtype=np.int64)
+        self.last_score = np.zeros(self.n)
+        self.last_level = np.full(self.n, "normal", dtype="U7")
+
+        self.logger.info(f"SentinelBank initialized for {self.n} symbols")
+
+    def update(self, px_a: np.ndarray, px_b: np.ndarray, vol_a: np.ndarray,
+               next_rate_a: np.ndarray, ts: Optional[float] = None) -> RegimeBatchResult:
+        """
+        对全部标的推进一个 tick
+
+        Args:
+            px_a: 各标的交易所A价格，形状 (N,)
+            px_b: 各标的交易所B价格，形状 (N,)
+            vol_a: 各标的交易所A成交量，形状 (N,)
+            next_rate_a: 各标的交易所A下一期资金费，形状 (N,)
+            ts: 事件时间戳（秒，可选），缺省用本地时间
+
+        Returns:
+            RegimeBatchResult: 各标的分数/等级数组 + 告警表（idx 为标的下标）
+        """
+        px_a = np.asarray(px_a, dtype=float)
+        px_b = np.asarray(px_b, dtype=float)
+        vol_a = np.asarray(vol_a, dtype=float)
+        next_rate_a = np.asarray(next_rate_a, dtype=float)
+        now = int(ts) if ts is not None else int(time())
+
+        fired = {}
+        scores = {}
+
+        # 入口屏蔽：非有限/非正价格、NaN 成交量与费率的标的本 tick 不推入对应窗口
+        ok_a = np.isfinite(px_a) & (px_a > 0)
+        ok_b = np.isfinite(px_b) & (px_b > 0)
+        ok_vol = np.isfinite(vol_a)
+        ok_rate = np.isfinite(next_rate_a)
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            # 价格/成交量异常波动：收益率以各标的上一个有效价格为基准
+            logp = np.log(np.where(ok_a, px_a, np.nan))
+            ok_ret = ok_a & np.isfinite(self._last_logp)
+            self.returns.push(logp - self._last_logp, ok_ret)
+            self._last_logp = np.where(ok_a, logp, self._last_logp)
+            self.volumes.push(vol_a, ok_vol)
+            ready = self.returns.full & self.volumes.full & ok_ret & ok_vol
+            if ready.any():
+                rz = np.abs(self.returns.zscore())
+                vz = self.volumes.zscore()
+                fired["vol_spike"] = ready & (rz >= self.vol_cfg.z) & (vz >= self.vol_cfg.vol_z)
+                scores["vol_spike"] = 70 + 10 * np.minimum(3, rz - self.vol_cfg.z)
+
+            # 跨所价差异常
+            ok_sp = ok_a & ok_b
+            self.spreads.push((px_a - px_b) / (0.5 * (px_a + px_b)), ok_sp)
+            ready = self.spreads.full & ok_sp
+            if ready.any():
+                z = np.abs(self.spreads.zscore())
+                fired["spread_blowout"] = ready & (z >= self.spread_cfg.z)
+                scores["spread_blowout"] = 65 + 8 * np.minimum(3, z - self.spread_cfg.z)
+
+            # 资金费突变：窗口中位数增量维护，不再每 tick 全窗口排序
+            self.funding.push(next_rate_a, ok_rate)
+            ready = self.funding.full & ok_rate
+            if ready.any():
+                delta_bps = np.abs((next_rate_a - self.funding.median()) * 1e4)
+                fired["funding_shock"] = ready & (delta_bps >= self.funding_cfg.delta_bps)
+                scores["funding_shock"] = 50 + 5 * np.minimum(5, delta_bps - self.funding_cfg.delta_bps)
+
+        # 应用权重并累加总分数
+        severity = {"vol_spike": "high", "spread_blowout": "high", "funding_shock": "warn"}
+        score = np.zeros(self.n)
+        tables = []
+        for name, mask in fired.items():
+            w = float(self.weights.get(name, 1.0))
+            s = np.where(mask, scores[name] * w, 0.0)
+            score += s
+            idx = np.flatnonzero(mask)
+            if len(idx):
+                t = np.empty(len(idx), dtype=ALERT_DTYPE)
+                t["idx"] = idx
+                t["ts"] = now
+                t["name"] = name
+                t["severity"] = severity[name]
+                t["score"] = s[idx]
+                tables.append(t)
+        alerts = np.concatenate(tables) if tables else np.empty(0, dtype=ALERT_DTYPE)
+
+        # 确定市场状态等级
+        level = np.full(self.n, "normal", dtype="U7")
+        level[score >= self.thresholds.get("tighten", 60)] = "tighten"
+        level[score >= self.thresholds.get("pause", 80)] = "pause"
+
+        # 冷却机制：按标的独立
+        active = level != "normal"
+        cooling = active & (now - self._last_fire_ts < self.cooldown_sec)
+        level[cooling] = "normal"
+        firing = active & ~cooling
+        self._last_fire_ts[firing] = now
+        if firing.any():
+            self.logger.warning(
+                "Market regime changed: " + ", ".join(
+                    f"{self.symbols[i]}={level[i]}({score[i]:.2f})" for i in np.flatnonzero(firing)
+                )
+            )
+
+        self.last_score = score
+        self.last_level = level
+        return {
+            "score": score,
+            "level": level,
+            "alerts": alerts
+        }
+
+    def get_level(self, symbol: str) -> str:
+        """查询单个标的最近一次的市场状态等级"""
+        return str(self.last_level[self._index[symbol]])
+
+    def get_status(self) -> dict:
+        """获取哨兵组状态"""
+        return {
+            "symbols": self.n,
+            "cooldown_sec": self.cooldown_sec,
+            "thresholds": self.thresholds,
+            "weights": self.weights,
+            "levels": {s: str(l) for s, l in zip(self.symbols, self.last_level) if l != "normal"},
+        }
+
+    def reset_cooldown(self, symbol: Optional[str] = None):
+        """重置冷却时间；不指定标的则全部重置"""
+        if symbol is None:
+            self._last_fire_ts[:] = 0
+        else:
+            self._last_fire_ts[self._index[symbol]] = 0
+        self.logger.info(f"SentinelBank cooldown reset: {symbol or 'all'}")
@@ -0,0 +1,135 @@
+"""
+数组化 L2 盘口
+Array-backed L2 order book
+
+供盘口类检测器使用的单边盘口结构：
+- 价格/数量保存在预分配的连续数组中，按优先级（买盘降序、卖盘升序）排列
+- 增量（delta）更新时维护前 N 档名义金额之和，无需每次重新求和
+"""
+
+from __future__ import annotations
+from typing import Optional
+import numpy as np
+
+
+class BookSide:
+    """单边 L2 盘口：有序连续数组 + 前 depth 档名义金额增量维护。"""
+
+    def __init__(self, is_bid: bool, depth: int, capacity: int = 256,
+                 resum_every: int = 4096):
+        self.is_bid = is_bid
+        self.depth = int(depth)
+        # 排序键：买盘用 -price，卖盘用 price，均按升序即为优先级顺序
+        self._sign = -1.0 if is_bid else 1.0
+        self._keys = np.empty(capacity)
+        self._qtys = np.empty(capacity)
+        self._n = 0
+        self._top = 0.0
+        # 每隔若干次增量更新精确重算一次，消除浮点累计误差
+        self._resum_every = int(resum_every)
+        self._since_resum = 0
+
+    def __len__(self) -> int:
+        return self._n
+
+    @property
+    def top_notional(self) -> float:
+        """前 depth 档名义金额之和"""
+        return self._top
+
+    def prices(self) -> np.ndarray:
+        """按优先级返回各档价格（视图）"""
+        return np.abs(self._keys[:self._n])
+
+    def qtys(self) -> np.ndarray:
+        """按优先级返回各档数量（视图）"""
+        return self._qtys[:self._n]
+
+    def best(self) -> Optional[float]:
+        """最优价"""
+        return abs(float(self._keys[0])) if self._n else None
+
+    def _resum(self) -> None:
+        k = min(self._n, self.depth)
+        self._top = float(np.dot(np.abs(self._keys[:k]), self._qtys[:k]))
+        self._since_resum = 0
+
+    def _reserve(self, n: int) -> None:
+        if n <= len(self._keys):
+            return
+        cap = max(n, 2 * len(self._keys))
+        keys = np.empty(cap)
+        qtys = np.empty(cap)
+        keys[:self._n] = self._keys[:self._n]
+        qtys[:self._n] = self._qtys[:self._n]
+        self._keys, self._qtys = keys, qtys
+
+    def snapshot(self, prices: np.ndarray, qtys: np.ndarray) -> None:
+        """用全量快照替换盘口（数量为 0 的档位会被丢弃）"""
+        prices = np.asarray(prices, dtype=float)
+        qtys = np.asarray(qtys, dtype=float)
+        keep = qtys > 0
+        keys = prices[keep] * self._sign
+        qtys = qtys[keep]
+        order = np.argsort(keys, kind="stable")
+        n = len(order)
+        self._reserve(n)
+        self._keys[:n] = keys[order]
+        self._qtys[:n] = qtys[order]
+        self._n = n
+        self._resum()
+
+    def set_level(self, price: float, qty: float) -> None:
+        """增量更新单个价位；qty=0 表示删除该档"""
+        key = price * self._sign
+        n = self._n
+        keys = self._keys
+        i = int(np.searchsorted(keys[:n], key))
+        exists = i < n and keys[i] == key
+        depth = self.depth
+
+        if qty <= 0:
+            if not exists:
+                return
+            if i < depth:
+                self._top -= price * self._qtys[i]
+                # 原第 depth+1 档补入前 N 档
+                if n > depth:
+                    self._top += abs(keys[depth]) * self._qtys[depth]
+            keys[i:n - 1] = keys[i + 1:n]
+            self._qtys[i:n - 1] = self._qtys[i + 1:n]
+            self._n = n - 1
+        elif exists:
+            if i < depth:
+                self._top += price * (qty - self._qtys[i])
+            self._qtys[i] = qty
+        else:
+            if i < depth:
+                self._top += price * qty
+                # 原第 depth 档被挤出前 N 档
+                if n >= depth:
+                    self._top -= abs(keys[depth - 1]) * self._qtys[depth - 1]
+            self._reserve(n + 1)
+            keys = self._keys
+            keys[i + 1:n + 1] = keys[i:n]
+            self._qtys[i + 1:n + 1] = self._qtys[i:n]
+            keys[i] = key
+            self._qtys[i] = qty
+            self._n = n + 1
+
+        self._since_resum += 1
+        if self._since_resum >= self._resum_every:
+            self._resum()
+
+    def state(self) -> dict:
+        """导出盘口状态（用于快照）"""
+        return {"prices": self.prices().copy(), "qtys": self.qtys().copy()}
+
+    def load_state(self, st: dict) -> None:
+        """从快照恢复盘口"""
+        self.snapshot(st["prices"], st["qtys"])
+
+    def apply(self, levels: np.ndarray) -> None:
+        """批量增量更新，levels 形状 (k, 2)：[[price, qty], ...]"""
+        for price, qty in levels:
+            self.set_level(float(price), float(qty))
@@ -0,0 +1,406 @@
+"""
+哨兵参数标定
+Sentinel threshold calibration and parameter sweep
+
+在历史数据上一次性评估整组检测器参数组合：
+- 前缀和（cumsum / cumsum of squares）只算一次，任意窗口的滚动均值/方差 O(n) 得到
+- 同一检测器参数只计算一次触发行（稀疏），权重/阈值/冷却组合在稀疏告警上合成
+- 组合按检测器参数分块分发到进程池，前缀和通过共享内存零拷贝共享给各工作进程
+- 每个组合输出告警率、总分数分位数、tighten/pause 次数与持续时间占比
+- 逐行等级序列按 SentinelEngine._tick 的规则得到（冷却压制，或启用 decay 时按衰减总分）
+
+检测口径与 SentinelEngine.update_batch（计数窗口）一致；z 分数由前缀和计算，
+与逐样本 Welford 的差异在浮点舍入量级。调度（schedule）跳过检测器时沿用的分数不建模。
+"""
+
+from __future__ import annotations
+from concurrent.futures import ProcessPoolExecutor
+from itertools import product
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import copy
+import logging
+import numpy as np
+
+from .detectors import (
+    VolSpikeCfg, SpreadBlowoutCfg, FundingShockCfg, RealizedVolCfg, RealizedVolDetector,
+    LeadLagCfg, LeadLagDetector,
+)
+from .rolling import decayed_cumsum, rolling_median
+from .shm import attach_shared_memory
+
+logger = logging.getLogger(__name__)
+
+# 默认输出的总分数分位
+DEFAULT_QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+# 可扫描的检测器（参数路径前缀 detectors.<name>.）
+SWEEP_DETECTORS = ("vol_spike", "realized_vol", "spread_blowout", "lead_lag", "funding_shock")
+
+# 与 RollingStats.zscore 相同的分母保护
+_EPS = 1e-12
+
+
+def expand_grid(grid: Dict[str, Sequence[Any]]) -> List[Dict[str, Any]]:
+    """
+    参数网格 -> 组合列表
+
+    grid 键为点分路径（如 "detectors.vol_spike.z"、"weights.news"、
+    "score_thresholds.pause"、"cooldown_sec"），值为候选取值列表。
+    """
+    keys = list(grid)
+    return [dict(zip(keys, vals)) for vals in product(*(grid[k] for k in keys))]
+
+
+def apply_params(cfg: dict, params: Dict[str, Any]) -> dict:
+    """把组合参数写回配置字典（深拷贝，不修改原配置）"""
+    out = copy.deepcopy(cfg)
+    for path, value in params.items():
+        node = out
+        *parents, leaf = path.split(".")
+        for key in parents:
+            node = node.setdefault(key, {})
+        node[leaf] = value
+    return out
+
+
+# ---------------- 前缀和预计算 ----------------
+
+def precompute(px_a: np.ndarray, px_b: np.ndarray, vol_a: np.ndarray,
+               next_rate_a: np.ndarray, ts: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    计算各检测器输入序列及其前缀和（所有窗口共享）
+
+    序列先减去全局均值再累加，降低大均值序列（成交量）方差计算的抵消误差；z 分数不受平移影响。
+    """
+    px_a = np.asarray(px_a, dtype=float)
+    px_b = np.asarray(px_b, dtype=float)
+    logp = np.log(px_a)
+    series = {
+        "ret": np.diff(logp),                               # 第 i 行的收益率在 ret[i-1]
+        "vol": np.asarray(vol_a, dtype=float),
+        "spread": (px_a - px_b) / (0.5 * (px_a + px_b)),
+    }
+    data = {
+        "px_a": px_a,
+        "px_b": px_b,
+        "ts": np.asarray(ts, dtype=float),
+        "rate": np.asarray(next_rate_a, dtype=float),
+        "logret": np.concatenate([[np.nan], series["ret"]])[:len(logp)],   # 每行原始收益率
+    }
+    for key, x in series.items():
+        xc = x - x.mean() if len(x) else x
+        data[key] = xc
+        data[f"{key}.c1"] = np.concatenate([[0.0], np.cumsum(xc)])
+        data[f"{key}.c2"] = np.concatenate([[0.0], np.cumsum(xc * xc)])
+    return data
+
+
+def _prefix_zscore(data: Dict[str, np.ndarray], key: str, win: int) -> np.ndarray:
+    """由前缀和求每个位置末样本的滚动 z 分数（总体标准差），前 win-1 个位置为 nan"""
+    x = data[key]
+    c1 = data[f"{key}.c1"]
+    c2 = data[f"{key}.c2"]
+    out = np.full(len(x), np.nan)
+    if win < 1 or len(x) < win:
+        return out
+    s1 = c1[win:] - c1[:-win]
+    s2 = c2[win:] - c2[:-win]
+    mean = s1 / win
+    var = np.maximum(s2 / win - mean * mean, 0.0)
+    out[win - 1:] = (x[win - 1:] - mean) / (np.sqrt(var) + _EPS)
+    return out
+
+
+# ---------------- 单检测器触发（稀疏） ----------------
+
+def _vol_spike(data: Dict[str, np.ndarray], cache: dict, cfg: VolSpikeCfg) -> Tuple[np.ndarray, np.ndarray]:
+    key = ("vol_spike", cfg.win)
+    if key not in cache:
+        n = len(data["vol"])
+        rz = np.full(n, np.nan)
+        rz[1:] = _prefix_zscore(data, "ret", max(1, cfg.win - 1))
+        cache[key] = (rz, _prefix_zscore(data, "vol", cfg.win))
+    rz, vz = cache[key]
+    idx = np.flatnonzero((np.abs(rz) >= cfg.z) & (vz >= cfg.vol_z))
+    return idx, 70 + 10 * np.minimum(3, np.abs(rz[idx]) - cfg.z)
+
+
+def _realized_vol(data: Dict[str, np.ndarray], cache: dict,
+                  cfg: RealizedVolCfg) -> Tuple[np.ndarray, np.ndarray]:
+    key = ("realized_vol", float(cfg.gate_horizon), cfg.estimator, cfg.year_sec)
+    if key not in cache:
+        # 只需区间判断所用的尺度
+        one = RealizedVolCfg(horizons=[cfg.gate_horizon], gate_horizon=cfg.gate_horizon,
+                             estimator=cfg.estimator, year_sec=cfg.year_sec)
+        res = RealizedVolDetector(one).update_batch(data["logret"], data["ts"])
+        cache[key] = np.where(res["ready"], res["vol"], np.nan)
+    vol = cache[key]
+    idx = np.flatnonzero(vol > cfg.vmax)
+    return idx, 45 + 15 * np.minimum(3, vol[idx] / cfg.vmax - 1)
+
+
+def _spread_blowout(data: Dict[str, np.ndarray], cache: dict,
+                    cfg: SpreadBlowoutCfg) -> Tuple[np.ndarray, np.ndarray]:
+    key = ("spread_blowout", cfg.win)
+    if key not in cache:
+        cache[key] = np.abs(_prefix_zscore(data, "spread", cfg.win))
+    az = cache[key]
+    idx = np.flatnonzero(az >= cfg.z)
+    return idx, 65 + 8 * np.minimum(3, az[idx] - cfg.z)
+
+
+def _lead_lag(data: Dict[str, np.ndarray], cache: dict, cfg: LeadLagCfg) -> Tuple[np.ndarray, np.ndarray]:
+    key = ("lead_lag", cfg.win, cfg.stride, cfg.max_lag)
+    if key not in cache:
+        res = LeadLagDetector(cfg).update_batch(data["px_a"], data["px_b"], data["ts"])
+        cache[key] = (np.abs(res["lag"]), res["peak"])
+    alag, peak = cache[key]
+    idx = np.flatnonzero((alag >= cfg.min_lag) & (peak >= cfg.min_corr))
+    return idx, 55 + 5 * np.minimum(5, alag[idx] - cfg.min_lag)
+
+
+def _funding_shock(data: Dict[str, np.ndarray], cache: dict,
+                   cfg: FundingShockCfg) -> Tuple[np.ndarray, np.ndarray]:
+    key = ("funding_shock", cfg.win)
+    if key not in cache:
+        rate = data["rate"]
+        cache[key] = np.abs((rate - rolling_median(rate, cfg.win)) * 1e4)
+    d = cache[key]
+    idx = np.flatnonzero(d >= cfg.delta_bps)
+    return idx, 50 + 5 * np.minimum(5, d[idx] - cfg.delta_bps)
+
+
+_DETECTOR_FNS = {
+    "vol_spike": (VolSpikeCfg, _vol_spike),
+    "realized_vol": (RealizedVolCfg, _realized_vol),
+    "spread_blowout": (SpreadBlowoutCfg, _spread_blowout),
+    "lead_lag": (LeadLagCfg, _lead_lag),
+    "funding_shock": (FundingShockCfg, _funding_shock),
+}
+
+
+# ---------------- 组合评估 ----------------
+
+def _sparse_quantiles(values: np.ndarray, n: int, qs: Sequence[float]) -> List[float]:
+    """n 行中仅 values 非零（其余为 0）时的分位数，插值口径同 np.quantile(linear)"""
+    srt = np.sort(values)
+    zeros = n - len(srt)
+
+    def at(k: int) -> float:
+        return 0.0 if k < zeros else float(srt[k - zeros])
+
+    out = []
+    for q in qs:
+        pos = q * (n - 1)
+        lo = int(np.floor(pos))
+        hi = min(lo + 1, n - 1)
+        out.append(at(lo) + (at(hi) - at(lo)) * (pos - lo))
+    return out
+
+
+def _dedup_deltas(ts: np.ndarray, idx: np.ndarray, scores: np.ndarray, dedup_sec: float) -> np.ndarray:
+    """
+    单个检测器的告警分数 -> 衰减累加器实际记入的增量
+
+    与 _DecayedScore.add 相同：同一 dedup_sec 时间桶内的重复告警只补到桶内最高分。
+    """
+    if dedup_sec <= 0 or len(idx) < 2:
+        return scores
+    bucket = np.floor(ts[idx] / dedup_sec)
+    group = np.cumsum(np.r_[True, bucket[1:] != bucket[:-1]])
+    # 组号抬高量大于分数极差：整体 cummax 即各组组内 cummax
+    lo = scores.min()
+    lift = group * (scores.max() - lo + 1.0)
+    top = np.maximum.accumulate(scores - lo + lift) - lift + lo
+    prev = np.r_[0.0, top[:-1]]
+    return np.where(np.r_[True, group[1:] != group[:-1]], top, top - prev)
+
+
+def _level_series(ts: np.ndarray, rows: np.ndarray, row_score: np.ndarray,
+                  fires: List[Tuple[np.ndarray, np.ndarray]], cfg: dict) -> Tuple[np.ndarray, List[int]]:
+    """
+    逐行市场状态等级（0 normal / 1 tighten / 2 pause）及各行是否为一次触发，规则同 SentinelEngine._tick：
+
+    - 默认：总分 = 本行告警加权和；达到阈值且距上次触发不足 cooldown_sec 的行压为 normal
+    - decay.enabled：总分 = 各检测器衰减分数之和（同桶去重），等级直接由总分给出，
+      进入 tighten/pause（与上一行等级不同）记为一次触发
+    """
+    n = len(ts)
+    thresholds = cfg.get("score_thresholds", {"tighten": 60, "pause": 80})
+    tighten, pause = thresholds.get("tighten", 60), thresholds.get("pause", 80)
+    level = np.zeros(n, dtype=np.int8)
+    decay = cfg.get("decay", {})
+    if decay.get("enabled", False):
+        tau = float(decay.get("half_life_sec", 60.0)) / np.log(2)
+        dedup = float(decay.get("dedup_sec", 5.0))
+        x = np.zeros(n)
+        for idx, s in fires:
+            np.add.at(x, idx, _dedup_deltas(ts, idx, s, dedup))
+        total = decayed_cumsum(x, ts, tau, 0.0, float(ts[0]) if n else None)
+        level[total >= tighten] = 1
+        level[total >= pause] = 2
+        fired = list(np.flatnonzero((level > 0) & (level != np.r_[0, level[:-1]])))
+        return level, fired
+
+    cand = np.zeros(len(rows), dtype=np.int8)
+    cand[row_score >= tighten] = 1
+    cand[row_score >= pause] = 2
+    cooldown = int(cfg.get("cooldown_sec", 300))
+    fired = []
+    last_fire = 0
+    for k in np.flatnonzero(cand):
+        now = int(ts[rows[k]])
+        if now - last_fire >= cooldown:
+            last_fire = now
+            fired.append(int(rows[k]))
+            level[rows[k]] = cand[k]
+    return level, fired
+
+
+def evaluate(data: Dict[str, np.ndarray], cfg: dict, quantiles: Sequence[float] = DEFAULT_QUANTILES,
+             cache: Optional[dict] = None) -> Dict[str, Any]:
+    """
+    在预计算数据上评估一组配置
+
+    tighten/pause 的持续时间占比按逐行等级序列（见 _level_series）统计：
+    每行的等级保持到下一行的时间戳。
+    """
+    cache = {} if cache is None else cache
+    ts = data["ts"]
+    n = len(ts)
+    det_cfg = cfg.get("detectors", {})
+    weights = cfg.get("weights", {})
+
+    # 各检测器稀疏触发 -> 加权后按行累加
+    idx_parts, score_parts, by_detector = [], [], {}
+    for name in SWEEP_DETECTORS:
+        cfg_cls, fn = _DETECTOR_FNS[name]
+        dcfg = cfg_cls(**det_cfg.get(name, {}))
+        if not getattr(dcfg, "enabled", True):
+            # 未开启的检测器引擎不运行，标定同样不计入
+            by_detector[name] = 0
+            continue
+        idx, s = fn(data, cache, dcfg)
+        idx_parts.append(idx)
+        score_parts.append(s * float(weights.get(name, 1.0)))
+        by_detector[name] = int(len(idx))
+    all_idx = np.concatenate(idx_parts)
+    rows, inv = np.unique(all_idx, return_inverse=True)
+    row_score = np.bincount(inv, weights=np.concatenate(score_parts), minlength=len(rows))
+
+    # 逐行等级序列；每行的等级保持到下一行
+    level, fired = _level_series(ts, rows, row_score, list(zip(idx_parts, score_parts)), cfg)
+    fire_lv = [int(level[i]) for i in fired]
+    span = float(ts[-1] - ts[0]) if n > 1 else 0.0
+    dur = np.diff(ts) if n > 1 else np.zeros(0)
+    held = {lv: float(dur[level[:-1] == lv].sum()) for lv in (1, 2)}
+
+    q = _sparse_quantiles(row_score, n, quantiles) if n else [0.0] * len(quantiles)
+    days = span / 86400 if span > 0 else float("nan")
+    return {
+        "rows": n,
+        "alerts": int(len(all_idx)),
+        "alert_rows": int(len(rows)),
+        "alert_rate": len(rows) / n if n else 0.0,
+        "alerts_per_day": len(all_idx) / days,
+        "by_detector": by_detector,
+        "score_q": {f"p{100 * qq:g}": v for qq, v in zip(quantiles, q)},
+        "tighten": fire_lv.count(1),
+        "pause": fire_lv.count(2),
+        "tighten_frac": held[1] / span if span else 0.0,
+        "pause_frac": held[2] / span if span else 0.0,
+    }
+
+
+# ---------------- 进程池 ----------------
+
+_WORKER_DATA: Optional[Dict[str, np.ndarray]] = None
+_WORKER_SHM: Optional[SharedMemory] = None
+
+
+def _pack(data: Dict[str, np.ndarray]) -> Tuple[SharedMemory, List[Tuple[str, int, int]]]:
+    """把预计算数组拷入一块共享内存，返回 (共享内存, [(键, 偏移, 长度)])"""
+    layout, offset = [], 0
+    for key, arr in data.items():
+        layout.append((key, offset, len(arr)))
+        offset += arr.size * 8
+    shm = SharedMemory(create=True, size=max(offset, 8))
+    for (key, off, length) in layout:
+        np.ndarray((length,), dtype=float, buffer=shm.buf, offset=off)[:] = data[key]
+    return shm, layout
+
+
+def _attach(name: str, layout: List[Tuple[str, int, int]]) -> None:
+    """工作进程初始化：附着共享内存（不向 resource_tracker 登记，段由主进程 unlink），建立只读视图"""
+    global _WORKER_DATA, _WORKER_SHM
+    _WORKER_SHM = attach_shared_memory(name)
+    _WORKER_DATA = {}
+    for key, off, length in layout:
+        arr = np.ndarray((length,), dtype=float, buffer=_WORKER_SHM.buf, offset=off)
+        arr.flags.writeable = False
+        _WORKER_DATA[key] = arr
+
+
+def _run_chunk(base_cfg: dict, chunk: List[Dict[str, Any]], quantiles: Sequence[float]) -> List[dict]:
+    """工作进程：评估一块组合（同块组合共享检测器中间结果缓存）"""
+    cache: dict = {}
+    return [evaluate(_WORKER_DATA, apply_params(base_cfg, p), quantiles, cache) for p in chunk]
+
+
+def _detector_key(params: Dict[str, Any]) -> tuple:
+    """组合中决定检测器中间结果的部分（窗口长度），用于排序分块"""
+    return tuple(sorted((k, v) for k, v in params.items() if k.endswith((".win", ".stride", ".max_lag", ".gate_horizon", ".estimator"))))
+
+
+def calibrate(columns: Dict[str, np.ndarray], grid: Dict[str, Sequence[Any]],
+              base_cfg: Optional[dict] = None, quantiles: Sequence[float] = DEFAULT_QUANTILES,
+              workers: Optional[int] = None, chunk_size: int = 32) -> List[Dict[str, Any]]:
+    """
+    在历史数据上扫描参数网格
+
+    Args:
+        columns: 历史列（px_a, px_b, vol_a, next_rate_a, ts），如 backfill.load_cache 的结果
+        grid: 参数网格，见 expand_grid
+        base_cfg: 基础 sentinel 配置（网格中未出现的参数取自此处）
+        quantiles: 输出的总分数分位
+        workers: 进程数；0/1 时在当前进程顺序执行，None 为 CPU 核数
+        chunk_size: 每个任务包含的组合数
+
+    Returns:
+        每个组合一项：{"params": 组合参数, ...evaluate 的指标}，顺序与 expand_grid 一致
+    """
+    base_cfg = base_cfg or {}
+    combos = expand_grid(grid)
+    data = precompute(columns["px_a"], columns["px_b"], columns["vol_a"],
+                      columns["next_rate_a"], columns["ts"])
+
+    # 窗口相同的组合相邻，使同一任务内检测器中间结果可复用
+    order = sorted(range(len(combos)), key=lambda i: _detector_key(combos[i]))
+    chunks = [order[i:i + chunk_size] for i in range(0, len(order), chunk_size)]
+    results: List[Optional[dict]] = [None] * len(combos)
+
+    if workers is not None and workers <= 1:
+        for chunk in chunks:
+            cache: dict = {}
+            for i in chunk:
+                results[i] = evaluate(data, apply_params(base_cfg, combos[i]), quantiles, cache)
+    else:
+        shm, layout = _pack(data)
+        try:
+            with ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"),
+                                     initializer=_attach, initargs=(shm.name, layout)) as pool:
+                futures = [
+                    pool.submit(_run_chunk, base_cfg, [combos[i] for i in chunk], tuple(quantiles))
+                    for chunk in chunks
+                ]
+                for chunk, fut in zip(chunks, futures):
+                    for i, res in zip(chunk, fut.result()):
+                        results[i] = res
+        finally:
+            shm.close()
+            shm.unlink()
+
+    logger.info(f"Sentinel calibration evaluated {len(combos)} combinations over {len(data['ts'])} rows")
+    return [{"params": combos[i], **results[i]} for i in range(len(combos))]
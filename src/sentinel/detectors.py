@@ -4,19 +4,57 @@ Anomaly Detection Module
 
 实现各类市场异常检测器：
 - 价格/成交量异常波动检测
+- 已实现波动率区间检测（与价格异常检测共用收益率环）
 - 跨所价差异常检测
+- 跨所领先-滞后检测（FFT 互相关）
 - 资金费突变检测
-- 盘口不均衡检测（占位）
-- 链上鲸鱼活动检测（占位）
-- 新闻事件检测（占位）
+- 盘口不均衡检测
+- 链上鲸鱼活动检测
+- 新闻事件检测
+- 行情源停滞/延迟异常检测
+- 强平/持仓量冲击检测
+- 成交流毒性（VPIN）检测
 """
 
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterator, List, Tuple
+import math
+import threading
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from collections import deque
-from time import time
+from time import perf_counter, time
+
+from .book import BookSide
+from .textmatch import KeywordAutomaton
+from .watchlist import AddressIndex
+from .instrument import DecayingHistogram
+from .rolling import (
+    RollingStats, RollingQuantile, TimeWindowStats, TimeWindowQuantile,
+    rolling_zscore, rolling_median, decayed_cumsum, _CHUNK_ELEMS,
+)
+
+
+def _stats_window(win: int, win_sec: Optional[float]):
+    """按配置选择计数窗口（最近 win 个样本）或事件时间窗口（最近 win_sec 秒）"""
+    return TimeWindowStats(win_sec) if win_sec else RollingStats(win)
+
+
+def _sub(st: Dict[str, np.ndarray], prefix: str) -> Dict[str, np.ndarray]:
+    """取出带前缀的子状态并去掉前缀"""
+    return {k[len(prefix):]: v for k, v in st.items() if k.startswith(prefix)}
+
+
+def _check_count_window(cfg) -> None:
+    """
+    检测器 update_batch 只支持计数窗口（滑窗视图按样本数切分）。
+
+    配置了 win_sec 的检测器只能逐行 update；SentinelEngine.update_batch 遇到
+    时间窗口会自动改走逐行回放，不会调用到这里。
+    """
+    if getattr(cfg, "win_sec", None):
+        raise ValueError("update_batch supports count-based windows only (win_sec is set)")
 
 
 @dataclass
@@ -25,34 +63,65 @@ class VolSpikeCfg:
     win: int = 120
     z: float = 4.0
     vol_z: float = 2.0
+    win_sec: Optional[float] = None   # 设置后按事件时间窗口（秒）统计，忽略 win
 
 
 class VolSpikeDetector:
     """价格/成交量异常波动检测：|ret| 的 z 分数 + 成交量 z 分数同时超阈。"""
     
+    # 调度声明（逐样本窗口：每个 tick 都是新输入）
+    INPUTS = ("tick",)
+    CADENCE_SEC = 0.0
+    
     def __init__(self, cfg: VolSpikeCfg):
         self.cfg = cfg
-        self.prices = deque(maxlen=cfg.win)
-        self.volumes = deque(maxlen=cfg.win)
+        # win 个价格对应 win-1 个对数收益率
+        self.returns = _stats_window(max(1, cfg.win - 1), cfg.win_sec)
+        self.volumes = _stats_window(cfg.win, cfg.win_sec)
+        self._last_logp: Optional[float] = None
+        # 本 tick 推入 returns 环的收益率（无则为 None），供 RealizedVolDetector 读取
+        self.last_ret: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        """窗口是否已预热完成"""
+        return self.returns.full and self.volumes.full
+
+    def state(self) -> Dict[str, np.ndarray]:
+        """导出检测器状态（扁平键 -> 数组，用于快照）"""
+        st = {f"returns.{k}": v for k, v in self.returns.state().items()}
+        st.update({f"volumes.{k}": v for k, v in self.volumes.state().items()})
+        st["last_logp"] = np.array(np.nan if self._last_logp is None else self._last_logp)
+        return st
+
+    def load_state(self, st: Dict[str, np.ndarray]) -> None:
+        """从快照恢复检测器状态"""
+        self.returns.load_state(_sub(st, "returns."))
+        self.volumes.load_state(_sub(st, "volumes."))
+        last = float(st["last_logp"])
+        self._last_logp = None if math.isnan(last) else last
 
-    def update(self, px: float, vol: float) -> Optional[dict]:
-        """更新价格和成交量数据，检测异常波动"""
-        self.prices.append(px)
-        self.volumes.append(vol)
+    def update(self, px: float, vol: float, ts: Optional[float] = None) -> Optional[dict]:
+        """更新价格和成交量数据，检测异常波动；ts 为事件时间（秒），缺省用本地时间"""
+        if ts is None:
+            ts = time()
+        logp = math.log(px)
+        if self._last_logp is not None:
+            self.last_ret = logp - self._last_logp
+            self.returns.push(self.last_ret, ts)
+        else:
+            self.last_ret = None
+        self._last_logp = logp
+        self.volumes.push(vol, ts)
         
-        if len(self.prices) < self.cfg.win:
+        if not self.volumes.full or not self.returns.full:
             return None
             
-        # 计算价格收益率
-        p = np.array(self.prices)
-        r = np.diff(np.log(p))
-        
         # 计算收益率z分数
-        rz = (r[-1] - r.mean()) / (r.std(ddof=0) + 1e-12)
+        rz = self.returns.zscore()
         
         # 计算成交量z分数
-        v = np.array(self.volumes)
-        vz = (v[-1] - v.mean()) / (v.std(ddof=0) + 1e-12)
+        vz = self.volumes.zscore()
         
         # 检测异常：收益率z分数和成交量z分数同时超阈值
         if abs(rz) >= self.cfg.z and vz >= self.cfg.vol_z:
@@ -61,7 +130,7 @@ class VolSpikeDetector:
                 "name": "vol_spike",
                 "severity": "high",
                 "score": score,
-                "ts": int(time()),
+                "ts": int(ts),
                 "detail": {
                     "rz": float(rz),
                     "vz": float(vz),
@@ -71,33 +140,294 @@ class VolSpikeDetector:
             }
         return None
 
+    def update_batch(self, px: np.ndarray, vol: np.ndarray) -> Dict[str, np.ndarray]:
+        """批量版 update：逐行结果与循环调用 update 一致，并推进检测器状态（仅计数窗口）"""
+        _check_count_window(self.cfg)
+        px = np.asarray(px, dtype=float)
+        vol = np.asarray(vol, dtype=float)
+        n = len(px)
+        logp = np.log(px)
+        had_last = self._last_logp is not None
+        r_new = np.diff(logp, prepend=self._last_logp) if had_last else np.diff(logp)
+        r_prev = self.returns.values()
+        v_prev = self.volumes.values()
+        r_all = np.concatenate([r_prev, r_new])
+        v_all = np.concatenate([v_prev, vol])
+        
+        # 第 i 行对应的最新收益率在 r_all 中的位置
+        r_idx = len(r_prev) + np.arange(n) - (0 if had_last else 1)
+        rz_all = rolling_zscore(r_all, self.returns.size)
+        rz = np.full(n, np.nan)
+        ok = r_idx >= 0
+        rz[ok] = rz_all[r_idx[ok]]
+        vz = rolling_zscore(v_all, self.volumes.size)[len(v_prev):]
+        
+        fired = (np.abs(rz) >= self.cfg.z) & (vz >= self.cfg.vol_z)
+        score = 70 + 10 * np.minimum(3, np.abs(rz) - self.cfg.z)
+        
+        # 推进状态：窗口保留末尾样本
+        if n:
+            self.returns.reset()
+            self.returns.extend(r_all[-self.returns.size:])
+            self.volumes.reset()
+            self.volumes.extend(v_all[-self.volumes.size:])
+            self._last_logp = float(logp[-1])
+        # 每行对应的收益率（首行无上一价格时为 nan）
+        ret = r_new if had_last else np.concatenate([[np.nan], r_new])[:n]
+        if n:
+            self.last_ret = None if np.isnan(ret[-1]) else float(ret[-1])
+        return {"fired": fired, "score": score, "rz": rz, "vz": vz, "ret": ret}
+
+
+@dataclass
+class RealizedVolCfg:
+    """已实现波动率检测配置（年化波动率）"""
+    enabled: bool = False              # 显式开启才运行并计分（单独即可推到 tighten/pause）
+    horizons: list = None              # 估计时间尺度（秒），默认 1m/5m/1h
+    vmax: float = 2.5                  # 超过即告警
+    gate_horizon: float = 300          # 用于告警判断的时间尺度
+    estimator: str = "bipower"         # "ewma" 或 "bipower"（对单次跳跃不敏感）
+    year_sec: float = 365 * 86400      # 年化秒数（永续 7x24）
+
+    def __post_init__(self):
+        if self.horizons is None:
+            self.horizons = [60, 300, 3600]
+        if self.gate_horizon not in self.horizons:
+            self.horizons = sorted(list(self.horizons) + [self.gate_horizon])
+        if self.estimator not in ("ewma", "bipower"):
+            raise ValueError(f"unknown estimator: {self.estimator}")
+
+
+class RealizedVolDetector:
+    """
+    多时间尺度已实现波动率：按事件时间指数衰减的 EWMA 与 bipower 方差，O(1)/tick
+    
+    不保存价格副本，每 tick 读取 VolSpikeDetector 刚推入收益率环的收益率。
+    每个尺度 h 维护衰减和 S=Σr²·w、B=(π/2)Σ|r_j||r_{j-1}|·w、T=Σdt·w（w=exp(-Δt/h)），
+    年化波动率 = sqrt(S/T · year_sec)（bipower 用 B）。
+    """
+    
+    # 调度声明（读取 vol_detector 最新收益率，逐 tick 衰减累积）
+    INPUTS = ("tick",)
+    CADENCE_SEC = 0.0
+    
+    def __init__(self, cfg: RealizedVolCfg, source: Optional[VolSpikeDetector] = None):
+        self.cfg = cfg
+        self.source = source
+        self.horizons = [float(h) for h in cfg.horizons]
+        self._gate = self.horizons.index(float(cfg.gate_horizon))
+        self.reset()
+
+    def reset(self) -> None:
+        k = len(self.horizons)
+        self._s = [0.0] * k
+        self._b = [0.0] * k
+        self._t = [0.0] * k
+        self._prev_abs: Optional[float] = None
+        self._last_ts: Optional[float] = None
+        self._first_ts: Optional[float] = None
+
+    @property
+    def ready(self) -> bool:
+        """告警判断所用尺度是否已积累足够时长"""
+        return self._ready(self._gate)
+
+    def _ready(self, k: int) -> bool:
+        return (self._first_ts is not None and self._last_ts is not None
+                and self._last_ts - self._first_ts >= self.horizons[k])
+
+    def vol(self, horizon: Optional[float] = None, estimator: Optional[str] = None) -> float:
+        """年化波动率估计；未积累任何样本时为 nan"""
+        k = self._gate if horizon is None else self.horizons.index(float(horizon))
+        acc = self._b if (estimator or self.cfg.estimator) == "bipower" else self._s
+        if self._t[k] <= 0:
+            return float("nan")
+        return math.sqrt(acc[k] / self._t[k] * self.cfg.year_sec)
+
+    def estimates(self) -> Dict[str, Any]:
+        """各尺度、两种估计的年化波动率与就绪状态"""
+        return {
+            f"{h:g}s": {
+                "ewma": self.vol(h, "ewma"),
+                "bipower": self.vol(h, "bipower"),
+                "ready": self._ready(k),
+            }
+            for k, h in enumerate(self.horizons)
+        }
+
+    def state(self) -> Dict[str, np.ndarray]:
+        """导出检测器状态（扁平键 -> 数组，用于快照）"""
+        nan = np.nan
+        return {
+            "horizons": np.array(self.horizons),
+            "s": np.array(self._s),
+            "b": np.array(self._b),
+            "t": np.array(self._t),
+            "prev_abs": np.array(nan if self._prev_abs is None else self._prev_abs),
+            "last_ts": np.array(nan if self._last_ts is None else self._last_ts),
+            "first_ts": np.array(nan if self._first_ts is None else self._first_ts),
+        }
+
+    def load_state(self, st: Dict[str, np.ndarray]) -> None:
+        """从快照恢复检测器状态（尺度配置不一致或缺失时从头积累）"""
+        self.reset()
+        if "horizons" not in st or list(np.asarray(st["horizons"], dtype=float)) != self.horizons:
+            return
+        self._s = [float(v) for v in st["s"]]
+        self._b = [float(v) for v in st["b"]]
+        self._t = [float(v) for v in st["t"]]
+        opt = {k: float(st[k]) for k in ("prev_abs", "last_ts", "first_ts")}
+        self._prev_abs, self._last_ts, self._first_ts = (
+            None if math.isnan(v) else v for v in opt.values()
+        )
+
+    def _alert(self, v: float, ts: float) -> dict:
+        return {
+            "name": "realized_vol",
+            "severity": "warn",
+            "score": 45 + 15 * min(3, v / self.cfg.vmax - 1),
+            "ts": int(ts),
+            "detail": {
+                "vol": v,
+                "horizon_sec": self.horizons[self._gate],
+                "estimator": self.cfg.estimator,
+                "vmax": self.cfg.vmax,
+            }
+        }
+
+    def update(self, ts: Optional[float] = None, ret: Optional[float] = None) -> Optional[dict]:
+        """
+        推进一个 tick；ret 缺省取 source.last_ret（VolSpikeDetector.update 之后调用）
+        
+        年化波动率超过 vmax 时告警。
+        """
+        if ts is None:
+            ts = time()
+        if ret is None and self.source is not None:
+            ret = self.source.last_ret
+        last_ts = self._last_ts
+        self._last_ts = ts
+        if last_ts is None:
+            return None
+        dt = ts - last_ts
+        s, b, t = self._s, self._b, self._t
+        if ret is None:
+            # 无收益率的 tick 只按经过的时间衰减，不累加（与 update_batch 一致）
+            for k, h in enumerate(self.horizons):
+                d = math.exp(-dt / h)
+                s[k] *= d
+                b[k] *= d
+                t[k] *= d
+            return None
+        if self._first_ts is None:
+            self._first_ts = last_ts
+        
+        a = abs(ret)
+        bp = 0.5 * math.pi * a * self._prev_abs if self._prev_abs is not None else 0.0
+        self._prev_abs = a
+        r2 = ret * ret
+        for k, h in enumerate(self.horizons):
+            d = math.exp(-dt / h)
+            s[k] = s[k] * d + r2
+            b[k] = b[k] * d + bp
+            t[k] = t[k] * d + dt
+        
+        if not self._ready(self._gate):
+            return None
+        v = self.vol()
+        if v > self.cfg.vmax:
+            return self._alert(v, ts)
+        return None
+
+    def update_batch(self, ret: np.ndarray, ts: np.ndarray) -> Dict[str, np.ndarray]:
+        """批量版 update：ret 为每行收益率（无则 nan，如 VolSpikeDetector.update_batch 的 "ret"）"""
+        ret = np.asarray(ret, dtype=float)
+        ts = np.asarray(ts, dtype=float)
+        n = len(ts)
+        vol = np.full(n, np.nan)
+        ready = np.zeros(n, dtype=bool)
+        
+        has = ~np.isnan(ret)
+        # 只有在已知上一 tick 时间时收益率才计入（与 update 一致）
+        prev_ts = np.concatenate([[np.nan if self._last_ts is None else self._last_ts], ts[:-1]])
+        has &= ~np.isnan(prev_ts)
+        idx = np.flatnonzero(has)
+        if len(idx):
+            r = ret[idx]
+            t_r = ts[idx]
+            dt = t_r - prev_ts[idx]
+            a = np.abs(r)
+            prev_a = np.concatenate([[np.nan if self._prev_abs is None else self._prev_abs], a[:-1]])
+            bp = np.where(np.isnan(prev_a), 0.0, 0.5 * np.pi * a * np.nan_to_num(prev_a))
+            t0 = self._last_ts if self._last_ts is not None else float(t_r[0])
+            gate_acc = None
+            for k, h in enumerate(self.horizons):
+                s = decayed_cumsum(r * r, t_r, h, self._s[k], t0)
+                b = decayed_cumsum(bp, t_r, h, self._b[k], t0)
+                tt = decayed_cumsum(dt, t_r, h, self._t[k], t0)
+                self._s[k], self._b[k], self._t[k] = float(s[-1]), float(b[-1]), float(tt[-1])
+                if k == self._gate:
+                    gate_acc = (b if self.cfg.estimator == "bipower" else s, tt)
+            acc, tt = gate_acc
+            with np.errstate(divide="ignore", invalid="ignore"):
+                vol[idx] = np.where(tt > 0, np.sqrt(acc / tt * self.cfg.year_sec), np.nan)
+            if self._first_ts is None:
+                self._first_ts = float(prev_ts[idx[0]])
+            ready[idx] = t_r - self._first_ts >= self.horizons[self._gate]
+            self._prev_abs = float(a[-1])
+        if n:
+            self._last_ts = float(ts[-1])
+        
+        fired = ready & (vol > self.cfg.vmax)
+        score = 45 + 15 * np.minimum(3, vol / self.cfg.vmax - 1)
+        return {"fired": fired, "score": score, "vol": vol, "ready": ready}
+
 
 @dataclass
 class SpreadBlowoutCfg:
     """跨所价差异常检测配置"""
     win: int = 60
     z: float = 3.5
+    win_sec: Optional[float] = None   # 设置后按事件时间窗口（秒）统计，忽略 win
 
 
 class SpreadBlowoutDetector:
     """跨所价差异常：spread z-score 超阈。"""
     
+    # 调度声明（逐样本窗口）
+    INPUTS = ("tick",)
+    CADENCE_SEC = 0.0
+    
     def __init__(self, cfg: SpreadBlowoutCfg):
         self.cfg = cfg
-        self.spreads = deque(maxlen=cfg.win)
+        self.spreads = _stats_window(cfg.win, cfg.win_sec)
+
+    @property
+    def ready(self) -> bool:
+        """窗口是否已预热完成"""
+        return self.spreads.full
 
-    def update(self, px_a: float, px_b: float) -> Optional[dict]:
-        """更新两个交易所价格，检测价差异常"""
+    def state(self) -> Dict[str, np.ndarray]:
+        """导出检测器状态（扁平键 -> 数组，用于快照）"""
+        return {f"spreads.{k}": v for k, v in self.spreads.state().items()}
+
+    def load_state(self, st: Dict[str, np.ndarray]) -> None:
+        """从快照恢复检测器状态"""
+        self.spreads.load_state(_sub(st, "spreads."))
+
+    def update(self, px_a: float, px_b: float, ts: Optional[float] = None) -> Optional[dict]:
+        """更新两个交易所价格，检测价差异常；ts 为事件时间（秒），缺省用本地时间"""
+        if ts is None:
+            ts = time()
         mid = 0.5 * (px_a + px_b)
         sp = (px_a - px_b) / mid
-        self.spreads.append(sp)
+        self.spreads.push(sp, ts)
         
-        if len(self.spreads) < self.cfg.win:
+        if not self.spreads.full:
             return None
             
         # 计算价差z分数
-        x = np.array(self.spreads)
-        z = (x[-1] - x.mean()) / (x.std(ddof=0) + 1e-12)
+        z = self.spreads.zscore()
         
         if abs(z) >= self.cfg.z:
             score = 65 + 8 * min(3, abs(z) - self.cfg.z)
@@ -105,7 +435,7 @@ class SpreadBlowoutDetector:
                 "name": "spread_blowout",
                 "severity": "high",
                 "score": score,
-                "ts": int(time()),
+                "ts": int(ts),
                 "detail": {
                     "z": float(z),
                     "spread": float(sp),
@@ -115,30 +445,301 @@ class SpreadBlowoutDetector:
             }
         return None
 
+    def update_batch(self, px_a: np.ndarray, px_b: np.ndarray) -> Dict[str, np.ndarray]:
+        """批量版 update：逐行结果与循环调用 update 一致，并推进检测器状态（仅计数窗口）"""
+        _check_count_window(self.cfg)
+        px_a = np.asarray(px_a, dtype=float)
+        px_b = np.asarray(px_b, dtype=float)
+        sp = (px_a - px_b) / (0.5 * (px_a + px_b))
+        prev = self.spreads.values()
+        x_all = np.concatenate([prev, sp])
+        z = rolling_zscore(x_all, self.spreads.size)[len(prev):]
+        
+        fired = np.abs(z) >= self.cfg.z
+        score = 65 + 8 * np.minimum(3, np.abs(z) - self.cfg.z)
+        
+        if len(sp):
+            self.spreads.reset()
+            self.spreads.extend(x_all[-self.spreads.size:])
+        return {"fired": fired, "score": score, "z": z, "spread": sp}
+
+
+@dataclass
+class LeadLagCfg:
+    """跨所领先-滞后检测配置"""
+    enabled: bool = False   # 显式开启才运行并计分（滞后稳定的行情源预热后几乎每行告警）
+    win: int = 256          # 互相关窗口（收益率个数）
+    stride: int = 32        # 每 stride 个 tick 重新计算一次
+    max_lag: int = 20       # 搜索的最大滞后（tick）
+    min_lag: int = 3        # 峰值滞后达到该值才告警
+    min_corr: float = 0.3   # 峰值相关系数下限（过滤无关噪声）
+
+
+def _xcorr_peak(a: np.ndarray, b: np.ndarray, max_lag: int, nfft: int):
+    """
+    逐行 FFT 互相关：c[k] = Σ a[t]·b[t+k] / sqrt(Σa² Σb²)，k ∈ [-max_lag, max_lag]
+    
+    a, b 为 (m, win) 收益率窗口，返回每行 (峰值滞后, 峰值相关, 零滞后相关)。
+    k > 0 表示 b 跟随 a（a 领先）。
+    """
+    a = a - a.mean(axis=1, keepdims=True)
+    b = b - b.mean(axis=1, keepdims=True)
+    c = np.fft.irfft(np.conj(np.fft.rfft(a, nfft)) * np.fft.rfft(b, nfft), nfft)
+    # 重排为 k = -max_lag .. max_lag
+    c = np.concatenate([c[:, nfft - max_lag:], c[:, :max_lag + 1]], axis=1)
+    norm = np.sqrt((a * a).sum(axis=1) * (b * b).sum(axis=1))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        c = np.where(norm[:, None] > 0, c / norm[:, None], 0.0)
+    best = np.argmax(c, axis=1)
+    rows = np.arange(len(c))
+    return best - max_lag, c[rows, best], c[:, max_lag]
+
+
+class LeadLagDetector:
+    """
+    跨所领先-滞后：两所收益率的滚动 FFT 互相关峰值偏离零滞后
+    
+    每 stride 个 tick 重算一次（O(win·log win)），期间沿用上次结果；
+    峰值滞后 >= min_lag 说明一方报价明显落后（陈旧报价/对冲风险）。
+    """
+    
+    # 调度声明（逐样本环形缓冲（内部按 stride 重算））
+    INPUTS = ("tick",)
+    CADENCE_SEC = 0.0
+    
+    def __init__(self, cfg: LeadLagCfg):
+        if cfg.max_lag >= cfg.win:
+            raise ValueError("max_lag must be < win")
+        self.cfg = cfg
+        self.nfft = 1 << int(2 * cfg.win - 1).bit_length()
+        self._ra = np.zeros(cfg.win)
+        self._rb = np.zeros(cfg.win)
+        self._rt = np.zeros(cfg.win)
+        self.reset()
+
+    def reset(self) -> None:
+        self._pos = 0
+        self._count = 0
+        self._pushed = 0
+        self._last_px: Optional[Tuple[float, float]] = None
+        # 最近一次计算结果 (滞后tick, 峰值相关, 零滞后相关, 滞后秒数)
+        self._last: Optional[Tuple[int, float, float, float]] = None
+
+    @property
+    def ready(self) -> bool:
+        """窗口是否已预热完成"""
+        return self._count >= self.cfg.win
+
+    def _ordered(self, ring: np.ndarray) -> np.ndarray:
+        """按时间顺序返回窗口内样本"""
+        if self._count < self.cfg.win:
+            return ring[:self._count].copy()
+        return np.concatenate([ring[self._pos:], ring[:self._pos]])
+
+    def state(self) -> Dict[str, np.ndarray]:
+        """导出检测器状态（扁平键 -> 数组，用于快照）"""
+        nan = np.nan
+        return {
+            "ret_a": self._ordered(self._ra),
+            "ret_b": self._ordered(self._rb),
+            "ret_ts": self._ordered(self._rt),
+            "pushed": np.array(self._pushed),
+            "last_px": np.array(self._last_px if self._last_px else (nan, nan)),
+            "last": np.array(self._last if self._last else (nan, nan, nan, nan)),
+        }
+
+    def load_state(self, st: Dict[str, np.ndarray]) -> None:
+        """从快照恢复检测器状态"""
+        self.reset()
+        if "ret_a" not in st:
+            return
+        for a, b, t in zip(st["ret_a"], st["ret_b"], st["ret_ts"]):
+            self._push(float(a), float(b), float(t))
+        self._pushed = int(st["pushed"])
+        px = np.asarray(st["last_px"], dtype=float)
+        self._last_px = None if np.isnan(px).any() else (float(px[0]), float(px[1]))
+        last = np.asarray(st["last"], dtype=float)
+        self._last = None if np.isnan(last).any() else (int(last[0]), float(last[1]), float(last[2]), float(last[3]))
+
+    def _push(self, ra: float, rb: float, ts: float) -> None:
+        p = self._pos
+        self._ra[p] = ra
+        self._rb[p] = rb
+        self._rt[p] = ts
+        self._pos = p + 1 if p + 1 < self.cfg.win else 0
+        if self._count < self.cfg.win:
+            self._count += 1
+        self._pushed += 1
+
+    def _fires(self, lag: int, peak: float) -> bool:
+        return abs(lag) >= self.cfg.min_lag and peak >= self.cfg.min_corr
+
+    def _alert(self, ts: float) -> Optional[dict]:
+        if self._last is None:
+            return None
+        lag, peak, corr0, lag_sec = self._last
+        if not self._fires(lag, peak):
+            return None
+        return {
+            "name": "lead_lag",
+            "severity": "warn",
+            "score": 55 + 5 * min(5, abs(lag) - self.cfg.min_lag),
+            "ts": int(ts),
+            "detail": {
+                "lag_ticks": lag,
+                "lag_sec": lag_sec,
+                "leader": "a" if lag > 0 else "b",
+                "peak_corr": peak,
+                "corr_at_0": corr0,
+            }
+        }
+
+    def update(self, px_a: float, px_b: float, ts: Optional[float] = None) -> Optional[dict]:
+        """更新两所价格；每 stride 个收益率重算互相关，其余 tick 沿用上次结果"""
+        if ts is None:
+            ts = time()
+        last = self._last_px
+        self._last_px = (px_a, px_b)
+        if last is None:
+            return self._alert(ts)
+        self._push(math.log(px_a / last[0]), math.log(px_b / last[1]), ts)
+        
+        if self.ready and self._pushed % self.cfg.stride == 0:
+            t = self._ordered(self._rt)
+            lag, peak, corr0 = _xcorr_peak(self._ordered(self._ra)[None, :], self._ordered(self._rb)[None, :],
+                                           self.cfg.max_lag, self.nfft)
+            dt = (t[-1] - t[0]) / (len(t) - 1)
+            self._last = (int(lag[0]), float(peak[0]), float(corr0[0]), float(lag[0] * dt))
+        return self._alert(ts)
+
+    def update_batch(self, px_a: np.ndarray, px_b: np.ndarray, ts: np.ndarray) -> Dict[str, np.ndarray]:
+        """批量版 update：逐行结果与循环调用 update 一致，并推进检测器状态"""
+        px_a = np.asarray(px_a, dtype=float)
+        px_b = np.asarray(px_b, dtype=float)
+        ts = np.asarray(ts, dtype=float)
+        n = len(ts)
+        win, stride = self.cfg.win, self.cfg.stride
+        
+        la, lb = np.log(px_a), np.log(px_b)
+        if self._last_px is not None:
+            ra = np.diff(la, prepend=math.log(self._last_px[0]))
+            rb = np.diff(lb, prepend=math.log(self._last_px[1]))
+            rows = np.arange(n)
+        else:
+            ra, rb = np.diff(la), np.diff(lb)
+            rows = np.arange(1, n)
+        prev = (self._ordered(self._ra), self._ordered(self._rb), self._ordered(self._rt))
+        k0 = len(prev[0])
+        all_a = np.concatenate([prev[0], ra])
+        all_b = np.concatenate([prev[1], rb])
+        all_t = np.concatenate([prev[2], ts[rows]])
+        
+        # 每个新收益率推入后的累计序号与窗口样本数，定出需要重算的位置
+        pushed = self._pushed + np.arange(1, len(ra) + 1)
+        count = np.minimum(k0 + np.arange(1, len(ra) + 1), win)
+        calc = np.flatnonzero((count >= win) & (pushed % stride == 0))
+        
+        lag = np.zeros(len(calc), dtype=np.int64)
+        peak = np.zeros(len(calc))
+        corr0 = np.zeros(len(calc))
+        lag_sec = np.zeros(len(calc))
+        if len(calc):
+            ends = k0 + calc                   # 窗口末样本在 all_* 中的位置
+            wa = sliding_window_view(all_a, win)
+            wb = sliding_window_view(all_b, win)
+            starts = ends - win + 1
+            step = max(1, _CHUNK_ELEMS // self.nfft)
+            for s in range(0, len(calc), step):
+                sel = starts[s:s + step]
+                lag[s:s + step], peak[s:s + step], corr0[s:s + step] = _xcorr_peak(
+                    wa[sel], wb[sel], self.cfg.max_lag, self.nfft)
+            lag_sec = lag * (all_t[ends] - all_t[starts]) / (win - 1)
+        
+        # 逐行沿用最近一次（含本行）重算的结果；-1 表示沿用批次开始前的结果
+        mark = np.full(n, -1)
+        mark[rows[calc]] = np.arange(len(calc))
+        which = np.maximum.accumulate(mark) if n else mark
+        
+        lag_row = np.zeros(n, dtype=np.int64)
+        peak_row = np.full(n, np.nan)
+        cur = which >= 0
+        lag_row[cur] = lag[which[cur]]
+        peak_row[cur] = peak[which[cur]]
+        if self._last is not None:
+            lag_row[~cur] = self._last[0]
+            peak_row[~cur] = self._last[1]
+        fired = (np.abs(lag_row) >= self.cfg.min_lag) & (peak_row >= self.cfg.min_corr)
+        score = 55 + 5 * np.minimum(5, np.abs(lag_row) - self.cfg.min_lag)
+        
+        # 推进状态：环内保留末尾 win 个收益率
+        if n:
+            keep = min(win, len(all_a))
+            self._ra[:keep] = all_a[len(all_a) - keep:]
+            self._rb[:keep] = all_b[len(all_b) - keep:]
+            self._rt[:keep] = all_t[len(all_t) - keep:]
+            self._pos = keep % win
+            self._count = keep
+            self._pushed += len(ra)
+            self._last_px = (float(px_a[-1]), float(px_b[-1]))
+            if len(calc):
+                self._last = (int(lag[-1]), float(peak[-1]), float(corr0[-1]), float(lag_sec[-1]))
+        return {"fired": fired, "score": score, "lag": lag_row, "peak": peak_row}
+
 
 @dataclass
 class FundingShockCfg:
     """资金费突变检测配置"""
     win: int = 24
     delta_bps: float = 3.0
+    win_sec: Optional[float] = None   # 设置后按事件时间窗口（秒）统计，忽略 win
+    sample_on_change: bool = False    # 仅在启用 schedule 时生效，见 FundingShockDetector
 
 
 class FundingShockDetector:
-    """资金费突变：下一期资金费相对近 win 期中位数的变化超过阈值(bp)。"""
+    """
+    资金费突变：下一期资金费相对近 win 期中位数的变化超过阈值(bp)。
+    
+    默认每个 tick 都把费率推入窗口。sample_on_change=True 且引擎启用 schedule 时，
+    只在费率变化或距上次评估满 60 秒时推入，窗口变为“最近 win 次采样”而不是
+    “最近 win 个 tick”，中位数与 delta 统计随之不同，需相应调整 win/delta_bps。
+    """
+    
+    # 调度声明（逐 tick 采样：每个 tick 都是新输入）
+    INPUTS = ("tick",)
+    CADENCE_SEC = 0.0
     
     def __init__(self, cfg: FundingShockCfg):
         self.cfg = cfg
-        self.hist = deque(maxlen=cfg.win)
+        if cfg.sample_on_change:
+            # 按变化采样：费率未变且未到期时由调度跳过
+            self.INPUTS = ("next_rate",)
+            self.CADENCE_SEC = 60.0
+        self.hist = TimeWindowQuantile(cfg.win_sec) if cfg.win_sec else RollingQuantile(cfg.win)
+
+    @property
+    def ready(self) -> bool:
+        """窗口是否已预热完成"""
+        return self.hist.full
+
+    def state(self) -> Dict[str, np.ndarray]:
+        """导出检测器状态（扁平键 -> 数组，用于快照）"""
+        return {f"hist.{k}": v for k, v in self.hist.state().items()}
+
+    def load_state(self, st: Dict[str, np.ndarray]) -> None:
+        """从快照恢复检测器状态"""
+        self.hist.load_state(_sub(st, "hist."))
 
-    def update(self, next_rate: float) -> Optional[dict]:
-        """更新资金费数据，检测突变"""
-        self.hist.append(next_rate)
+    def update(self, next_rate: float, ts: Optional[float] = None) -> Optional[dict]:
+        """更新资金费数据，检测突变；ts 为事件时间（秒），缺省用本地时间"""
+        if ts is None:
+            ts = time()
+        self.hist.push(next_rate, ts)
         
-        if len(self.hist) < self.cfg.win:
+        if not self.hist.full:
             return None
             
         # 计算历史中位数
-        med = float(np.median(self.hist))
+        med = self.hist.median()
         
         # 计算变化幅度（基点）
         delta_bps = abs((next_rate - med) * 1e4)
@@ -149,7 +750,7 @@ class FundingShockDetector:
                 "name": "funding_shock",
                 "severity": "warn",
                 "score": score,
-                "ts": int(time()),
+                "ts": int(ts),
                 "detail": {
                     "median": med,
                     "next": next_rate,
@@ -158,6 +759,23 @@ class FundingShockDetector:
             }
         return None
 
+    def update_batch(self, next_rate: np.ndarray) -> Dict[str, np.ndarray]:
+        """批量版 update：逐行结果与循环调用 update 一致，并推进检测器状态（仅计数窗口）"""
+        _check_count_window(self.cfg)
+        rate = np.asarray(next_rate, dtype=float)
+        prev = self.hist.values()
+        x_all = np.concatenate([prev, rate])
+        med = rolling_median(x_all, self.hist.size)[len(prev):]
+        delta_bps = np.abs((rate - med) * 1e4)
+        
+        fired = delta_bps >= self.cfg.delta_bps
+        score = 50 + 5 * np.minimum(5, delta_bps - self.cfg.delta_bps)
+        
+        if len(rate):
+            self.hist.reset()
+            self.hist.extend(x_all[-self.hist.size:])
+        return {"fired": fired, "score": score, "median": med, "delta_bps": delta_bps}
+
 
 @dataclass
 class OrderbookImbalanceCfg:
@@ -168,18 +786,78 @@ class OrderbookImbalanceCfg:
 
 
 class OrderbookImbalanceDetector:
-    """盘口不均衡检测：买卖盘深度比例异常"""
+    """盘口不均衡检测：前 depth 档买盘名义金额占比偏离超阈（任一方向）。"""
+    
+    # 调度声明（仅在传入盘口时评估）
+    INPUTS = ("book",)
+    CADENCE_SEC = 0.0
     
     def __init__(self, cfg: OrderbookImbalanceCfg):
         self.cfg = cfg
-        # 占位实现，后续接入真实订单簿数据
-        pass
+        self.bids = BookSide(is_bid=True, depth=cfg.depth)
+        self.asks = BookSide(is_bid=False, depth=cfg.depth)
+
+    @staticmethod
+    def _levels(levels) -> np.ndarray:
+        """[[price, qty], ...] 或 (k, 2) 数组 -> 连续 float 数组"""
+        return np.asarray(levels, dtype=float).reshape(-1, 2)
+
+    @property
+    def ready(self) -> bool:
+        """买卖两侧是否都已有盘口数据"""
+        return len(self.bids) > 0 and len(self.asks) > 0
+
+    def state(self) -> Dict[str, np.ndarray]:
+        """导出检测器状态（扁平键 -> 数组，用于快照）"""
+        st = {f"bids.{k}": v for k, v in self.bids.state().items()}
+        st.update({f"asks.{k}": v for k, v in self.asks.state().items()})
+        return st
 
-    def update(self, bids: list, asks: list) -> Optional[dict]:
-        """更新订单簿数据，检测不均衡"""
-        # 占位实现
-        # 计算前N档买卖盘深度比例
-        # 如果比例超过阈值，触发告警
+    def load_state(self, st: Dict[str, np.ndarray]) -> None:
+        """从快照恢复检测器状态"""
+        self.bids.load_state(_sub(st, "bids."))
+        self.asks.load_state(_sub(st, "asks."))
+
+    def update(self, bids, asks, ts: Optional[float] = None) -> Optional[dict]:
+        """用全量盘口快照更新，检测不均衡"""
+        b = self._levels(bids)
+        a = self._levels(asks)
+        self.bids.snapshot(b[:, 0], b[:, 1])
+        self.asks.snapshot(a[:, 0], a[:, 1])
+        return self.evaluate(ts)
+
+    def apply_delta(self, bids, asks, ts: Optional[float] = None) -> Optional[dict]:
+        """用增量档位更新（qty=0 表示删除），只调整受影响档位的前 N 档金额"""
+        self.bids.apply(self._levels(bids))
+        self.asks.apply(self._levels(asks))
+        return self.evaluate(ts)
+
+    def evaluate(self, ts: Optional[float] = None) -> Optional[dict]:
+        """按当前盘口计算前 N 档买卖金额比例"""
+        bid_n = self.bids.top_notional
+        ask_n = self.asks.top_notional
+        total = bid_n + ask_n
+        
+        if total < self.cfg.min_notional:
+            return None
+        
+        bid_ratio = bid_n / total
+        imb = max(bid_ratio, 1.0 - bid_ratio)
+        
+        if imb >= self.cfg.thresh:
+            score = 45 + 50 * min(0.3, imb - self.cfg.thresh)
+            return {
+                "name": "ob_imbalance",
+                "severity": "warn",
+                "score": score,
+                "ts": int(ts if ts is not None else time()),
+                "detail": {
+                    "bid_ratio": float(bid_ratio),
+                    "bid_notional": float(bid_n),
+                    "ask_notional": float(ask_n),
+                    "side": "bid" if bid_ratio >= 0.5 else "ask"
+                }
+            }
         return None
 
 
@@ -188,22 +866,200 @@ class WhaleOnchainCfg:
     """链上鲸鱼活动检测配置"""
     min_btc: float = 1000
     cooldown_sec: int = 3600
+    win_sec: int = 3600                    # 按簇聚合资金流的事件时间窗口
+    watchlist: Optional[str] = None        # 被关注地址名单文件（.jsonl/.csv/.tsv）
+    bloom: bool = False                    # 名单查询前置布隆过滤
+    max_records_per_update: int = 500      # 单次 update 最多处理的交易数，余下留待之后的 tick
+    max_ingest_ms: float = 1.0             # 单次 update 处理积压的时间预算（毫秒），<=0 不限
+
+
+def _transfer_legs(rec: dict) -> Iterator[Tuple[str, float]]:
+    """交易记录 -> (地址, 有符号金额BTC)：转入为正、转出为负"""
+    if "inputs" in rec or "outputs" in rec:
+        for leg in rec.get("inputs") or ():
+            if leg.get("address"):
+                yield leg["address"], -float(leg.get("value", 0.0))
+        for leg in rec.get("outputs") or ():
+            if leg.get("address"):
+                yield leg["address"], float(leg.get("value", 0.0))
+    else:
+        amount = float(rec.get("amount", rec.get("value", 0.0)))
+        if rec.get("from"):
+            yield rec["from"], -amount
+        if rec.get("to"):
+            yield rec["to"], amount
+
+
+def _transfer_amount(rec: dict) -> float:
+    """交易转移总额（输出之和或 amount 字段）"""
+    if "outputs" in rec:
+        return sum(float(o.get("value", 0.0)) for o in rec["outputs"] or ())
+    return float(rec.get("amount", rec.get("value", 0.0)))
 
 
 class WhaleOnchainDetector:
-    """链上鲸鱼活动检测：大额BTC转移"""
+    """
+    链上鲸鱼活动检测：被关注地址簇在窗口内的资金流超过 min_btc
+    
+    交易记录逐条查询地址索引（O(1)/输出），按簇累计窗口内净流量与总流量，
+    按簇独立冷却。未命中名单的单笔大额转移归入 "unlabeled" 簇。
+    """
+    
+    # 调度声明（仅在有链上数据或积压时评估）
+    INPUTS = ("tx",)
+    CADENCE_SEC = 0.0
+    
+    UNLABELED = "unlabeled"
     
-    def __init__(self, cfg: WhaleOnchainCfg):
+    def __init__(self, cfg: WhaleOnchainCfg, index: Optional[AddressIndex] = None):
         self.cfg = cfg
-        self._last_alert_ts = 0
-        # 占位实现，后续接入链上数据源
-
-    def update(self, tx_data: dict) -> Optional[dict]:
-        """更新链上交易数据，检测鲸鱼活动"""
-        # 占位实现
-        # 检查是否有>=min_btc的大额转移
-        # 考虑冷却时间避免重复告警
-        return None
+        if index is None:
+            index = AddressIndex.from_file(cfg.watchlist, bloom=cfg.bloom) if cfg.watchlist else AddressIndex()
+        self.index = index
+        # 窗口内的 (ts, 簇, 净流量)，以及按簇的 [总流量, 净流量, 条数]
+        self._window: deque = deque()
+        self._sums: Dict[str, List[float]] = {}
+        self._last_alert: Dict[str, float] = {}
+        # 尚未处理的交易记录（大块数据分多次 update 消化）
+        self._backlog: deque = deque()
+
+    @property
+    def ready(self) -> bool:
+        """无需预热，始终就绪"""
+        return True
+
+    @property
+    def pending(self) -> int:
+        """待处理的交易记录数"""
+        return len(self._backlog)
+
+    def state(self) -> Dict[str, np.ndarray]:
+        """导出检测器状态（扁平键 -> 数组，用于快照）"""
+        win = list(self._window)
+        return {
+            "window.ts": np.array([w[0] for w in win], dtype=float),
+            "window.cluster": np.array([w[1] for w in win], dtype=str),
+            "window.net": np.array([w[2] for w in win], dtype=float),
+            "last_alert.cluster": np.array(list(self._last_alert), dtype=str),
+            "last_alert.ts": np.array(list(self._last_alert.values()), dtype=float),
+        }
+
+    def load_state(self, st: Dict[str, np.ndarray]) -> None:
+        """从快照恢复检测器状态"""
+        self._window.clear()
+        self._sums.clear()
+        for ts, cluster, net in zip(st.get("window.ts", ()), st.get("window.cluster", ()),
+                                    st.get("window.net", ())):
+            self._add(float(ts), str(cluster), float(net))
+        self._last_alert = {
+            str(c): float(t) for c, t in zip(st.get("last_alert.cluster", ()), st.get("last_alert.ts", ()))
+        }
+
+    def _add(self, ts: float, cluster: str, net: float) -> None:
+        self._window.append((ts, cluster, net))
+        acc = self._sums.get(cluster)
+        if acc is None:
+            acc = self._sums[cluster] = [0.0, 0.0, 0]
+        acc[0] += abs(net)
+        acc[1] += net
+        acc[2] += 1
+
+    def _evict(self, now: float) -> None:
+        cutoff = now - self.cfg.win_sec
+        win = self._window
+        while win and win[0][0] <= cutoff:
+            _, cluster, net = win.popleft()
+            acc = self._sums[cluster]
+            acc[2] -= 1
+            if acc[2] == 0:
+                del self._sums[cluster]
+            else:
+                acc[0] -= abs(net)
+                acc[1] -= net
+
+    def _ingest(self, rec: dict, touched: set) -> float:
+        """处理一条交易记录，返回其事件时间"""
+        ts = float(rec.get("ts", time()))
+        # 同一笔交易内按簇轧差（簇内找零不计为流动）
+        flows: Dict[str, float] = {}
+        cluster_of = self.index.cluster_of
+        for addr, value in _transfer_legs(rec):
+            cluster = cluster_of(addr)
+            if cluster is not None:
+                flows[cluster] = flows.get(cluster, 0.0) + value
+        if not flows and _transfer_amount(rec) >= self.cfg.min_btc:
+            flows[self.UNLABELED] = _transfer_amount(rec)
+        for cluster, net in flows.items():
+            if net:
+                self._add(ts, cluster, net)
+                touched.add(cluster)
+        return ts
+
+    def update(self, tx_data) -> Optional[dict]:
+        """
+        更新链上交易数据，检测鲸鱼活动
+        
+        tx_data: 单条交易、交易列表，或 {"records": [...]}（如整块 mempool/区块转储）。
+        交易格式：{"ts", "txid", "inputs": [{"address", "value"}], "outputs": [...]}
+        或简化的 {"ts", "from", "to", "amount"}，金额单位 BTC。
+        """
+        if isinstance(tx_data, dict):
+            self._backlog.extend(tx_data["records"] if "records" in tx_data else (tx_data,))
+        elif tx_data:
+            self._backlog.extend(tx_data)
+        return self.drain()
+
+    def drain(self) -> Optional[dict]:
+        """
+        处理积压记录，检查被触及的簇
+
+        每次最多 max_records_per_update 条且不超过 max_ingest_ms，余下留在积压中，
+        由之后的 tick 继续消化（整块转储不会在单个 tick 上内联处理完）。
+        """
+        touched: set = set()
+        now = None
+        backlog = self._backlog
+        budget = self.cfg.max_ingest_ms
+        deadline = perf_counter() + budget / 1e3 if budget > 0 else None
+        for i in range(min(len(backlog), self.cfg.max_records_per_update)):
+            now = self._ingest(backlog.popleft(), touched)
+            # 每 32 条检查一次时间预算
+            if deadline is not None and i & 31 == 31 and perf_counter() >= deadline:
+                break
+        if now is None:
+            return None
+        self._evict(now)
+        
+        # 按簇检查阈值与冷却
+        firing = []
+        for cluster in touched:
+            acc = self._sums.get(cluster)
+            if acc is None or acc[0] < self.cfg.min_btc:
+                continue
+            if now - self._last_alert.get(cluster, float("-inf")) < self.cfg.cooldown_sec:
+                continue
+            self._last_alert[cluster] = now
+            firing.append((cluster, acc[0], acc[1]))
+        
+        if not firing:
+            return None
+        
+        firing.sort(key=lambda f: -f[1])
+        cluster, gross, net = firing[0]
+        score = 60 + 10 * min(3, gross / self.cfg.min_btc - 1)
+        return {
+            "name": "whale_onchain",
+            "severity": "high",
+            "score": score,
+            "ts": int(now),
+            "detail": {
+                "cluster": cluster,
+                "gross_btc": gross,
+                "net_btc": net,
+                "window_sec": self.cfg.win_sec,
+                "clusters": [{"cluster": c, "gross_btc": g, "net_btc": n} for c, g, n in firing]
+            }
+        }
 
 
 @dataclass
@@ -219,16 +1075,690 @@ class NewsCfg:
             self.severity_map = {}
 
 
+# 严重程度 -> 基础分数（severity_map 也可直接给数值分数）
+SEVERITY_SCORE = {"info": 20.0, "warn": 50.0, "high": 70.0, "critical": 90.0}
+
+
 class NewsDetector:
-    """新闻事件检测：关键词匹配和严重程度评估"""
+    """新闻事件检测：关键词自动机单遍匹配标题/正文，按命中关键词的严重程度评分。"""
+    
+    # 调度声明（仅在有新闻时评估）
+    INPUTS = ("news",)
+    CADENCE_SEC = 0.0
     
     def __init__(self, cfg: NewsCfg):
         self.cfg = cfg
-        # 占位实现，后续接入新闻数据源
+        # 构建一次，之后每条新闻单遍扫描
+        self.matcher = KeywordAutomaton(cfg.keywords)
+        self._kw_score: Dict[str, float] = {}
+        self._kw_severity: Dict[str, str] = {}
+        folded_map = {str(k).casefold(): v for k, v in cfg.severity_map.items()}
+        for kw in self.matcher.keywords:
+            sev = folded_map.get(kw.casefold(), "warn")
+            if isinstance(sev, (int, float)):
+                self._kw_score[kw] = float(sev)
+                self._kw_severity[kw] = _severity_of(float(sev))
+            else:
+                self._kw_score[kw] = SEVERITY_SCORE.get(sev, SEVERITY_SCORE["warn"])
+                self._kw_severity[kw] = sev if sev in SEVERITY_SCORE else "warn"
+
+    @property
+    def ready(self) -> bool:
+        """无滑窗，始终就绪"""
+        return True
+
+    def state(self) -> Dict[str, np.ndarray]:
+        """导出检测器状态（扁平键 -> 数组，用于快照）"""
+        return {}
+
+    def load_state(self, st: Dict[str, np.ndarray]) -> None:
+        """从快照恢复检测器状态"""
+        pass
+
+    def score_text(self, text: str) -> Dict[str, int]:
+        """返回文本中命中的关键词 -> 次数"""
+        return self.matcher.matches(text)
 
     def update(self, news_data: dict) -> Optional[dict]:
-        """更新新闻数据，检测相关事件"""
-        # 占位实现
-        # 关键词匹配
-        # 严重程度评估
+        """
+        更新新闻数据，检测相关事件
+        
+        news_data: {"title": str, "text"/"body": str（可选）, "ts": 秒（可选）, "source": str（可选）}
+        """
+        text = " \n ".join(
+            str(news_data[k]) for k in ("title", "text", "body") if news_data.get(k)
+        )
+        if not text:
+            return None
+        
+        hits = self.matcher.matches(text)
+        if not hits:
+            return None
+        
+        # 最严重关键词定基础分，每多一个不同关键词 +5（最多 +20）
+        ranked = sorted(hits, key=lambda k: -self._kw_score[k])
+        top = ranked[0]
+        score = self._kw_score[top] + 5 * min(4, len(ranked) - 1)
+        ts = news_data.get("ts")
+        return {
+            "name": "news",
+            "severity": self._kw_severity[top],
+            "score": score,
+            "ts": int(ts if ts is not None else time()),
+            "detail": {
+                "keywords": ranked,
+                "title": news_data.get("title", ""),
+                "source": news_data.get("source", "")
+            }
+        }
+
+
+def _severity_of(score: float) -> str:
+    """数值分数 -> 最接近的严重程度档位"""
+    level = "info"
+    for name, base in SEVERITY_SCORE.items():
+        if score >= base:
+            level = name
+    return level
+
+
+@dataclass
+class FeedHealthCfg:
+    """行情源健康检测配置（延迟单位毫秒）"""
+    stall_sec: float = 5.0           # 超过该时长没有新的交易所时间戳即视为停滞
+    max_latency_ms: float = 2000     # 近期延迟的绝对上限
+    drift_mult: float = 3.0          # 近期延迟 > 基线中位数 × drift_mult 视为漂移
+    drift_min_ms: float = 50         # 漂移的最小绝对增量，避免低延迟时误报
+    ewma_alpha: float = 0.1          # 近期延迟的 EWMA 系数
+    half_life_sec: float = 1800      # 基线分布的半衰期
+    min_samples: int = 200           # 基线样本数不足时不判断漂移
+
+
+class _VenueFeed:
+    """单个行情源的状态：衰减延迟直方图 + 近期 EWMA + 最近新鲜时间。"""
+
+    __slots__ = ("hist", "ewma_ms", "last_exch_ms", "last_fresh", "p50_ms", "p99_ms", "_pct_at")
+
+    def __init__(self, half_life: float):
+        self.hist = DecayingHistogram(half_life)
+        self.ewma_ms: Optional[float] = None
+        self.last_exch_ms: Optional[float] = None
+        self.last_fresh: Optional[float] = None
+        self.p50_ms = 0.0
+        self.p99_ms = 0.0
+        self._pct_at = float("-inf")
+
+
+class FeedHealthDetector:
+    """
+    行情源停滞/延迟异常检测：消费 Ticker/Orderbook 的交易所时间戳 ts（毫秒）与本地接收时间
+    
+    每个源用常量内存的衰减直方图维护延迟基线（p50/p99），EWMA 跟踪近期延迟；
+    交易所时间戳超过 stall_sec 未前进视为停滞，近期延迟显著高于基线视为漂移。
+    """
+    
+    # 调度声明（新消息到达或到期时评估（停滞需随时间检查））
+    INPUTS = ("stream",)
+    CADENCE_SEC = 1.0
+    
+    def __init__(self, cfg: FeedHealthCfg):
+        self.cfg = cfg
+        self.venues: Dict[str, _VenueFeed] = {}
+        self.messages = 0
+
+    @property
+    def ready(self) -> bool:
+        """各源延迟基线是否已积累足够样本"""
+        return all(v.hist.total >= self.cfg.min_samples for v in self.venues.values())
+
+    def observe(self, venue: str, msg, recv_ts: Optional[float] = None) -> None:
+        """
+        记录一条行情消息
+        
+        msg: Ticker/Orderbook（取其 ts 字段）或交易所时间戳（毫秒）；recv_ts 为本地接收时间（秒）
+        """
+        if recv_ts is None:
+            recv_ts = time()
+        exch_ms = float(msg["ts"] if isinstance(msg, dict) else msg)
+        self.messages += 1
+        feed = self.venues.get(venue)
+        if feed is None:
+            feed = self.venues[venue] = _VenueFeed(self.cfg.half_life_sec)
+        lat_ms = recv_ts * 1e3 - exch_ms
+        # 时钟偏差可能使延迟为负，直方图按 0 计（微秒精度）
+        feed.hist.add(int(max(0.0, lat_ms) * 1e3), recv_ts)
+        a = self.cfg.ewma_alpha
+        feed.ewma_ms = lat_ms if feed.ewma_ms is None else feed.ewma_ms + a * (lat_ms - feed.ewma_ms)
+        if feed.last_exch_ms is None or exch_ms > feed.last_exch_ms:
+            feed.last_exch_ms = exch_ms
+            feed.last_fresh = recv_ts
+
+    def _baseline(self, feed: _VenueFeed, now: float) -> None:
+        """按需刷新基线分位（每秒最多一次）"""
+        if now - feed._pct_at >= 1.0:
+            feed.p50_ms = feed.hist.percentile(0.50) / 1e3
+            feed.p99_ms = feed.hist.percentile(0.99) / 1e3
+            feed._pct_at = now
+
+    def check(self, venue: str, now: float) -> Optional[dict]:
+        """检查单个源，返回问题描述或 None"""
+        feed = self.venues[venue]
+        cfg = self.cfg
+        stale = now - feed.last_fresh
+        if stale >= cfg.stall_sec:
+            return {"venue": venue, "kind": "stall", "stale_sec": stale,
+                    "score": 70 + 5 * min(4, stale / cfg.stall_sec - 1)}
+        lat = feed.ewma_ms
+        if lat >= cfg.max_latency_ms:
+            return {"venue": venue, "kind": "latency", "latency_ms": lat,
+                    "score": 60 + 5 * min(4, lat / cfg.max_latency_ms - 1)}
+        if feed.hist.total >= cfg.min_samples:
+            self._baseline(feed, now)
+            base = max(feed.p50_ms, 1e-3)
+            if lat >= cfg.drift_mult * base and lat - feed.p50_ms >= cfg.drift_min_ms:
+                return {"venue": venue, "kind": "drift", "latency_ms": lat,
+                        "p50_ms": feed.p50_ms, "p99_ms": feed.p99_ms,
+                        "score": 50 + 5 * min(4, lat / base - cfg.drift_mult)}
         return None
+
+    def update(self, ts: Optional[float] = None) -> Optional[dict]:
+        """按当前时间检查全部源，返回最严重的一个（detail 中列出全部异常源）"""
+        if not self.venues:
+            return None
+        now = ts if ts is not None else time()
+        issues = [i for i in (self.check(v, now) for v in self.venues) if i is not None]
+        if not issues:
+            return None
+        issues.sort(key=lambda i: -i["score"])
+        top = issues[0]
+        return {
+            "name": "feed_health",
+            "severity": "high" if top["kind"] == "stall" else "warn",
+            "score": top["score"],
+            "ts": int(now),
+            "detail": {"venue": top["venue"], "kind": top["kind"], "issues": issues}
+        }
+
+    def summary(self) -> Dict[str, dict]:
+        """各源当前延迟与基线（用于状态展示）"""
+        now = time()
+        out = {}
+        for name, feed in self.venues.items():
+            self._baseline(feed, now)
+            out[name] = {
+                "latency_ms": feed.ewma_ms,
+                "p50_ms": feed.p50_ms,
+                "p99_ms": feed.p99_ms,
+                "samples": feed.hist.total,
+                "last_fresh": feed.last_fresh,
+            }
+        return out
+
+    def state(self) -> Dict[str, np.ndarray]:
+        """导出检测器状态（扁平键 -> 数组，用于快照）"""
+        names = list(self.venues)
+        feeds = [self.venues[n] for n in names]
+        nan = np.nan
+        return {
+            "venues": np.array(names, dtype=str),
+            "hist": np.array([f.hist.counts for f in feeds]) if feeds else np.zeros((0, 0)),
+            "hist_total": np.array([f.hist.total for f in feeds], dtype=float),
+            "hist_decay": np.array([nan if f.hist._last_decay is None else f.hist._last_decay for f in feeds]),
+            "ewma_ms": np.array([nan if f.ewma_ms is None else f.ewma_ms for f in feeds]),
+            "last_exch_ms": np.array([nan if f.last_exch_ms is None else f.last_exch_ms for f in feeds]),
+            "last_fresh": np.array([nan if f.last_fresh is None else f.last_fresh for f in feeds]),
+        }
+
+    def load_state(self, st: Dict[str, np.ndarray]) -> None:
+        """从快照恢复检测器状态"""
+        self.venues.clear()
+        if "venues" not in st:
+            return
+        def opt(v) -> Optional[float]:
+            return None if math.isnan(v) else float(v)
+        
+        for i, name in enumerate(st["venues"]):
+            feed = _VenueFeed(self.cfg.half_life_sec)
+            if st["hist"].shape[-1] == len(feed.hist.counts):
+                feed.hist.counts[:] = st["hist"][i]
+                feed.hist.total = float(st["hist_total"][i])
+                feed.hist._last_decay = opt(st["hist_decay"][i])
+            feed.ewma_ms = opt(st["ewma_ms"][i])
+            feed.last_exch_ms = opt(st["last_exch_ms"][i])
+            feed.last_fresh = opt(st["last_fresh"][i])
+            self.venues[str(name)] = feed
+
+
+@dataclass
+class LiquidationCfg:
+    """强平/持仓量冲击检测配置"""
+    bucket_sec: float = 1.0          # 时间桶宽度
+    win_sec: float = 60              # 强平金额统计窗口
+    baseline_sec: float = 3600       # 基线窗口（同时决定桶数组长度）
+    min_baseline_sec: float = 600    # 基线最少积累时长（窗口之外），未满前不按强平金额告警
+    min_notional: float = 1_000_000  # 窗口内强平金额下限（USDT）
+    surge_mult: float = 5.0          # 窗口强平金额 / 基线同期期望 的告警倍数
+    oi_bucket_sec: float = 5.0       # 持仓量采样桶宽度
+    oi_win_sec: float = 300          # 持仓量变化统计窗口
+    oi_drop_pct: float = 2.0         # 窗口内持仓量下降百分比阈值
+
+
+class _BucketRing:
+    """
+    预分配的时间桶环：按桶号累加，推进时清零复用旧桶，并增量维护最近 win 个桶的和
+    
+    每列一个量（如多头/空头强平金额），不保存逐条事件。
+    """
+
+    __slots__ = ("n", "win", "vals", "win_sum", "total", "head", "start")
+
+    def __init__(self, n: int, win: int, cols: int):
+        self.n = n
+        self.win = win
+        self.vals = np.zeros((n, cols))
+        self.win_sum = np.zeros(cols)
+        self.total = np.zeros(cols)
+        self.head: Optional[int] = None
+        self.start: Optional[int] = None
+
+    @property
+    def span(self) -> int:
+        """自开始积累（或整环清零）以来覆盖的桶数，不超过环长"""
+        if self.head is None:
+            return 0
+        return min(self.n, self.head - self.start + 1)
+
+    def advance(self, bid: int) -> None:
+        """推进到桶号 bid，离开窗口的桶从窗口和中扣除，复用的桶清零"""
+        if self.head is None:
+            self.head = self.start = bid
+            return
+        if bid <= self.head:
+            return
+        if bid - self.head >= self.n:
+            # 间隔超过整环：旧数据全部失效，重新积累
+            self.vals[:] = 0.0
+            self.win_sum[:] = 0.0
+            self.total[:] = 0.0
+            self.head = self.start = bid
+            return
+        head = self.head
+        for b in range(head + 1, bid + 1):
+            out = b - self.win
+            if out > head - self.n:
+                self.win_sum -= self.vals[out % self.n]
+            slot = self.vals[b % self.n]
+            self.total -= slot
+            slot[:] = 0.0
+        self.head = bid
+        # 每转一圈按桶精确重算一次，消除增减累计的浮点误差
+        if bid // self.n != head // self.n:
+            self._resum()
+
+    def _resum(self) -> None:
+        self.total[:] = self.vals.sum(axis=0)
+        idx = np.arange(self.head - self.win + 1, self.head + 1) % self.n
+        self.win_sum[:] = self.vals[idx].sum(axis=0)
+
+    def add(self, bid: int, col: int, x: float) -> None:
+        """向桶 bid 的第 col 列累加 x（迟到但仍在环内的桶也计入）"""
+        if self.head is None or bid > self.head:
+            self.advance(bid)
+        elif bid <= self.head - self.n:
+            return
+        self.vals[bid % self.n, col] += x
+        self.total[col] += x
+        if bid > self.head - self.win:
+            self.win_sum[col] += x
+
+
+class LiquidationDetector:
+    """
+    强平/持仓量冲击：时间桶聚合强平金额与持仓量变化，评估连环强平风险
+    
+    强平消息（pybit all_liquidation_stream / liquidation_stream）按交易所时间戳落入
+    预分配桶数组，每条 O(1)；持仓量（MarketHTTP.get_open_interest 或 ticker 的 openInterest）
+    按采样桶前向填充。窗口强平金额相对基线激增、或持仓量窗口内骤降时告警，两者同时出现为高危。
+    """
+    
+    # 调度声明（新消息到达或到期时评估（时间桶随时间滚动））
+    INPUTS = ("stream",)
+    CADENCE_SEC = 1.0
+    
+    LONG, SHORT = 0, 1
+    
+    def __init__(self, cfg: LiquidationCfg):
+        self.cfg = cfg
+        n = max(1, int(math.ceil(cfg.baseline_sec / cfg.bucket_sec)))
+        w = max(1, int(math.ceil(cfg.win_sec / cfg.bucket_sec)))
+        self.liq = _BucketRing(max(n, w), w, 2)
+        w_oi = max(1, int(math.ceil(cfg.oi_win_sec / cfg.oi_bucket_sec)))
+        self._oi = np.full(w_oi + 1, np.nan)
+        self._oi_head: Optional[int] = None
+        self._lock = threading.Lock()
+        self.messages = 0
+
+    @property
+    def active(self) -> bool:
+        """是否已接收过强平或持仓量数据"""
+        return self.liq.head is not None or self._oi_head is not None
+
+    @property
+    def ready(self) -> bool:
+        """强平基线已积累到 min_baseline_sec，或持仓量窗口已填满"""
+        return self._liq_warm() or (self._oi_head is not None and not np.isnan(self._oi).any())
+
+    def _base_buckets(self) -> int:
+        """基线（窗口之外）已覆盖的桶数"""
+        return max(0, self.liq.span - self.liq.win)
+
+    def _liq_warm(self) -> bool:
+        """强平基线是否已达最少积累时长（基线本身短于该时长时以基线全长为准）"""
+        liq, cfg = self.liq, self.cfg
+        if liq.head is None:
+            return False
+        need = min(cfg.min_baseline_sec, (liq.n - liq.win) * cfg.bucket_sec)
+        return self._base_buckets() * cfg.bucket_sec >= need
+
+    # ---------- 输入 ----------
+
+    def observe_liquidation(self, price: float, size: float, side: str, ts_ms: float) -> None:
+        """
+        记录一笔强平
+        
+        side 为被强平仓位方向：Bybit 推送的 "Buy" 表示多头被强平，"Sell" 表示空头被强平。
+        """
+        bid = int(ts_ms / 1e3 // self.cfg.bucket_sec)
+        col = self.LONG if side in ("Buy", "buy", "long") else self.SHORT
+        with self._lock:
+            self.liq.add(bid, col, price * size)
+            self.messages += 1
+
+    def on_bybit_liquidation(self, msg: dict) -> None:
+        """pybit 回调：allLiquidation.{symbol}（data 为列表）或旧版 liquidation.{symbol}（data 为对象）"""
+        data = msg.get("data")
+        if isinstance(data, dict):
+            self.observe_liquidation(float(data["price"]), float(data["size"]), data["side"],
+                                     float(data.get("updatedTime", msg.get("ts", 0))))
+            return
+        if not data:
+            return
+        bucket = self.cfg.bucket_sec
+        liq = self.liq
+        # 整批在一次加锁内处理，突发时每条只做解析与一次数组累加
+        with self._lock:
+            for d in data:
+                bid = int(float(d["T"]) / 1e3 // bucket)
+                col = self.LONG if d["S"] == "Buy" else self.SHORT
+                liq.add(bid, col, float(d["p"]) * float(d["v"]))
+            self.messages += len(data)
+
+    def observe_open_interest(self, oi: float, ts_ms: float) -> None:
+        """记录一次持仓量读数（同一采样桶内取最新值）"""
+        bid = int(ts_ms / 1e3 // self.cfg.oi_bucket_sec)
+        with self._lock:
+            if self._oi_head is not None and bid < self._oi_head:
+                return
+            self._oi_advance(bid)
+            self._oi[bid % len(self._oi)] = oi
+            self._oi_head = bid
+            self.messages += 1
+
+    def _oi_advance(self, bid: int) -> None:
+        """推进持仓量采样桶，中间缺失的桶用上一读数前向填充"""
+        head = self._oi_head
+        if head is None or bid <= head:
+            return
+        ring = self._oi
+        n = len(ring)
+        last = ring[head % n]
+        for b in range(head + 1, min(bid, head + n) + 1):
+            ring[b % n] = last
+        self._oi_head = bid
+
+    def on_bybit_open_interest(self, resp: dict) -> None:
+        """MarketHTTP.get_open_interest 的返回（list 按时间倒序），按时间顺序写入"""
+        rows = (resp.get("result") or {}).get("list") or []
+        for row in sorted(rows, key=lambda r: int(r["timestamp"])):
+            self.observe_open_interest(float(row["openInterest"]), float(row["timestamp"]))
+
+    # ---------- 评估 ----------
+
+    def _oi_change_pct(self) -> Optional[float]:
+        """持仓量在 oi_win_sec 内的变化百分比；窗口未填满时为 None"""
+        if self._oi_head is None:
+            return None
+        n = len(self._oi)
+        now = self._oi[self._oi_head % n]
+        then = self._oi[(self._oi_head + 1) % n]
+        if np.isnan(then) or then <= 0:
+            return None
+        return float((now - then) / then * 100)
+
+    def update(self, ts: Optional[float] = None) -> Optional[dict]:
+        """推进到当前时间并评估连环强平风险"""
+        if not self.active:
+            return None
+        now = ts if ts is not None else time()
+        cfg = self.cfg
+        with self._lock:
+            liq = self.liq
+            if liq.head is not None:
+                liq.advance(int(now // cfg.bucket_sec))
+            self._oi_advance(int(now // cfg.oi_bucket_sec))
+            win_long, win_short = (float(v) for v in liq.win_sum)
+            total = float(liq.total.sum())
+            base_sec = self._base_buckets() * cfg.bucket_sec
+            warm = self._liq_warm()
+            oi_chg = self._oi_change_pct()
+        
+        win_notional = win_long + win_short
+        # 基线：窗口之外已积累的桶按时长折算到一个窗口的期望金额；积累不足 min_baseline_sec 时不告警
+        expected = (total - win_notional) / base_sec * cfg.win_sec if base_sec > 0 else 0.0
+        surge = win_notional / max(expected, cfg.min_notional / cfg.surge_mult)
+        liq_shock = warm and win_notional >= cfg.min_notional and surge >= cfg.surge_mult
+        oi_shock = oi_chg is not None and oi_chg <= -cfg.oi_drop_pct
+        if not (liq_shock or oi_shock):
+            return None
+        
+        score = 55.0
+        if liq_shock:
+            score += 10 * min(2, math.log2(surge / cfg.surge_mult) + 1)
+        if oi_shock:
+            score += 10 * min(2, -oi_chg / cfg.oi_drop_pct)
+        return {
+            "name": "liquidation",
+            "severity": "high" if liq_shock and oi_shock else "warn",
+            "score": score,
+            "ts": int(now),
+            "detail": {
+                "liq_long": win_long,
+                "liq_short": win_short,
+                "surge": surge,
+                "oi_change_pct": oi_chg,
+                "window_sec": cfg.win_sec,
+            }
+        }
+
+    def state(self) -> Dict[str, np.ndarray]:
+        """导出检测器状态（扁平键 -> 数组，用于快照）"""
+        nan = np.nan
+        liq = self.liq
+        return {
+            "liq.vals": liq.vals.copy(),
+            "liq.win_sum": liq.win_sum.copy(),
+            "liq.total": liq.total.copy(),
+            "liq.head": np.array(nan if liq.head is None else liq.head),
+            "liq.start": np.array(nan if liq.start is None else liq.start),
+            "oi": self._oi.copy(),
+            "oi_head": np.array(nan if self._oi_head is None else self._oi_head),
+        }
+
+    def load_state(self, st: Dict[str, np.ndarray]) -> None:
+        """从快照恢复检测器状态（桶配置不一致时从头积累）"""
+        liq = self.liq
+        if st.get("liq.vals") is None or st["liq.vals"].shape != liq.vals.shape or st["oi"].shape != self._oi.shape:
+            return
+        liq.vals[:] = st["liq.vals"]
+        liq.win_sum[:] = st["liq.win_sum"]
+        liq.total[:] = st["liq.total"]
+        head = float(st["liq.head"])
+        liq.head = None if math.isnan(head) else int(head)
+        # 旧快照无 liq.start：从恢复点重新计基线积累时长
+        start = float(st.get("liq.start", head))
+        liq.start = None if math.isnan(start) else int(start)
+        self._oi[:] = st["oi"]
+        oi_head = float(st["oi_head"])
+        self._oi_head = None if math.isnan(oi_head) else int(oi_head)
+
+
+@dataclass
+class VpinCfg:
+    """成交流毒性（VPIN）检测配置"""
+    bucket_volume: float = 50.0    # 每个成交量桶的成交量（标的币数量，如 BTC）
+    n_buckets: int = 50            # VPIN 取最近 n_buckets 个完成桶
+    thresh: float = 0.6            # VPIN 告警阈值（0~1）
+
+
+class VpinDetector:
+    """
+    成交流毒性：按成交量时钟分桶的 VPIN = Σ|买量-卖量| / (n·V)
+    
+    逐笔成交（pybit trade_stream，S 为主动方）累加进当前桶，满 V 即结桶，
+    单笔大单可跨多个桶；完成桶的失衡量存入定长环并维护滑动和，每笔 O(1)、不分配。
+    """
+    
+    # 调度声明（成交量时钟：仅在有新成交时评估）
+    INPUTS = ("stream",)
+    CADENCE_SEC = 0.0
+    
+    def __init__(self, cfg: VpinCfg):
+        if cfg.bucket_volume <= 0 or cfg.n_buckets < 1:
+            raise ValueError("bucket_volume and n_buckets must be positive")
+        self.cfg = cfg
+        self._ring = [0.0] * cfg.n_buckets
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self._pos = 0
+        self._count = 0
+        self._sum = 0.0
+        self._buy = 0.0
+        self._sell = 0.0
+        self.trades = 0
+        self.buckets = 0
+
+    @property
+    def active(self) -> bool:
+        """是否已接收过成交"""
+        return self.trades > 0
+
+    @property
+    def messages(self) -> int:
+        """已接收成交笔数"""
+        return self.trades
+
+    @property
+    def ready(self) -> bool:
+        """已完成 n_buckets 个成交量桶"""
+        return self._count >= self.cfg.n_buckets
+
+    @property
+    def vpin(self) -> float:
+        """当前 VPIN；未满 n_buckets 时按已完成桶计算，无完成桶时为 nan"""
+        if self._count == 0:
+            return float("nan")
+        return self._sum / (self._count * self.cfg.bucket_volume)
+
+    def _close_bucket(self, imb: float) -> None:
+        n = self.cfg.n_buckets
+        pos = self._pos
+        if self._count < n:
+            self._count += 1
+        else:
+            self._sum -= self._ring[pos]
+        self._ring[pos] = imb
+        self._sum += imb
+        self._pos = pos + 1 if pos + 1 < n else 0
+        self.buckets += 1
+        # 每转一圈精确重算滑动和
+        if self._pos == 0:
+            self._sum = math.fsum(self._ring)
+
+    def _add(self, qty: float, is_buy: bool) -> None:
+        V = self.cfg.bucket_volume
+        while qty > 0:
+            room = V - self._buy - self._sell
+            take = qty if qty < room else room
+            if is_buy:
+                self._buy += take
+            else:
+                self._sell += take
+            qty -= take
+            if take >= room:
+                self._close_bucket(abs(self._buy - self._sell))
+                self._buy = self._sell = 0.0
+
+    def observe_trade(self, qty: float, side: str) -> None:
+        """记录一笔成交；side 为主动方（"Buy"/"Sell"）"""
+        with self._lock:
+            self._add(float(qty), side in ("Buy", "buy"))
+            self.trades += 1
+
+    def on_bybit_trades(self, msg: dict) -> None:
+        """pybit trade_stream 回调：publicTrade.{symbol}，data 为成交列表"""
+        data = msg.get("data") or ()
+        with self._lock:
+            add = self._add
+            for d in data:
+                add(float(d["v"]), d["S"] == "Buy")
+            self.trades += len(data)
+
+    def update(self, ts: Optional[float] = None) -> Optional[dict]:
+        """读取当前 VPIN，超过阈值时告警"""
+        if ts is None:
+            ts = time()
+        with self._lock:
+            if not self.ready:
+                return None
+            v = self.vpin
+            buckets = self.buckets
+        if v < self.cfg.thresh:
+            return None
+        return {
+            "name": "vpin",
+            "severity": "warn",
+            "score": 60 + 50 * min(0.4, v - self.cfg.thresh),
+            "ts": int(ts),
+            "detail": {
+                "vpin": v,
+                "bucket_volume": self.cfg.bucket_volume,
+                "n_buckets": self.cfg.n_buckets,
+                "buckets_done": buckets,
+            }
+        }
+
+    def state(self) -> Dict[str, np.ndarray]:
+        """导出检测器状态（扁平键 -> 数组，用于快照）"""
+        with self._lock:
+            n = self._count
+            ring = self._ring
+            # 按时间顺序导出已完成桶
+            ordered = ring[:n] if n < self.cfg.n_buckets else ring[self._pos:] + ring[:self._pos]
+            return {
+                "imbalance": np.array(ordered, dtype=float),
+                "current": np.array([self._buy, self._sell]),
+                "counters": np.array([self.trades, self.buckets], dtype=np.int64),
+            }
+
+    def load_state(self, st: Dict[str, np.ndarray]) -> None:
+        """从快照恢复检测器状态"""
+        with self._lock:
+            self.reset()
+            if "imbalance" not in st:
+                return
+            for imb in st["imbalance"][-self.cfg.n_buckets:]:
+                self._close_bucket(float(imb))
+            self._buy, self._sell = (float(x) for x in st["current"])
+            self.trades, self.buckets = (int(x) for x in st["counters"])
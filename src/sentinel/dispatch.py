@@ -0,0 +1,204 @@
+"""
+告警异步分发模块
+Asynchronous alert dispatch module
+
+在后台线程中发送 webhook 告警，保证 tick 路径永不阻塞：
+- 有界队列：submit 只做 put_nowait，队列满时按告警名合并进溢出表
+- 合并发送：每个间隔把积累的告警按名称合并成一个 payload
+- 失败重试：指数退避，超过次数后丢弃（error 日志 + dropped 计数）
+"""
+
+from __future__ import annotations
+from typing import Callable, Dict, List, Optional
+from time import time
+import json
+import logging
+import queue
+import threading
+import urllib.request
+
+from ..types import Alert
+
+_LEVEL_RANK = {"normal": 0, "tighten": 1, "pause": 2}
+
+
+def post_json(url: str, payload: dict, timeout: float) -> None:
+    """以 JSON POST 发送 payload，非 2xx 响应抛出异常"""
+    body = json.dumps(payload, default=str).encode("utf-8")
+    req = urllib.request.Request(
+        url, data=body, headers={"Content-Type": "application/json"}, method="POST"
+    )
+    with urllib.request.urlopen(req, timeout=timeout) as resp:
+        if resp.status >= 300:
+            raise RuntimeError(f"webhook HTTP {resp.status}")
+
+
+class WebhookDispatcher:
+    """后台 webhook 分发器：有界队列 + 定时合并 + 指数退避重试。"""
+
+    def __init__(self, url: str, interval_sec: float = 2.0, max_queue: int = 1024,
+                 max_retries: int = 3, backoff_sec: float = 0.5, backoff_max_sec: float = 10.0,
+                 timeout_sec: float = 3.0,
+                 poster: Optional[Callable[[str, dict, float], None]] = None):
+        """
+        Args:
+            url: webhook 地址
+            interval_sec: 合并发送间隔
+            max_queue: 队列容量，满后按告警名合并
+            max_retries: 单个 payload 最大重试次数
+            backoff_sec: 首次重试等待，之后按 2 倍递增
+            backoff_max_sec: 单次重试等待上限
+            timeout_sec: HTTP 超时
+            poster: 自定义发送函数 (url, payload, timeout)，默认 post_json
+        """
+        self.url = url
+        self.interval_sec = float(interval_sec)
+        self.max_retries = int(max_retries)
+        self.backoff_sec = float(backoff_sec)
+        self.backoff_max_sec = float(backoff_max_sec)
+        self.timeout_sec = float(timeout_sec)
+        self._post = poster or post_json
+        self.logger = logging.getLogger(__name__)
+
+        self._queue: "queue.Queue[tuple]" = queue.Queue(maxsize=max_queue)
+        # 队列满时的溢出表：按告警名合并
+        self._overflow: Dict[str, dict] = {}
+        self._overflow_lock = threading.Lock()
+        self._stop = threading.Event()
+
+        # 提交端与后台线程都会计数，统一加锁
+        self._stats = {"submitted": 0, "merged": 0, "sent": 0, "failed": 0, "retries": 0, "dropped": 0}
+        self._stats_lock = threading.Lock()
+
+        self._thread = threading.Thread(target=self._run, name="sentinel-webhook", daemon=True)
+        self._thread.start()
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """计数快照：submitted/merged 为提交数，sent/failed 为 payload 数，dropped 为最终未送达的告警条数"""
+        with self._stats_lock:
+            return dict(self._stats)
+
+    def _count(self, key: str, n: int = 1) -> None:
+        with self._stats_lock:
+            self._stats[key] += n
+
+    # ----------------- 生产端（tick 路径） -----------------
+
+    def submit(self, alerts: List[Alert], score: float, level: str) -> None:
+        """提交一组告警，不阻塞"""
+        item = (int(time()), list(alerts), float(score), level)
+        self._count("submitted")
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._overflow_lock:
+                self._merge(self._overflow, item)
+            self._count("merged")
+
+    # ----------------- 消费端（后台线程） -----------------
+
+    @staticmethod
+    def _merge(acc: Dict[str, dict], item: tuple) -> None:
+        """把一次提交按告警名合并进累加表（保留最高分、计数、首末时间）"""
+        ts, alerts, score, level = item
+        meta = acc.setdefault("__meta__", {"score": 0.0, "level": "normal", "events": 0})
+        meta["events"] += 1
+        meta["score"] = max(meta["score"], score)
+        if _LEVEL_RANK.get(level, 0) > _LEVEL_RANK.get(meta["level"], 0):
+            meta["level"] = level
+        for a in alerts:
+            cur = acc.get(a["name"])
+            if cur is None:
+                acc[a["name"]] = {
+                    "name": a["name"],
+                    "severity": a["severity"],
+                    "score": float(a["score"]),
+                    "count": 1,
+                    "first_ts": a.get("ts", ts),
+                    "last_ts": a.get("ts", ts),
+                    "detail": a.get("detail", {}),
+                }
+            else:
+                cur["count"] += 1
+                cur["last_ts"] = a.get("ts", ts)
+                cur["detail"] = a.get("detail", {})
+                if float(a["score"]) >= cur["score"]:
+                    cur["score"] = float(a["score"])
+                    cur["severity"] = a["severity"]
+
+    def _drain(self) -> Dict[str, dict]:
+        """取出队列与溢出表中的全部告警并合并"""
+        with self._overflow_lock:
+            acc, self._overflow = self._overflow, {}
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            self._merge(acc, item)
+        return acc
+
+    def _build_payload(self, acc: Dict[str, dict]) -> dict:
+        meta = acc.pop("__meta__")
+        alerts = sorted(acc.values(), key=lambda a: -a["score"])
+        text = f"[sentinel] level={meta['level']} score={meta['score']:.1f} " + ", ".join(
+            f"{a['name']}x{a['count']}" for a in alerts
+        )
+        return {
+            "ts": int(time()),
+            "level": meta["level"],
+            "score": meta["score"],
+            "events": meta["events"],
+            "alerts": alerts,
+            "text": text,
+        }
+
+    def _send(self, payload: dict) -> bool:
+        """发送一个 payload，失败按指数退避重试"""
+        delay = self.backoff_sec
+        error: Optional[Exception] = None
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._post(self.url, payload, self.timeout_sec)
+                self._count("sent")
+                return True
+            except Exception as e:
+                error = e
+                if attempt >= self.max_retries:
+                    break
+                self._count("retries")
+                self.logger.warning(f"Webhook send error: {e} (attempt {attempt + 1}/{self.max_retries})")
+                # 关闭时不再等待退避
+                if self._stop.wait(delay):
+                    continue
+                delay = min(delay * 2, self.backoff_max_sec)
+        dropped = sum(a["count"] for a in payload["alerts"])
+        self._count("failed")
+        self._count("dropped", dropped)
+        self.logger.error(
+            f"Webhook payload dropped after {self.max_retries + 1} attempts: {error} "
+            f"(level={payload['level']}, {dropped} alerts: {payload['text']})"
+        )
+        return False
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_sec):
+            self.flush()
+        self.flush()
+
+    def flush(self) -> bool:
+        """立即合并并发送当前积累的告警；无告警时返回 True"""
+        acc = self._drain()
+        if not acc:
+            return True
+        return self._send(self._build_payload(acc))
+
+    def pending(self) -> int:
+        """尚未发送的提交数（近似值）"""
+        return self._queue.qsize() + len(self._overflow)
+
+    def close(self, timeout: float = 5.0) -> None:
+        """停止后台线程并尽量发送剩余告警"""
+        self._stop.set()
+        self._thread.join(timeout)
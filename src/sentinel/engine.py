@@ -6,19 +6,143 @@ Sentinel Orchestration Engine
 """
 
 from __future__ import annotations
-from typing import Dict, List, Optional
-from time import time
+from typing import Dict, List, Optional, Union
+from time import time, perf_counter_ns
 import logging
+import math
+import os
+import threading
+import numpy as np
 
 from .detectors import (
     VolSpikeDetector, VolSpikeCfg,
+    RealizedVolDetector, RealizedVolCfg,
     SpreadBlowoutDetector, SpreadBlowoutCfg,
+    LeadLagDetector, LeadLagCfg,
     FundingShockDetector, FundingShockCfg,
     OrderbookImbalanceDetector, OrderbookImbalanceCfg,
     WhaleOnchainDetector, WhaleOnchainCfg,
-    NewsDetector, NewsCfg
+    NewsDetector, NewsCfg,
+    FeedHealthDetector, FeedHealthCfg,
+    LiquidationDetector, LiquidationCfg,
+    VpinDetector, VpinCfg,
+    _sub,
 )
-from ..types import RegimeResult, Alert
+from .dispatch import WebhookDispatcher
+from .instrument import DetectorStats, snapshot_all
+from ..types import RegimeResult, RegimeBatchResult, Alert
+
+# 快照文件格式版本
+SNAPSHOT_VERSION = 1
+
+# 批量模式告警表的行结构
+ALERT_DTYPE = np.dtype([
+    ("idx", np.int64),
+    ("ts", np.int64),
+    ("name", "U16"),
+    ("severity", "U8"),
+    ("score", np.float64),
+])
+
+
+class _Slot:
+    """单个检测器的调度状态：上次输入、下次到期时间与缓存结果（未加权）"""
+    __slots__ = ("cadence", "always", "key", "due", "cached", "skipped")
+    
+    def __init__(self, cadence: float, always: bool):
+        self.cadence = cadence
+        self.always = always
+        self.reset()
+    
+    def reset(self) -> None:
+        self.key = None
+        self.due = float("-inf")
+        self.cached: Optional[dict] = None
+        self.skipped = 0
+
+
+class _DecayedScore:
+    """
+    按检测器的指数衰减分数累加器
+    
+    写入 O(1)：v <- v·exp(-Δt/τ) + Δ，并同步维护一个总分累加器；读取时按闭式衰减
+    惰性求值，无需逐 tick 定时衰减。同一检测器在同一 dedup_sec 时间桶内的重复告警
+    只计最高分（只补差额）。读写均加锁，可在任意线程查询。
+    """
+    
+    def __init__(self, names, half_life_sec: float, dedup_sec: float = 0.0):
+        if half_life_sec <= 0:
+            raise ValueError("half_life_sec must be positive")
+        self.tau = half_life_sec / math.log(2)
+        self.dedup_sec = float(dedup_sec)
+        self.names = list(names)
+        self._idx = {n: i for i, n in enumerate(self.names)}
+        self._lock = threading.Lock()
+        self.reset()
+    
+    def reset(self) -> None:
+        k = len(self.names)
+        self._v = [0.0] * k
+        self._t = [0.0] * k
+        self._bucket: List[Optional[int]] = [None] * k
+        self._added = [0.0] * k
+        self._total = 0.0
+        self._total_t = 0.0
+    
+    def _decay(self, v: float, t: float, now: float) -> float:
+        return v * math.exp((t - now) / self.tau) if now > t else v
+    
+    def add(self, name: str, score: float, ts: float) -> float:
+        """记入一条告警分数，返回去重后实际累加的增量"""
+        i = self._idx[name]
+        b = int(ts // self.dedup_sec) if self.dedup_sec > 0 else None
+        with self._lock:
+            if b is not None and b == self._bucket[i]:
+                delta = score - self._added[i]
+                if delta <= 0:
+                    return 0.0
+                self._added[i] = score
+            else:
+                delta = score
+                self._bucket[i] = b
+                self._added[i] = score
+            self._v[i] = self._decay(self._v[i], self._t[i], ts) + delta
+            self._t[i] = max(self._t[i], ts)
+            self._total = self._decay(self._total, self._total_t, ts) + delta
+            self._total_t = max(self._total_t, ts)
+        return delta
+    
+    def total(self, now: float) -> float:
+        """now 时刻的总衰减分数"""
+        with self._lock:
+            return self._decay(self._total, self._total_t, now)
+    
+    def by_detector(self, now: float) -> Dict[str, float]:
+        """now 时刻各检测器的衰减分数（只列非零项）"""
+        with self._lock:
+            return {n: self._decay(self._v[i], self._t[i], now)
+                    for i, n in enumerate(self.names) if self._v[i] > 0}
+    
+    def state(self) -> Dict[str, np.ndarray]:
+        with self._lock:
+            return {
+                "v": np.array(self._v),
+                "t": np.array(self._t),
+                "bucket": np.array([-1 if b is None else b for b in self._bucket], dtype=np.int64),
+                "added": np.array(self._added),
+                "total": np.array([self._total, self._total_t]),
+            }
+    
+    def load_state(self, st: Dict[str, np.ndarray]) -> None:
+        with self._lock:
+            self.reset()
+            if "v" not in st or len(st["v"]) != len(self.names):
+                return
+            self._v = [float(x) for x in st["v"]]
+            self._t = [float(x) for x in st["t"]]
+            self._bucket = [None if b < 0 else int(b) for b in st["bucket"]]
+            self._added = [float(x) for x in st["added"]]
+            self._total, self._total_t = (float(x) for x in st["total"])
 
 
 class SentinelEngine:
@@ -43,8 +167,53 @@ class SentinelEngine:
         self.thresholds = cfg.get("score_thresholds", {"tighten": 60, "pause": 80})
         self.outputs = cfg.get("outputs", {"log": True, "webhook": ""})
         
+        # webhook 后台分发器：tick 路径只入队，不做网络 IO
+        self._dispatcher: Optional[WebhookDispatcher] = None
+        if self.outputs.get("webhook"):
+            self._dispatcher = WebhookDispatcher(
+                self.outputs["webhook"],
+                interval_sec=float(self.outputs.get("webhook_interval_sec", 2.0)),
+                max_queue=int(self.outputs.get("webhook_max_queue", 1024)),
+                max_retries=int(self.outputs.get("webhook_max_retries", 3)),
+            )
+        
         # 冷却机制
         self._last_fire_ts = 0
+        self._last_score = 0.0
+        self._last_event_ts: Optional[float] = None
+        
+        # 运行指标：各检测器及整次 update 的耗时/命中统计
+        self._detectors_map = self._detectors()
+        self._stats: Dict[str, DetectorStats] = {
+            name: DetectorStats(name) for name in self._detectors_map
+        }
+        self._tick_stats = DetectorStats("update")
+        
+        # 衰减分数：告警按检测器指数衰减累加，等级由衰减后的总分决定（decay.enabled 开启）
+        # 此模式下不做 cooldown 压制，重复告警只由 dedup_sec 时间桶去重限制
+        decay = cfg.get("decay", {})
+        self._decay: Optional[_DecayedScore] = None
+        if decay.get("enabled", False):
+            self._decay = _DecayedScore(self._detectors_map,
+                                        float(decay.get("half_life_sec", 60.0)),
+                                        float(decay.get("dedup_sec", 5.0)))
+            if cfg.get("cooldown_sec"):
+                self.logger.warning(
+                    f"decay.enabled: cooldown_sec={self.cooldown_sec} is ignored; repeat alerts are "
+                    f"limited only by decay.dedup_sec={self._decay.dedup_sec:g} buckets"
+                )
+        self._last_level = "normal"
+        
+        # 调度：按各检测器声明的输入（INPUTS）与周期（CADENCE_SEC）跳过没有新数据的检测器
+        sched = cfg.get("schedule", {})
+        self._schedule: Optional[Dict[str, _Slot]] = None
+        self._held: List[dict] = []
+        if sched.get("enabled", False):
+            cadence = sched.get("cadence_sec", {})
+            self._schedule = {
+                name: _Slot(float(cadence.get(name, det.CADENCE_SEC)), "tick" in det.INPUTS)
+                for name, det in self._detectors_map.items()
+            }
         
         self.logger.info(f"SentinelEngine initialized with thresholds: {self.thresholds}")
 
@@ -56,29 +225,50 @@ class SentinelEngine:
         vol_cfg = VolSpikeCfg(**d.get("vol_spike", {}))
         self.vol_detector = VolSpikeDetector(vol_cfg)
         
+        # 已实现波动率（读取 vol_detector 的收益率，不另存价格）
+        rv_cfg = RealizedVolCfg(**d.get("realized_vol", {}))
+        self.rv_detector = RealizedVolDetector(rv_cfg, self.vol_detector)
+        
         # 价差异常检测器
         spread_cfg = SpreadBlowoutCfg(**d.get("spread_blowout", {}))
         self.spread_detector = SpreadBlowoutDetector(spread_cfg)
         
+        # 跨所领先-滞后检测器
+        lead_lag_cfg = LeadLagCfg(**d.get("lead_lag", {}))
+        self.lead_lag_detector = LeadLagDetector(lead_lag_cfg)
+        
         # 资金费突变检测器
         funding_cfg = FundingShockCfg(**d.get("funding_shock", {}))
         self.funding_detector = FundingShockDetector(funding_cfg)
         
-        # 盘口不均衡检测器（占位）
+        # 盘口不均衡检测器
         ob_cfg = OrderbookImbalanceCfg(**d.get("ob_imbalance", {}))
         self.ob_detector = OrderbookImbalanceDetector(ob_cfg)
         
-        # 链上鲸鱼检测器（占位）
+        # 链上鲸鱼检测器
         whale_cfg = WhaleOnchainCfg(**d.get("whale_onchain", {}))
         self.whale_detector = WhaleOnchainDetector(whale_cfg)
         
-        # 新闻事件检测器（占位）
+        # 新闻事件检测器
         news_cfg = NewsCfg(**d.get("news", {}))
         self.news_detector = NewsDetector(news_cfg)
+        
+        # 行情源健康检测器（由 observe_feed 喂入各源消息）
+        feed_cfg = FeedHealthCfg(**d.get("feed_health", {}))
+        self.feed_detector = FeedHealthDetector(feed_cfg)
+        
+        # 强平/持仓量冲击检测器（由 on_liquidation / on_open_interest 喂入）
+        liq_cfg = LiquidationCfg(**d.get("liquidation", {}))
+        self.liq_detector = LiquidationDetector(liq_cfg)
+        
+        # 成交流毒性检测器（由 on_trades 喂入逐笔成交）
+        vpin_cfg = VpinCfg(**d.get("vpin", {}))
+        self.vpin_detector = VpinDetector(vpin_cfg)
 
     def update(self, px_a: float, px_b: float, vol_a: float, next_rate_a: float, 
                bids: Optional[list] = None, asks: Optional[list] = None,
-               tx_data: Optional[dict] = None, news_data: Optional[dict] = None) -> RegimeResult:
+               tx_data: Optional[Union[dict, list]] = None, news_data: Optional[dict] = None,
+               ts: Optional[float] = None) -> RegimeResult:
         """
         更新市场数据并计算市场状态
         
@@ -89,30 +279,64 @@ class SentinelEngine:
             next_rate_a: 交易所A下一期资金费
             bids: 买盘数据（可选）
             asks: 卖盘数据（可选）
-            tx_data: 链上交易数据（可选）
+            tx_data: 链上交易数据（可选，单条/列表/{"records": [...]}）
             news_data: 新闻数据（可选）
+            ts: 行情事件时间戳（秒，可选）；回放时传入，缺省用本地时间
             
         Returns:
             RegimeResult: 包含分数、等级和告警列表的结果
         """
+        return self._tick(px_a, px_b, vol_a, next_rate_a, bids, asks, tx_data, news_data, ts)
+
+    def _tick(self, px_a: float, px_b: float, vol_a: float, next_rate_a: float,
+              bids: Optional[list] = None, asks: Optional[list] = None,
+              tx_data: Optional[Union[dict, list]] = None, news_data: Optional[dict] = None,
+              ts: Optional[float] = None, emit: bool = True) -> RegimeResult:
+        """update 的实现；emit=False 时不输出日志/webhook（批量回放用）"""
+        t_start = perf_counter_ns()
         alerts: List[Alert] = []
+        # 检测器窗口与告警时间统一使用事件时间
+        now_ts = float(ts) if ts is not None else time()
+        self._last_event_ts = now_ts
         
-        # 运行各检测器
+        # 运行各检测器（启用调度时，输入未变且未到期的检测器跳过，上次结果记入 _held）
+        inputs = None
+        if self._schedule is not None:
+            inputs = {"next_rate": next_rate_a}
+            self._held.clear()
+        step = self._step
         detector_results = [
-            self.vol_detector.update(px_a, vol_a),
-            self.spread_detector.update(px_a, px_b),
-            self.funding_detector.update(next_rate_a),
+            step("vol_spike", inputs, now_ts, self.vol_detector.update, px_a, vol_a, now_ts),
+            step("spread_blowout", inputs, now_ts, self.spread_detector.update, px_a, px_b, now_ts),
+            step("funding_shock", inputs, now_ts, self.funding_detector.update, next_rate_a, now_ts),
         ]
         
         # 可选检测器
+        if self.rv_detector.cfg.enabled:
+            detector_results.append(step("realized_vol", inputs, now_ts, self.rv_detector.update, now_ts))
+        
+        if self.lead_lag_detector.cfg.enabled:
+            detector_results.append(step("lead_lag", inputs, now_ts, self.lead_lag_detector.update,
+                                         px_a, px_b, now_ts))
+        
         if bids is not None and asks is not None:
-            detector_results.append(self.ob_detector.update(bids, asks))
+            detector_results.append(self._run("ob_imbalance", self.ob_detector.update, bids, asks, now_ts))
         
-        if tx_data is not None:
-            detector_results.append(self.whale_detector.update(tx_data))
+        # 链上数据可能分多次消化：有新数据或仍有积压时都要运行
+        if tx_data is not None or self.whale_detector.pending:
+            detector_results.append(self._run("whale_onchain", self.whale_detector.update, tx_data))
             
         if news_data is not None:
-            detector_results.append(self.news_detector.update(news_data))
+            detector_results.append(self._run("news", self.news_detector.update, news_data))
+        
+        if self.feed_detector.venues:
+            detector_results.append(step("feed_health", inputs, now_ts, self.feed_detector.update, now_ts))
+        
+        if self.liq_detector.active:
+            detector_results.append(step("liquidation", inputs, now_ts, self.liq_detector.update, now_ts))
+        
+        if self.vpin_detector.active:
+            detector_results.append(step("vpin", inputs, now_ts, self.vpin_detector.update, now_ts))
         
         # 处理检测结果
         for alert in filter(None, detector_results):
@@ -122,38 +346,378 @@ class SentinelEngine:
                 alert["score"] = float(alert["score"]) * w
                 alerts.append(alert)  # type: ignore
         
-        # 计算总分数
-        score = sum(a["score"] for a in alerts)
+        # 计算总分数：默认为本 tick 告警之和；衰减模式下为各检测器衰减分数之和
+        # 被调度跳过的检测器沿用上次结果，只计入分数，不作为新告警输出/记入衰减分数
+        if self._decay is not None:
+            for a in alerts:
+                self._decay.add(a["name"], a["score"], now_ts)
+            score = self._decay.total(now_ts)
+        else:
+            score = sum(a["score"] for a in alerts)
+            if inputs is not None:
+                score += sum(float(a["score"]) * float(self.weights.get(a["name"], 1.0))
+                             for a in self._held)
         
         # 确定市场状态等级
-        level = "normal"
-        if score >= self.thresholds.get("pause", 80):
-            level = "pause"
-        elif score >= self.thresholds.get("tighten", 60):
-            level = "tighten"
+        level = self._level(score)
         
-        # 冷却机制：避免频繁触发高等级动作
-        now = int(time())
-        if level in ("tighten", "pause") and now - self._last_fire_ts < self.cooldown_sec:
+        # 冷却机制：避免频繁触发高等级动作（衰减分数本身已平滑，只在等级变化时记日志）
+        now = int(now_ts)
+        if self._decay is not None:
+            if level in ("tighten", "pause") and level != self._last_level:
+                self._last_fire_ts = now
+                if emit:
+                    self.logger.warning(f"Market regime changed to {level} with score {score:.2f}")
+        elif level in ("tighten", "pause") and now - self._last_fire_ts < self.cooldown_sec:
             level = "normal"
             self.logger.debug(f"Action {level} suppressed due to cooldown")
         elif level in ("tighten", "pause"):
             self._last_fire_ts = now
-            self.logger.warning(f"Market regime changed to {level} with score {score:.2f}")
+            if emit:
+                self.logger.warning(f"Market regime changed to {level} with score {score:.2f}")
+        self._last_level = level
         
         # 输出告警
-        if alerts and self.outputs.get("log", True):
+        if emit and alerts and self.outputs.get("log", True):
             self._log_alerts(alerts, score, level)
         
-        if alerts and self.outputs.get("webhook"):
+        if emit and alerts and self.outputs.get("webhook"):
             self._send_webhook(alerts, score, level)
         
+        self._last_score = float(score)
+        self._tick_stats.record(perf_counter_ns() - t_start, bool(alerts))
         return {
             "score": float(score),
             "level": level,
             "alerts": alerts
         }
 
+    def _level(self, score: float) -> str:
+        """分数 -> 市场状态等级"""
+        if score >= self.thresholds.get("pause", 80):
+            return "pause"
+        if score >= self.thresholds.get("tighten", 60):
+            return "tighten"
+        return "normal"
+
+    def regime(self, now: Optional[float] = None) -> dict:
+        """
+        查询当前市场状态（线程安全，可在任意线程调用）
+        
+        衰减模式下按 now（秒，缺省用本地时间）惰性计算衰减后的总分与各检测器分数；
+        否则返回最近一次 update 的分数。
+        """
+        if self._decay is None:
+            score = self._last_score
+            return {"score": score, "level": self._level(score), "detectors": {}}
+        now = time() if now is None else float(now)
+        score = self._decay.total(now)
+        return {"score": score, "level": self._level(score),
+                "detectors": self._decay.by_detector(now)}
+
+    def observe_feed(self, venue: str, msg: Union[dict, int, float],
+                     recv_ts: Optional[float] = None) -> None:
+        """
+        记录一条行情消息的时间戳，用于行情源停滞/延迟检测
+        
+        Args:
+            venue: 行情源名称（如 "bybit"、"lighter"）
+            msg: Ticker/Orderbook（取 ts 字段，毫秒）或交易所时间戳（毫秒）
+            recv_ts: 本地接收时间（秒），缺省用当前时间
+        """
+        self.feed_detector.observe(venue, msg, recv_ts)
+
+    def on_liquidation(self, msg: dict) -> None:
+        """pybit all_liquidation_stream / liquidation_stream 回调（可在 WebSocket 线程中调用）"""
+        self.liq_detector.on_bybit_liquidation(msg)
+
+    def on_open_interest(self, resp: dict) -> None:
+        """MarketHTTP.get_open_interest 的返回（定时轮询后传入）"""
+        self.liq_detector.on_bybit_open_interest(resp)
+
+    def on_trades(self, msg: dict) -> None:
+        """pybit trade_stream 回调（可在 WebSocket 线程中调用）"""
+        self.vpin_detector.on_bybit_trades(msg)
+
+    def _stream_inputs(self) -> bool:
+        """是否接入了按消息流喂入、需逐行按时间评估的检测器"""
+        return bool(self.feed_detector.venues) or self.liq_detector.active or self.vpin_detector.active
+
+    def _detectors(self) -> dict:
+        """检测器名称 -> 实例"""
+        return {
+            "vol_spike": self.vol_detector,
+            "realized_vol": self.rv_detector,
+            "spread_blowout": self.spread_detector,
+            "lead_lag": self.lead_lag_detector,
+            "funding_shock": self.funding_detector,
+            "ob_imbalance": self.ob_detector,
+            "whale_onchain": self.whale_detector,
+            "news": self.news_detector,
+            "feed_health": self.feed_detector,
+            "liquidation": self.liq_detector,
+            "vpin": self.vpin_detector,
+        }
+
+    def _run(self, name: str, fn, *args) -> Optional[dict]:
+        """调用检测器并记录耗时与是否告警"""
+        t0 = perf_counter_ns()
+        res = fn(*args)
+        self._stats[name].record(perf_counter_ns() - t0, res is not None)
+        return res
+
+    def _step(self, name: str, inputs: Optional[dict], now_ts: float, fn, *args) -> Optional[dict]:
+        """
+        按调度运行检测器
+        
+        未启用调度（inputs 为空）时直接运行；否则声明的输入与上次相同且未到下次评估时间时跳过，
+        返回 None，上次告警（若有）放入 _held 供本 tick 计分。"stream" 输入取检测器已接收的消息数。
+        """
+        if inputs is None:
+            return self._run(name, fn, *args)
+        slot = self._schedule[name]
+        if slot.always:
+            return self._run(name, fn, *args)
+        det = self._detectors_map[name]
+        key = tuple(det.messages if k == "stream" else inputs[k] for k in det.INPUTS)
+        if key == slot.key and now_ts < slot.due:
+            slot.skipped += 1
+            if slot.cached is not None:
+                self._held.append(slot.cached)
+            return None
+        res = self._run(name, fn, *args)
+        slot.key = key
+        slot.due = now_ts + slot.cadence if slot.cadence > 0 else float("inf")
+        # 缓存未加权的副本（告警分数会在 _tick 中就地乘以权重）
+        slot.cached = None if res is None else dict(res)
+        return res
+
+    def _reset_schedule(self) -> None:
+        """清空调度缓存（检测器状态被整体替换后调用）"""
+        if self._schedule is not None:
+            for slot in self._schedule.values():
+                slot.reset()
+
+    def update_batch(self, px_a: np.ndarray, px_b: np.ndarray, vol_a: np.ndarray,
+                     next_rate_a: np.ndarray, ts: np.ndarray) -> RegimeBatchResult:
+        """
+        批量重放历史数组（回测用），逐行结果与按行调用 update(..., ts=ts[i]) 一致
+        
+        各检测器用滑窗视图向量化计算 z 分数，权重/阈值整列计算，
+        冷却只在候选行上顺序扫描一遍。调用后检测器窗口与冷却状态随之推进。
+        若配置了事件时间窗口（win_sec）、启用了调度（schedule）或衰减分数（decay），
+        或已接入消息流检测器（行情源健康、强平、VPIN），退化为逐行调用
+        （结果一致，不输出日志/webhook）。
+        
+        Args:
+            px_a: 交易所A价格列
+            px_b: 交易所B价格列
+            vol_a: 交易所A成交量列
+            next_rate_a: 交易所A下一期资金费列
+            ts: 事件时间戳列（秒）
+            
+        Returns:
+            RegimeBatchResult: 每行分数/等级数组 + 稀疏告警表（ALERT_DTYPE）
+        """
+        ts = np.asarray(ts)
+        n = len(ts)
+        if not (len(px_a) == len(px_b) == len(vol_a) == len(next_rate_a) == n):
+            raise ValueError("all input columns must have the same length")
+        
+        if (self._uses_time_windows() or self._stream_inputs()
+                or self._schedule is not None or self._decay is not None):
+            return self._replay_rows(px_a, px_b, vol_a, next_rate_a, ts)
+        
+        # 各检测器列结果：(名称, 严重度, 结果)
+        vol_res = self.vol_detector.update_batch(px_a, vol_a)
+        results = [
+            ("vol_spike", "high", vol_res),
+            ("spread_blowout", "high", self.spread_detector.update_batch(px_a, px_b)),
+            ("funding_shock", "warn", self.funding_detector.update_batch(next_rate_a)),
+        ]
+        if self.rv_detector.cfg.enabled:
+            results.append(("realized_vol", "warn", self.rv_detector.update_batch(vol_res["ret"], ts)))
+        if self.lead_lag_detector.cfg.enabled:
+            results.append(("lead_lag", "warn", self.lead_lag_detector.update_batch(px_a, px_b, ts)))
+        
+        # 应用权重并累加总分数
+        score = np.zeros(n)
+        tables = []
+        for name, severity, res in results:
+            fired = res["fired"]
+            w = float(self.weights.get(name, 1.0))
+            s = np.where(fired, res["score"] * w, 0.0)
+            score += s
+            idx = np.flatnonzero(fired)
+            t = np.empty(len(idx), dtype=ALERT_DTYPE)
+            t["idx"] = idx
+            t["ts"] = ts[idx].astype(np.int64)
+            t["name"] = name
+            t["severity"] = severity
+            t["score"] = s[idx]
+            tables.append(t)
+        alerts = np.concatenate(tables)
+        alerts = alerts[np.argsort(alerts["idx"], kind="stable")]
+        
+        # 确定市场状态等级
+        pause = self.thresholds.get("pause", 80)
+        tighten = self.thresholds.get("tighten", 60)
+        level = np.full(n, "normal", dtype="U7")
+        level[score >= tighten] = "tighten"
+        level[score >= pause] = "pause"
+        
+        # 冷却机制：仅在候选行上顺序扫描
+        last_fire = self._last_fire_ts
+        for i in np.flatnonzero(level != "normal"):
+            now = int(ts[i])
+            if now - last_fire < self.cooldown_sec:
+                level[i] = "normal"
+            else:
+                last_fire = now
+        self._last_fire_ts = last_fire
+        if n:
+            self._last_event_ts = float(ts[-1])
+        
+        self.logger.info(
+            f"Sentinel batch replayed {n} rows: {len(alerts)} alerts, "
+            f"{int(np.count_nonzero(level == 'tighten'))} tighten, "
+            f"{int(np.count_nonzero(level == 'pause'))} pause"
+        )
+        return {
+            "score": score,
+            "level": level,
+            "alerts": alerts
+        }
+
+    def _uses_time_windows(self) -> bool:
+        """是否有检测器使用事件时间窗口"""
+        return any(getattr(d.cfg, "win_sec", None) for d in
+                   (self.vol_detector, self.spread_detector, self.funding_detector))
+
+    def _replay_rows(self, px_a, px_b, vol_a, next_rate_a, ts) -> RegimeBatchResult:
+        """逐行回放，输出与 update_batch 相同的结构"""
+        n = len(ts)
+        score = np.zeros(n)
+        level = np.full(n, "normal", dtype="U7")
+        rows = []
+        for i in range(n):
+            res = self._tick(float(px_a[i]), float(px_b[i]), float(vol_a[i]),
+                             float(next_rate_a[i]), ts=float(ts[i]), emit=False)
+            score[i] = res["score"]
+            level[i] = res["level"]
+            for a in res["alerts"]:
+                rows.append((i, int(ts[i]), a["name"], a["severity"], a["score"]))
+        alerts = np.array(rows, dtype=ALERT_DTYPE)
+        return {
+            "score": score,
+            "level": level,
+            "alerts": alerts
+        }
+
+    def snapshot(self, path: str) -> None:
+        """
+        把各检测器窗口、冷却状态和最近分数写入二进制快照（.npz，无 pickle）
+        
+        先写临时文件再原子替换，进程中途退出不会留下半个快照。
+        """
+        arrays: Dict[str, np.ndarray] = {
+            "meta.version": np.array(SNAPSHOT_VERSION),
+            "meta.saved_at": np.array(time()),
+            "engine.last_fire_ts": np.array(self._last_fire_ts),
+            "engine.last_score": np.array(self._last_score),
+            "engine.last_level": np.array(self._last_level),
+            "engine.last_event_ts": np.array(
+                np.nan if self._last_event_ts is None else self._last_event_ts
+            ),
+        }
+        for name, det in self._detectors().items():
+            for k, v in det.state().items():
+                arrays[f"{name}.{k}"] = np.asarray(v)
+        if self._decay is not None:
+            for k, v in self._decay.state().items():
+                arrays[f"engine.decay.{k}"] = v
+        
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+        self.logger.info(f"Sentinel snapshot saved to {path} ({len(arrays)} arrays)")
+
+    def restore(self, path: Optional[str] = None,
+                backfill: Optional[Dict[str, np.ndarray]] = None) -> bool:
+        """
+        从快照恢复检测器窗口与冷却状态，并可用历史数据补齐
+        
+        Args:
+            path: snapshot() 写出的快照文件；不存在时跳过
+            backfill: 历史列数据（px_a/px_b/vol_a/next_rate_a/ts，见 data.backfill.load_cache），
+                      只回放晚于快照最后事件时间的行
+            
+        Returns:
+            bool: 是否从快照恢复成功
+        """
+        restored = False
+        if path and os.path.exists(path):
+            with np.load(path, allow_pickle=False) as z:
+                st = {k: z[k] for k in z.files}
+            version = int(st.get("meta.version", -1))
+            if version != SNAPSHOT_VERSION:
+                self.logger.warning(f"Ignoring sentinel snapshot {path}: version {version}")
+            else:
+                for name, det in self._detectors().items():
+                    det.load_state(_sub(st, f"{name}."))
+                self._last_fire_ts = int(st["engine.last_fire_ts"])
+                self._last_score = float(st["engine.last_score"])
+                self._last_level = str(st.get("engine.last_level", "normal"))
+                last_ts = float(st["engine.last_event_ts"])
+                self._last_event_ts = None if np.isnan(last_ts) else last_ts
+                self._reset_schedule()
+                if self._decay is not None:
+                    self._decay.load_state(_sub(st, "engine.decay."))
+                restored = True
+                self.logger.info(f"Sentinel state restored from {path}")
+        
+        if backfill is not None:
+            self.prefill(backfill["px_a"], backfill["px_b"], backfill["vol_a"],
+                         backfill["next_rate_a"], backfill["ts"])
+        return restored
+
+    def prefill(self, px_a: np.ndarray, px_b: np.ndarray, vol_a: np.ndarray,
+                next_rate_a: np.ndarray, ts: np.ndarray) -> int:
+        """
+        用历史数据预热检测器窗口，不改变冷却、衰减分数、等级与运行指标
+        
+        只使用晚于当前最后事件时间的行，可在 restore 后补齐停机期间的缺口。
+        历史行上的告警不计入当前状态（逐行回放时同样如此）。
+        
+        Returns:
+            int: 实际回放的行数
+        """
+        ts = np.asarray(ts, dtype=float)
+        cols = [np.asarray(c, dtype=float) for c in (px_a, px_b, vol_a, next_rate_a)]
+        if self._last_event_ts is not None:
+            keep = ts > self._last_event_ts
+            ts = ts[keep]
+            cols = [c[keep] for c in cols]
+        if len(ts) == 0:
+            return 0
+        saved = (self._last_fire_ts, self._last_score, self._last_level, self._stats, self._tick_stats)
+        decay = None if self._decay is None else self._decay.state()
+        skipped = None if self._schedule is None else {n: s.skipped for n, s in self._schedule.items()}
+        # 回放期间的耗时/命中计入临时统计，之后丢弃
+        self._stats = {name: DetectorStats(name) for name in self._stats}
+        self._tick_stats = DetectorStats("update")
+        try:
+            self.update_batch(*cols, ts)
+        finally:
+            self._last_fire_ts, self._last_score, self._last_level, self._stats, self._tick_stats = saved
+            if decay is not None:
+                self._decay.load_state(decay)
+            if skipped is not None:
+                for name, n in skipped.items():
+                    self._schedule[name].skipped = n
+        return len(ts)
+
     def _log_alerts(self, alerts: List[Alert], score: float, level: str):
         """记录告警日志"""
         self.logger.warning(f"Sentinel Alert - Score: {score:.2f}, Level: {level}")
@@ -164,11 +728,9 @@ class SentinelEngine:
             )
 
     def _send_webhook(self, alerts: List[Alert], score: float, level: str):
-        """发送webhook告警（占位实现）"""
-        webhook_url = self.outputs.get("webhook")
-        if webhook_url:
-            # 占位实现，后续接入Slack/Discord等
-            self.logger.info(f"Would send webhook to {webhook_url}")
+        """提交webhook告警到后台分发器（不阻塞）"""
+        if self._dispatcher is not None:
+            self._dispatcher.submit(alerts, score, level)
 
     def get_status(self) -> dict:
         """获取哨兵引擎状态"""
@@ -178,9 +740,46 @@ class SentinelEngine:
             "thresholds": self.thresholds,
             "weights": self.weights,
             "last_fire_ts": self._last_fire_ts,
-            "outputs": self.outputs
+            "outputs": self.outputs,
+            "webhook": dict(self._dispatcher.stats) if self._dispatcher else None,
+            "last_score": self._last_score,
+            "update": self._tick_stats.summary(),
+            "realized_vol": self.rv_detector.estimates() if self.rv_detector.cfg.enabled else None,
+            "feeds": self.feed_detector.summary(),
+            "decay": None if self._decay is None else self.regime(self._last_event_ts),
+            "schedule": None if self._schedule is None else {
+                name: {"cadence_sec": slot.cadence, "skipped": slot.skipped}
+                for name, slot in self._schedule.items()
+            },
+            "detectors": {
+                name: dict(self._stats[name].summary(), ready=bool(det.ready))
+                for name, det in self._detectors().items()
+            }
+        }
+
+    def metrics_snapshot(self) -> dict:
+        """机器可读的运行指标快照：各检测器延迟直方图、调用/告警计数、预热状态"""
+        detectors = snapshot_all(self._stats)
+        for name, det in self._detectors().items():
+            detectors[name]["ready"] = bool(det.ready)
+        return {
+            "ts": int(time()),
+            "update": self._tick_stats.snapshot(),
+            "detectors": detectors,
         }
 
+    def reset_metrics(self):
+        """清空运行指标"""
+        self._tick_stats.reset()
+        for st in self._stats.values():
+            st.reset()
+
+    def close(self):
+        """停止后台分发器并发送剩余告警"""
+        if self._dispatcher is not None:
+            self._dispatcher.close()
+            self._dispatcher = None
+
     def reset_cooldown(self):
         """重置冷却时间（用于测试或手动干预）"""
         self._last_fire_ts = 0
@@ -0,0 +1,154 @@
+"""
+检测器运行指标模块
+Detector instrumentation module
+
+为热路径上的每个检测器记录低开销运行指标：
+- 单调纳秒计时（perf_counter_ns），预分配对数延迟直方图桶（每个 2 倍区间再分 4 档）
+- 调用次数、告警次数、累计/最大耗时
+- 可导出为机器可读的快照（dict，可直接 JSON 序列化）
+- DecayingHistogram: 同一分桶上的指数衰减直方图，常量内存估计近期分位数
+"""
+
+from __future__ import annotations
+from typing import Dict, List, Optional
+import numpy as np
+
+# 每个 2 倍区间细分的子桶数（2 的幂），相对分辨率约 1/SUB
+SUB_BITS = 2
+SUB = 1 << SUB_BITS
+# 覆盖到 2^36 ns（约 68 秒），更慢的调用计入最后一个桶
+N_OCTAVES = 36
+N_BUCKETS = (N_OCTAVES + 1) * SUB
+
+
+def bucket_index(dt_ns: int) -> int:
+    """耗时 -> 桶下标：小于 2^SUB_BITS ns 直接按值计，之后按 (区间, 子桶) 计"""
+    k = dt_ns.bit_length()
+    if k <= SUB_BITS:
+        return dt_ns
+    idx = (k - SUB_BITS) * SUB + ((dt_ns >> (k - 1 - SUB_BITS)) & (SUB - 1))
+    return idx if idx < N_BUCKETS else N_BUCKETS - 1
+
+
+def bucket_upper_ns(idx: int) -> int:
+    """桶下标 -> 该桶上界（不含）"""
+    if idx < SUB:
+        return idx + 1
+    k = idx // SUB + SUB_BITS
+    sub = idx % SUB
+    return (SUB + sub + 1) << (k - 1 - SUB_BITS)
+
+
+class DetectorStats:
+    """单个检测器的调用计数与延迟直方图。"""
+
+    __slots__ = ("name", "calls", "alerts", "total_ns", "max_ns", "buckets")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.buckets: List[int] = [0] * N_BUCKETS
+        self.reset()
+
+    def reset(self) -> None:
+        self.calls = 0
+        self.alerts = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        for i in range(N_BUCKETS):
+            self.buckets[i] = 0
+
+    def record(self, dt_ns: int, fired: bool) -> None:
+        """记录一次调用"""
+        self.calls += 1
+        self.total_ns += dt_ns
+        if dt_ns > self.max_ns:
+            self.max_ns = dt_ns
+        if fired:
+            self.alerts += 1
+        self.buckets[bucket_index(dt_ns)] += 1
+
+    def percentile_ns(self, q: float) -> int:
+        """按直方图估计 q 分位延迟（取所在桶上界）"""
+        if self.calls == 0:
+            return 0
+        target = q * self.calls
+        acc = 0
+        for k, c in enumerate(self.buckets):
+            acc += c
+            if acc >= target:
+                return min(bucket_upper_ns(k), self.max_ns)
+        return self.max_ns
+
+    @property
+    def mean_ns(self) -> float:
+        return self.total_ns / self.calls if self.calls else 0.0
+
+    def summary(self) -> dict:
+        """简要摘要（用于 get_status）"""
+        return {
+            "calls": self.calls,
+            "alerts": self.alerts,
+            "mean_us": round(self.mean_ns / 1e3, 3),
+            "p99_us": round(self.percentile_ns(0.99) / 1e3, 3),
+            "max_us": round(self.max_ns / 1e3, 3),
+        }
+
+    def snapshot(self) -> dict:
+        """完整快照，含直方图（桶上界 ns -> 次数，省略空桶）"""
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "alerts": self.alerts,
+            "hit_rate": self.alerts / self.calls if self.calls else 0.0,
+            "total_ns": self.total_ns,
+            "mean_ns": self.mean_ns,
+            "max_ns": self.max_ns,
+            "p50_ns": self.percentile_ns(0.50),
+            "p90_ns": self.percentile_ns(0.90),
+            "p99_ns": self.percentile_ns(0.99),
+            "histogram_ns": {bucket_upper_ns(k): c for k, c in enumerate(self.buckets) if c},
+        }
+
+
+def snapshot_all(stats: Dict[str, DetectorStats]) -> Dict[str, dict]:
+    """批量导出快照"""
+    return {name: s.snapshot() for name, s in stats.items()}
+
+
+class DecayingHistogram:
+    """
+    常量内存的流式分位数：与 DetectorStats 相同的对数分桶，计数按半衰期指数衰减
+
+    用于“最近一段时间”的延迟分布（如行情延迟基线），桶数固定，不保存样本。
+    """
+
+    __slots__ = ("half_life", "counts", "total", "_last_decay")
+
+    def __init__(self, half_life: float):
+        self.half_life = float(half_life)
+        self.counts = np.zeros(N_BUCKETS)
+        self.total = 0.0
+        self._last_decay: Optional[float] = None
+
+    def add(self, value: int, now: float) -> None:
+        """记录一个非负整数样本（单位由调用方约定，如微秒）；now 为当前时间（秒）"""
+        self.decay(now)
+        self.counts[bucket_index(max(0, int(value)))] += 1.0
+        self.total += 1.0
+
+    def decay(self, now: float) -> None:
+        """把计数衰减到 now：连续乘 0.5^(Δt/half_life)，分位数随时间平滑变化；时间回退时不衰减"""
+        if self._last_decay is None:
+            self._last_decay = now
+        elif now > self._last_decay:
+            f = 0.5 ** ((now - self._last_decay) / self.half_life)
+            self.counts *= f
+            self.total *= f
+            self._last_decay = now
+
+    def percentile(self, q: float) -> int:
+        """q 分位（所在桶上界）；无样本时为 0"""
+        if self.total <= 0:
+            return 0
+        k = int(np.searchsorted(np.cumsum(self.counts), q * self.total))
+        return bucket_upper_ns(min(k, N_BUCKETS - 1))
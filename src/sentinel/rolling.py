@@ -0,0 +1,805 @@
+"""
+滑动窗口统计内核
+Rolling-window statistics kernels
+
+供各检测器共享的增量统计结构：
+- RollingStats: 定长环形缓冲 + 滑动 Welford 均值/方差，O(1)/tick，定期重锚消除浮点漂移
+- RollingQuantile: 有序环（FIFO 环 + 二分维护的有序表），窗口中位数/任意分位数
+- TimeWindowStats / TimeWindowQuantile: 按事件时间定长（如最近 120 秒）的对应实现，
+  按时间有序的队列淘汰过期样本，摊还 O(1)；乱序样本按时间插入，已过期的丢弃
+- RollingStatsBank / RollingQuantileBank: N 路并行的 RollingStats / RollingQuantile
+  （二维环形缓冲，按列独立推进与统计，多标的共用；缺失样本按列跳过）
+- rolling_zscore / rolling_median: 历史数组上的向量化等价实现（批量回放用）
+- decayed_cumsum: 按事件时间指数衰减累加的向量化实现（EWMA 类估计的批量回放用）
+"""
+
+from __future__ import annotations
+import math
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from typing import Iterable, Optional
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# 向量化滑窗时每块最多展开的元素数，控制临时数组内存
+_CHUNK_ELEMS = 1 << 21
+
+
+def _sorted_median(srt: list) -> float:
+    n = len(srt)
+    if n == 0:
+        raise IndexError("empty window")
+    h = n // 2
+    if n % 2:
+        return srt[h]
+    return (srt[h - 1] + srt[h]) / 2.0
+
+
+def _sorted_quantile(srt: list, q: float) -> float:
+    n = len(srt)
+    if n == 0:
+        raise IndexError("empty window")
+    if not 0.0 <= q <= 1.0:
+        raise ValueError("q must be in [0, 1]")
+    pos = q * (n - 1)
+    lo = int(math.floor(pos))
+    hi = min(lo + 1, n - 1)
+    t = pos - lo
+    a, b = srt[lo], srt[hi]
+    # 与 numpy._lerp 相同的插值写法，t>=0.5 时从上端回推以保持单调
+    if t >= 0.5:
+        return b - (b - a) * (1.0 - t)
+    return a + (b - a) * t
+
+
+def _insert_by_time(dq: deque, ts: float, x: float) -> None:
+    """乱序样本从队尾向前找位置插入，保持队列按时间有序（同时间戳排在已有样本之后）"""
+    i = len(dq)
+    while i and dq[i - 1][0] > ts:
+        i -= 1
+    dq.insert(i, (ts, x))
+
+
+class RollingStats:
+    """定长滑窗均值/方差（总体方差，ddof=0）：环形缓冲 + 滑动 Welford 更新。"""
+
+    __slots__ = ("size", "reanchor_every", "_buf", "_pos", "_count",
+                 "_mean", "_m2", "_since_anchor")
+
+    def __init__(self, size: int, reanchor_every: Optional[int] = None):
+        if size < 1:
+            raise ValueError("size must be >= 1")
+        self.size = int(size)
+        # 满窗后每 reanchor_every 次更新按缓冲区精确重算一次，摊还 O(1)
+        self.reanchor_every = int(reanchor_every or max(4 * self.size, 256))
+        self._buf = [0.0] * self.size
+        self.reset()
+
+    def reset(self) -> None:
+        """清空窗口"""
+        self._pos = 0
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._since_anchor = 0
+
+    def push(self, x: float, ts: Optional[float] = None) -> None:
+        """追加一个样本；窗口满时覆盖最旧样本（ts 仅为与时间窗口接口一致，此处忽略）"""
+        x = float(x)
+        pos = self._pos
+        if self._count < self.size:
+            # 填充阶段：标准 Welford 增量
+            self._count += 1
+            d = x - self._mean
+            self._mean += d / self._count
+            self._m2 += d * (x - self._mean)
+        else:
+            # 满窗：同时移出最旧样本、移入新样本
+            old = self._buf[pos]
+            mean = self._mean
+            new_mean = mean + (x - old) / self.size
+            self._m2 += (x - old) * (x - new_mean + old - mean)
+            self._mean = new_mean
+            self._since_anchor += 1
+        self._buf[pos] = x
+        self._pos = pos + 1 if pos + 1 < self.size else 0
+        if self._since_anchor >= self.reanchor_every:
+            self._reanchor()
+
+    def extend(self, xs: Iterable[float]) -> None:
+        """依次追加多个样本"""
+        for x in xs:
+            self.push(x)
+
+    def _reanchor(self) -> None:
+        """按缓冲区两遍法重算均值与 M2，消除累计误差"""
+        n = self._count
+        buf = self._buf if n == self.size else self._buf[:n]
+        mean = math.fsum(buf) / n
+        self._mean = mean
+        self._m2 = math.fsum((v - mean) * (v - mean) for v in buf)
+        self._since_anchor = 0
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def full(self) -> bool:
+        return self._count >= self.size
+
+    @property
+    def last(self) -> float:
+        """最近一个样本"""
+        if self._count == 0:
+            raise IndexError("empty window")
+        return self._buf[self._pos - 1]
+
+    @property
+    def mean(self) -> float:
+        return self._mean
+
+    @property
+    def var(self) -> float:
+        if self._count == 0:
+            return 0.0
+        return max(self._m2, 0.0) / self._count
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.var)
+
+    def zscore(self, x: Optional[float] = None, eps: float = 1e-12) -> float:
+        """x 相对窗口均值的 z 分数（默认取最近样本），与 (x-mean)/(std+eps) 口径一致"""
+        if x is None:
+            x = self.last
+        return (x - self._mean) / (self.std + eps)
+
+    def values(self) -> np.ndarray:
+        """按时间顺序返回窗口内样本（会分配新数组，仅用于调试/快照）"""
+        if self._count < self.size:
+            return np.array(self._buf[:self._count], dtype=float)
+        return np.array(self._buf[self._pos:] + self._buf[:self._pos], dtype=float)
+
+    def state(self) -> dict:
+        """导出窗口状态（用于快照）"""
+        return {"values": self.values()}
+
+    def load_state(self, st: dict) -> None:
+        """从快照恢复窗口；窗口变小时只保留最近样本"""
+        self.reset()
+        self.extend(np.asarray(st["values"], dtype=float)[-self.size:])
+
+    def __len__(self) -> int:
+        return self._count
+
+
+class RollingQuantile:
+    """定长滑窗分位数：FIFO 环记录到达顺序，有序表用二分查找增删，查询 O(1)。"""
+
+    __slots__ = ("size", "_buf", "_pos", "_count", "_sorted")
+
+    def __init__(self, size: int):
+        if size < 1:
+            raise ValueError("size must be >= 1")
+        self.size = int(size)
+        self._buf = [0.0] * self.size
+        self.reset()
+
+    def reset(self) -> None:
+        """清空窗口"""
+        self._pos = 0
+        self._count = 0
+        self._sorted: list = []
+
+    def push(self, x: float, ts: Optional[float] = None) -> None:
+        """追加一个样本；窗口满时移除最旧样本（ts 仅为与时间窗口接口一致，此处忽略）"""
+        x = float(x)
+        pos = self._pos
+        if self._count < self.size:
+            self._count += 1
+        else:
+            srt = self._sorted
+            del srt[bisect_left(srt, self._buf[pos])]
+        self._buf[pos] = x
+        insort(self._sorted, x)
+        self._pos = pos + 1 if pos + 1 < self.size else 0
+
+    def extend(self, xs: Iterable[float]) -> None:
+        """依次追加多个样本"""
+        for x in xs:
+            self.push(x)
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def full(self) -> bool:
+        return self._count >= self.size
+
+    @property
+    def last(self) -> float:
+        """最近一个样本"""
+        if self._count == 0:
+            raise IndexError("empty window")
+        return self._buf[self._pos - 1]
+
+    def median(self) -> float:
+        """窗口中位数，口径与 np.median 一致（偶数个取中间两数均值）"""
+        return _sorted_median(self._sorted)
+
+    def quantile(self, q: float) -> float:
+        """窗口分位数，q∈[0,1]，线性插值（与 np.quantile 默认 method='linear' 一致）"""
+        return _sorted_quantile(self._sorted, q)
+
+    def rank(self, x: float) -> float:
+        """x 在窗口内的经验分位（<= x 的样本占比）"""
+        if self._count == 0:
+            raise IndexError("empty window")
+        return bisect_right(self._sorted, x) / self._count
+
+    def values(self) -> np.ndarray:
+        """按时间顺序返回窗口内样本（会分配新数组，仅用于调试/快照）"""
+        if self._count < self.size:
+            return np.array(self._buf[:self._count], dtype=float)
+        return np.array(self._buf[self._pos:] + self._buf[:self._pos], dtype=float)
+
+    def state(self) -> dict:
+        """导出窗口状态（用于快照）"""
+        return {"values": self.values()}
+
+    def load_state(self, st: dict) -> None:
+        """从快照恢复窗口；窗口变小时只保留最近样本"""
+        self.reset()
+        self.extend(np.asarray(st["values"], dtype=float)[-self.size:])
+
+    def __len__(self) -> int:
+        return self._count
+
+
+class TimeWindowStats:
+    """按事件时间定长的滑窗均值/方差：保留 ts > now - win_sec 的样本，增删均用 Welford 增量。"""
+
+    __slots__ = ("win_sec", "reanchor_every", "_dq", "_count", "_mean", "_m2",
+                 "_ops", "_first_ts", "_last_ts")
+
+    def __init__(self, win_sec: float, reanchor_every: int = 4096):
+        if win_sec <= 0:
+            raise ValueError("win_sec must be > 0")
+        self.win_sec = float(win_sec)
+        self.reanchor_every = int(reanchor_every)
+        self._dq: deque = deque()
+        self.reset()
+
+    def reset(self) -> None:
+        """清空窗口"""
+        self._dq.clear()
+        self._count = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+        self._ops = 0
+        self._first_ts: Optional[float] = None
+        self._last_ts: Optional[float] = None
+
+    def push(self, x: float, ts: float) -> None:
+        """
+        追加一个样本并淘汰 ts - win_sec 之前（含）的样本
+
+        ts 早于已见最晚时间的乱序样本按时间插入，已落在窗口之外的直接丢弃。
+        """
+        x = float(x)
+        ts = float(ts)
+        if self._first_ts is None:
+            self._first_ts = ts
+        if self._last_ts is not None and ts < self._last_ts:
+            if ts <= self._last_ts - self.win_sec:
+                return
+            self._first_ts = min(self._first_ts, ts)
+            _insert_by_time(self._dq, ts, x)
+        else:
+            self._last_ts = ts
+            self._dq.append((ts, x))
+        self._count += 1
+        d = x - self._mean
+        self._mean += d / self._count
+        self._m2 += d * (x - self._mean)
+        self.evict(self._last_ts)
+        self._ops += 1
+        if self._ops >= self.reanchor_every:
+            self._reanchor()
+
+    def evict(self, now: float) -> None:
+        """淘汰过期样本（每个样本只会被淘汰一次，摊还 O(1)）"""
+        cutoff = now - self.win_sec
+        dq = self._dq
+        while dq and dq[0][0] <= cutoff:
+            _, x = dq.popleft()
+            self._count -= 1
+            if self._count <= 1:
+                # 剩余 0/1 个样本时直接取精确值，不留增删残差
+                self._mean = dq[0][1] if dq else 0.0
+                self._m2 = 0.0
+                continue
+            d = x - self._mean
+            self._mean -= d / self._count
+            self._m2 -= d * (x - self._mean)
+
+    def _reanchor(self) -> None:
+        """按队列两遍法重算均值与 M2，消除累计误差"""
+        self._ops = 0
+        if not self._count:
+            return
+        xs = [x for _, x in self._dq]
+        mean = math.fsum(xs) / self._count
+        self._mean = mean
+        self._m2 = math.fsum((v - mean) * (v - mean) for v in xs)
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    @property
+    def full(self) -> bool:
+        """观测时长已覆盖一个完整窗口，且窗口内至少有 2 个样本"""
+        return (self._count >= 2 and self._first_ts is not None
+                and self._last_ts - self._first_ts >= self.win_sec)
+
+    @property
+    def last(self) -> float:
+        """事件时间最晚的样本"""
+        if self._count == 0:
+            raise IndexError("empty window")
+        return self._dq[-1][1]
+
+    @property
+    def mean(self) -> float:
+        return self._mean
+
+    @property
+    def var(self) -> float:
+        if self._count == 0:
+            return 0.0
+        return max(self._m2, 0.0) / self._count
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.var)
+
+    def zscore(self, x: Optional[float] = None, eps: float = 1e-12) -> float:
+        """x 相对窗口均值的 z 分数（默认取最近样本）"""
+        if x is None:
+            x = self.last
+        return (x - self._mean) / (self.std + eps)
+
+    def values(self) -> np.ndarray:
+        """按时间顺序返回窗口内样本"""
+        return np.array([x for _, x in self._dq], dtype=float)
+
+    def times(self) -> np.ndarray:
+        """按时间顺序返回窗口内样本的时间戳"""
+        return np.array([t for t, _ in self._dq], dtype=float)
+
+    def state(self) -> dict:
+        """导出窗口状态（用于快照）"""
+        return {
+            "values": self.values(),
+            "times": self.times(),
+            "first_ts": np.array(np.nan if self._first_ts is None else self._first_ts),
+        }
+
+    def load_state(self, st: dict) -> None:
+        """从快照恢复窗口（保留原始首样本时间，预热状态不丢失）"""
+        self.reset()
+        for t, x in zip(np.asarray(st["times"], dtype=float), np.asarray(st["values"], dtype=float)):
+            self.push(x, t)
+        first_ts = float(st["first_ts"])
+        if not math.isnan(first_ts):
+            self._first_ts = first_ts
+
+    def __len__(self) -> int:
+        return self._count
+
+
+class TimeWindowQuantile:
+    """按事件时间定长的滑窗分位数：FIFO 队列 + 二分维护的有序表。"""
+
+    __slots__ = ("win_sec", "_dq", "_sorted", "_first_ts", "_last_ts")
+
+    def __init__(self, win_sec: float):
+        if win_sec <= 0:
+            raise ValueError("win_sec must be > 0")
+        self.win_sec = float(win_sec)
+        self._dq: deque = deque()
+        self.reset()
+
+    def reset(self) -> None:
+        """清空窗口"""
+        self._dq.clear()
+        self._sorted: list = []
+        self._first_ts: Optional[float] = None
+        self._last_ts: Optional[float] = None
+
+    def push(self, x: float, ts: float) -> None:
+        """追加一个样本并淘汰过期样本（乱序样本同 TimeWindowStats.push）"""
+        x = float(x)
+        ts = float(ts)
+        if self._first_ts is None:
+            self._first_ts = ts
+        if self._last_ts is not None and ts < self._last_ts:
+            if ts <= self._last_ts - self.win_sec:
+                return
+            self._first_ts = min(self._first_ts, ts)
+            _insert_by_time(self._dq, ts, x)
+        else:
+            self._last_ts = ts
+            self._dq.append((ts, x))
+        insort(self._sorted, x)
+        self.evict(self._last_ts)
+
+    def evict(self, now: float) -> None:
+        """淘汰 now - win_sec 之前（含）的样本"""
+        cutoff = now - self.win_sec
+        dq = self._dq
+        srt = self._sorted
+        while dq and dq[0][0] <= cutoff:
+            _, x = dq.popleft()
+            del srt[bisect_left(srt, x)]
+
+    @property
+    def count(self) -> int:
+        return len(self._dq)
+
+    @property
+    def full(self) -> bool:
+        """观测时长已覆盖一个完整窗口"""
+        return (len(self._dq) > 0 and self._first_ts is not None
+                and self._last_ts - self._first_ts >= self.win_sec)
+
+    @property
+    def last(self) -> float:
+        """事件时间最晚的样本"""
+        if not self._dq:
+            raise IndexError("empty window")
+        return self._dq[-1][1]
+
+    def median(self) -> float:
+        """窗口中位数"""
+        return _sorted_median(self._sorted)
+
+    def quantile(self, q: float) -> float:
+        """窗口分位数，线性插值"""
+        return _sorted_quantile(self._sorted, q)
+
+    def rank(self, x: float) -> float:
+        """x 在窗口内的经验分位（<= x 的样本占比）"""
+        if not self._dq:
+            raise IndexError("empty window")
+        return bisect_right(self._sorted, x) / len(self._dq)
+
+    def values(self) -> np.ndarray:
+        """按时间顺序返回窗口内样本"""
+        return np.array([x for _, x in self._dq], dtype=float)
+
+    def times(self) -> np.ndarray:
+        """按时间顺序返回窗口内样本的时间戳"""
+        return np.array([t for t, _ in self._dq], dtype=float)
+
+    def state(self) -> dict:
+        """导出窗口状态（用于快照）"""
+        return {
+            "values": self.values(),
+            "times": self.times(),
+            "first_ts": np.array(np.nan if self._first_ts is None else self._first_ts),
+        }
+
+    def load_state(self, st: dict) -> None:
+        """从快照恢复窗口（保留原始首样本时间，预热状态不丢失）"""
+        self.reset()
+        for t, x in zip(np.asarray(st["times"], dtype=float), np.asarray(st["values"], dtype=float)):
+            self.push(x, t)
+        first_ts = float(st["first_ts"])
+        if not math.isnan(first_ts):
+            self._first_ts = first_ts
+
+    def __len__(self) -> int:
+        return len(self._dq)
+
+
+def _push_columns(ok: np.ndarray, cols: np.ndarray):
+    """
+    按推入掩码选列：返回 (一维按列状态的下标, 二维缓冲的列下标)。
+
+    全部推入时前者为切片（视图、免拷贝）；全不推入时列下标为 None。
+    """
+    if ok.all():
+        return slice(None), cols
+    idx = np.flatnonzero(ok)
+    return idx, (idx if len(idx) else None)
+
+
+class RollingStatsBank:
+    """
+    N 路并行的 RollingStats：(size, N) 二维环形缓冲，按列独立统计。
+
+    各列有自己的写入位置与样本数：push 时 mask 为 False（或值非有限）的列本次不推入，
+    窗口为该列最近 size 个有效样本，缺失/NaN 不会污染该列统计。
+    """
+
+    def __init__(self, size: int, n: int, reanchor_every: Optional[int] = None):
+        if size < 1:
+            raise ValueError("size must be >= 1")
+        self.size = int(size)
+        self.n = int(n)
+        self.reanchor_every = int(reanchor_every or max(4 * self.size, 256))
+        self._buf = np.zeros((self.size, self.n))
+        self._mean = np.zeros(self.n)
+        self._m2 = np.zeros(self.n)
+        self._cols = np.arange(self.n)
+        self.reset()
+
+    def reset(self) -> None:
+        """清空全部列"""
+        self._pos = np.zeros(self.n, dtype=np.intp)
+        self._count = np.zeros(self.n, dtype=np.int64)
+        self._since_anchor = 0
+        self._buf.fill(0.0)
+        self._mean.fill(0.0)
+        self._m2.fill(0.0)
+
+    def push(self, x: np.ndarray, mask: Optional[np.ndarray] = None) -> None:
+        """追加一行样本（长度 N）；只推入 mask 为真且值有限的列，列满时覆盖该列最旧样本"""
+        x = np.asarray(x, dtype=float)
+        ok = np.isfinite(x) if mask is None else (mask & np.isfinite(x))
+        sel, cols = _push_columns(ok, self._cols)
+        if cols is None:
+            return
+        if sel is cols:
+            x = x[cols]
+        pos = self._pos[sel]
+        cnt = self._count[sel]
+        old = self._buf[pos, cols]
+        mean = self._mean[sel]
+        if cnt.min() >= self.size:
+            # 全部已满：d = x - old，e = (x - new_mean) + (old - mean)
+            d = x - old
+            new_mean = mean + d / self.size
+            e = x + old - mean - new_mean
+            full = True
+        else:
+            # 仍有未满的列：这些列做 Welford 追加
+            is_full = cnt >= self.size
+            n_new = np.where(is_full, self.size, cnt + 1)
+            d = np.where(is_full, x - old, x - mean)
+            new_mean = mean + d / n_new
+            e = np.where(is_full, x + old - mean - new_mean, x - new_mean)
+            self._count[sel] = n_new
+            full = is_full.any()
+        self._mean[sel] = new_mean
+        self._m2[sel] += d * e
+        self._buf[pos, cols] = x
+        pos = pos + 1
+        pos[pos == self.size] = 0
+        self._pos[sel] = pos
+        if full:
+            self._since_anchor += 1
+            if self._since_anchor >= self.reanchor_every:
+                self._reanchor()
+
+    def _reanchor(self) -> None:
+        """按缓冲区两遍法重算各列均值与 M2（未满的列只用前 count 行）"""
+        valid = np.arange(self.size)[:, None] < self._count
+        cnt = np.maximum(self._count, 1)
+        self._mean[:] = np.where(valid, self._buf, 0.0).sum(axis=0) / cnt
+        self._m2[:] = np.where(valid, (self._buf - self._mean) ** 2, 0.0).sum(axis=0)
+        self._since_anchor = 0
+
+    @property
+    def count(self) -> np.ndarray:
+        """各列样本数"""
+        return self._count
+
+    @property
+    def full(self) -> np.ndarray:
+        """各列窗口是否已满"""
+        return self._count >= self.size
+
+    @property
+    def last(self) -> np.ndarray:
+        """各列最近一个样本（无样本的列为 0）"""
+        return self._buf[self._pos - 1, self._cols]
+
+    @property
+    def mean(self) -> np.ndarray:
+        return self._mean
+
+    @property
+    def var(self) -> np.ndarray:
+        return np.maximum(self._m2, 0.0) / np.maximum(self._count, 1)
+
+    @property
+    def std(self) -> np.ndarray:
+        return np.sqrt(self.var)
+
+    def zscore(self, eps: float = 1e-12) -> np.ndarray:
+        """各列最近样本的 z 分数"""
+        return (self.last - self._mean) / (self.std + eps)
+
+    def values(self) -> np.ndarray:
+        """按时间顺序返回窗口内样本，形状 (size, N)；未满的列前部为 NaN"""
+        r = np.arange(self.size)[:, None]
+        out = self._buf[(self._pos - self.size + r) % self.size, self._cols]
+        out[r < self.size - self._count] = np.nan
+        return out
+
+    def __len__(self) -> int:
+        return int(self._count.max()) if self.n else 0
+
+
+class RollingQuantileBank:
+    """
+    N 路并行的 RollingQuantile：每列一个 FIFO 环 + 列内有序数组，按列独立推进。
+
+    push 时值与被淘汰的最旧样本相同的列只推进环位置；其余列用新值替换最旧值后做一次
+    列内移位（向量化，O(size·k)，k 为变化的列数），不整体排序。中位数/分位数查询 O(N)。
+    缺失（mask 为 False 或非有限值）的列本次不推入，窗口为该列最近 size 个有效样本。
+    """
+
+    def __init__(self, size: int, n: int):
+        if size < 1:
+            raise ValueError("size must be >= 1")
+        self.size = int(size)
+        self.n = int(n)
+        self._buf = np.zeros((self.size, self.n))
+        # 未填满的位置以 +inf 占位，保持列内有序
+        self._sorted = np.full((self.size, self.n), np.inf)
+        self._cols = np.arange(self.n)
+        self.reset()
+
+    def reset(self) -> None:
+        """清空全部列"""
+        self._pos = np.zeros(self.n, dtype=np.intp)
+        self._count = np.zeros(self.n, dtype=np.int64)
+        self._buf.fill(0.0)
+        self._sorted.fill(np.inf)
+
+    def push(self, x: np.ndarray, mask: Optional[np.ndarray] = None) -> None:
+        """追加一行样本（长度 N）；只推入 mask 为真且值有限的列"""
+        x = np.asarray(x, dtype=float)
+        ok = np.isfinite(x) if mask is None else (mask & np.isfinite(x))
+        sel, cols = _push_columns(ok, self._cols)
+        if cols is None:
+            return
+        if sel is cols:
+            x = x[cols]
+        pos = self._pos[sel]
+        cnt = self._count[sel]
+        old = self._buf[pos, cols]
+        if cnt.min() < self.size:
+            old = np.where(cnt < self.size, np.inf, old)
+            self._count[sel] = np.minimum(cnt + 1, self.size)
+        self._buf[pos, cols] = x
+        pos = pos + 1
+        pos[pos == self.size] = 0
+        self._pos[sel] = pos
+
+        changed = x != old
+        if not changed.all():
+            cols, x, old = cols[changed], x[changed], old[changed]
+            if not len(cols):
+                return
+        every = len(cols) == self.n
+        srt = self._sorted if every else self._sorted[:, cols]
+        # 最旧值在列内的位置 i，新值插入位置 j（按含最旧值的原序计）；
+        # 两者之间的 [min(i,j), max(i,j)) 行即需要整体移动一格的段
+        lt_old = srt < old
+        lt_x = srt < x
+        i = lt_old.sum(axis=0)
+        j = lt_x.sum(axis=0)
+        up = j > i
+        seg = lt_old ^ lt_x
+        seg_up = seg & up
+        seg_dn = seg ^ seg_up
+        # 新值更大：[i, j-1) 行取下一行、新值落在 j-1；否则 [j, i) 行下移一行、新值落在 j
+        srt[:-1] = np.where(seg_up[:-1], srt[1:], srt[:-1])
+        srt[1:] = np.where(seg_dn[:-1], srt[:-1], srt[1:])
+        srt[np.where(up, j - 1, j), np.arange(len(cols))] = x
+        if not every:
+            self._sorted[:, cols] = srt
+
+    @property
+    def count(self) -> np.ndarray:
+        """各列样本数"""
+        return self._count
+
+    @property
+    def full(self) -> np.ndarray:
+        """各列窗口是否已满"""
+        return self._count >= self.size
+
+    def median(self) -> np.ndarray:
+        """各列中位数，口径与 np.median 一致；无样本的列为 NaN"""
+        c = self._count
+        lo = self._sorted[np.maximum(c - 1, 0) // 2, self._cols]
+        hi = self._sorted[c // 2 if self.size > 1 else 0, self._cols]
+        hi = np.where(c % 2 == 1, lo, hi)
+        return np.where(c > 0, (lo + hi) / 2.0, np.nan)
+
+    def quantile(self, q: float) -> np.ndarray:
+        """各列分位数，q∈[0,1]，线性插值（与 np.quantile 默认一致）；无样本的列为 NaN"""
+        if not 0.0 <= q <= 1.0:
+            raise ValueError("q must be in [0, 1]")
+        c = self._count
+        pos = q * np.maximum(c - 1, 0)
+        lo = np.floor(pos).astype(np.intp)
+        hi = np.minimum(lo + 1, np.maximum(c - 1, 0))
+        t = pos - lo
+        a = self._sorted[lo, self._cols]
+        b = self._sorted[hi, self._cols]
+        # 与 _sorted_quantile 相同的插值写法
+        with np.errstate(invalid="ignore"):
+            out = np.where(t >= 0.5, b - (b - a) * (1.0 - t), a + (b - a) * t)
+        return np.where(c > 0, out, np.nan)
+
+    def __len__(self) -> int:
+        return int(self._count.max()) if self.n else 0
+
+
+# ---------------- 向量化实现（批量回放） ----------------
+
+def _rolling_apply(x: np.ndarray, win: int, fn) -> np.ndarray:
+    """对每个完整窗口（以 i 结尾）分块调用 fn(windows)->values，前 win-1 个位置为 nan"""
+    x = np.asarray(x, dtype=float)
+    out = np.full(len(x), np.nan)
+    if win < 1 or len(x) < win:
+        return out
+    w = sliding_window_view(x, win)
+    step = max(1, _CHUNK_ELEMS // win)
+    for start in range(0, len(w), step):
+        blk = w[start:start + step]
+        out[win - 1 + start: win - 1 + start + len(blk)] = fn(blk)
+    return out
+
+
+def rolling_zscore(x: np.ndarray, win: int, eps: float = 1e-12) -> np.ndarray:
+    """每个窗口末样本的 z 分数 (x-mean)/(std+eps)，与 RollingStats.zscore 同口径"""
+    def _z(blk: np.ndarray) -> np.ndarray:
+        return (blk[:, -1] - blk.mean(axis=1)) / (blk.std(axis=1) + eps)
+    return _rolling_apply(x, win, _z)
+
+
+def rolling_median(x: np.ndarray, win: int) -> np.ndarray:
+    """每个窗口的中位数，与 RollingQuantile.median 同口径"""
+    return _rolling_apply(x, win, lambda blk: np.median(blk, axis=1))
+
+
+# 分块时块内最大衰减指数（exp(300) 远小于 float64 上限，给被加数量级留出余量）
+_DECAY_SPAN = 300.0
+
+
+def decayed_cumsum(x: np.ndarray, t: np.ndarray, tau: float,
+                   s0: float = 0.0, t0: Optional[float] = None) -> np.ndarray:
+    """
+    时间衰减累加 s_i = s_{i-1} * exp(-(t_i - t_{i-1}) / tau) + x_i 的向量化实现
+
+    s0 为 t0 时刻的初值（t0 为空时视为 t[0]）。按块内 exp((t - t_base)/tau) 加权做 cumsum，
+    块长受 _DECAY_SPAN 限制以免溢出；与逐样本递推的差异在浮点舍入量级。
+    """
+    x = np.asarray(x, dtype=float)
+    t = np.asarray(t, dtype=float)
+    n = len(x)
+    out = np.empty(n)
+    if t0 is None and n:
+        t0 = float(t[0])
+    start = 0
+    while start < n:
+        base = t[start]
+        end = start + int(np.searchsorted(t[start:], base + _DECAY_SPAN * tau, side="right"))
+        end = max(end, start + 1)
+        rel = (t[start:end] - base) / tau
+        acc = np.cumsum(x[start:end] * np.exp(rel)) * np.exp(-rel)
+        out[start:end] = acc + s0 * np.exp(-(t[start:end] - t0) / tau)
+        s0 = out[end - 1]
+        t0 = float(t[end - 1])
+        start = end
+    return out
@@ -0,0 +1,384 @@
+"""
+哨兵独立进程运行
+Out-of-process sentinel over shared memory
+
+把 SentinelEngine 放到独立进程，策略线程不再承担检测器计算、日志与 webhook：
+- TickRing: 共享内存中的定长 tick 环形缓冲（单生产者/单消费者，生产者从不阻塞）
+- RegimeSlot: 共享内存中的最新 RegimeResult 槽位（seqlock，读端零拷贝读取等级/分数）
+- SentinelProcess: 启动子进程运行引擎，策略侧 publish 行情、读 level
+
+告警 detail 不跨进程传递（槽位只保留定长的名称/严重度/分数），完整告警由子进程的日志/webhook 输出。
+"""
+
+from __future__ import annotations
+from multiprocessing import get_context
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from time import sleep, time
+from typing import Optional
+import logging
+import sys
+import numpy as np
+
+from ..types import RegimeResult
+
+# 等级 <-> 整数编码
+LEVELS = ("normal", "tighten", "pause")
+LEVEL_CODE = {name: i for i, name in enumerate(LEVELS)}
+
+# 槽位中最多保留的告警条数（按分数从高到低）
+MAX_SLOT_ALERTS = 8
+
+# 头部预留一个缓存行，记录区从 64 字节处开始
+_HEADER_BYTES = 64
+
+SLOT_ALERT_DTYPE = np.dtype([
+    ("name", "U16"),
+    ("severity", "U8"),
+    ("score", np.float64),
+])
+
+SLOT_DTYPE = np.dtype([
+    ("seq", np.int64),             # seqlock 序号：奇数表示正在写
+    ("ts", np.float64),            # 结果对应的事件时间
+    ("score", np.float64),
+    ("level", np.int64),
+    ("n_alerts", np.int64),
+    ("ticks", np.int64),           # 已处理的 tick 序号（与 TickRing.head 对比即为积压）
+    ("dropped", np.int64),         # 因消费落后被覆盖丢弃的 tick 数
+    ("fire_ts", np.float64),       # 最近一次 tighten/pause 的事件时间
+    ("fire_level", np.int64),
+    ("alerts", SLOT_ALERT_DTYPE, (MAX_SLOT_ALERTS,)),
+])
+
+
+def attach_shared_memory(name: str) -> SharedMemory:
+    """
+    附着已存在的共享内存段，不向 resource_tracker 登记。
+
+    段的生命周期归创建方（close + unlink）；Python < 3.13 附着时也会登记，
+    进程退出时 resource_tracker 会误报泄漏甚至提前 unlink。
+    """
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name=name, track=False)
+    register = resource_tracker.register
+    resource_tracker.register = lambda *args, **kwargs: None
+    try:
+        return SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def tick_dtype(depth: int = 0) -> np.dtype:
+    """tick 记录结构；depth > 0 时附带前 depth 档盘口（n_bids/n_asks 为 -1 表示本 tick 无盘口）"""
+    fields = [
+        ("ts", np.float64),
+        ("px_a", np.float64),
+        ("px_b", np.float64),
+        ("vol_a", np.float64),
+        ("next_rate_a", np.float64),
+    ]
+    if depth > 0:
+        fields += [
+            ("n_bids", np.int32),
+            ("n_asks", np.int32),
+            ("bids", np.float64, (depth, 2)),
+            ("asks", np.float64, (depth, 2)),
+        ]
+    return np.dtype(fields)
+
+
+class TickRing:
+    """共享内存 tick 环形缓冲：生产者写满后覆盖最旧记录，消费者检测并统计丢弃。"""
+
+    def __init__(self, capacity: int = 4096, depth: int = 0, name: Optional[str] = None):
+        """
+        Args:
+            capacity: 记录条数
+            depth: 每条记录附带的盘口档数（0 表示不带盘口）
+            name: 已存在的共享内存名（消费者端附着）；为空时新建
+        """
+        self.capacity = int(capacity)
+        self.depth = int(depth)
+        self.dtype = tick_dtype(self.depth)
+        size = _HEADER_BYTES + self.capacity * self.dtype.itemsize
+        self._owner = name is None
+        self.shm = SharedMemory(create=True, size=size) if self._owner else attach_shared_memory(name)
+        # head = 已发布的记录总数（下一条写入序号）
+        self._head = np.ndarray((1,), dtype=np.int64, buffer=self.shm.buf, offset=0)
+        self._rec = np.ndarray((self.capacity,), dtype=self.dtype, buffer=self.shm.buf, offset=_HEADER_BYTES)
+        # 按字段的列视图：发布时逐字段写入，避免构造整条记录
+        self._cols = [self._rec[f] for f in ("ts", "px_a", "px_b", "vol_a", "next_rate_a")]
+        if self._owner:
+            self._head[0] = 0
+        # 消费者从头读起（子进程启动前已发布的 tick 也会被处理，超出容量的计入 dropped）
+        self._read = 0
+        self.dropped = 0
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def head(self) -> int:
+        return int(self._head[0])
+
+    def publish(self, px_a: float, px_b: float, vol_a: float, next_rate_a: float,
+                ts: Optional[float] = None, bids=None, asks=None) -> int:
+        """写入一条 tick 并发布，返回其序号（不阻塞，不等待消费者）"""
+        seq = int(self._head[0])
+        i = seq % self.capacity
+        c_ts, c_pa, c_pb, c_vol, c_rate = self._cols
+        c_ts[i] = ts if ts is not None else time()
+        c_pa[i] = px_a
+        c_pb[i] = px_b
+        c_vol[i] = vol_a
+        c_rate[i] = next_rate_a
+        if self.depth:
+            rec = self._rec
+            rec["n_bids"][i] = self._put_levels(rec["bids"][i], bids)
+            rec["n_asks"][i] = self._put_levels(rec["asks"][i], asks)
+        # 记录写完后才推进 head，消费者看到新 head 时记录已完整
+        self._head[0] = seq + 1
+        return seq
+
+    def _put_levels(self, dst: np.ndarray, levels) -> int:
+        if levels is None:
+            return -1
+        lv = np.asarray(levels, dtype=float).reshape(-1, 2)[:self.depth]
+        dst[:len(lv)] = lv
+        return len(lv)
+
+    def read(self) -> np.ndarray:
+        """取出自上次读取以来的新记录（拷贝）；落后超过容量的部分计入 dropped"""
+        head = int(self._head[0])
+        start = self._read
+        if head - start > self.capacity:
+            self.dropped += head - start - self.capacity
+            start = head - self.capacity
+        if head == start:
+            return self._rec[:0].copy()
+        out = self._gather(start, head)
+        # 拷贝期间生产者可能已覆盖最旧的几条，丢弃这部分。生产者先写槽位再发布 head，
+        # 看到 head_now 时它可能正在写序号 head_now（占用序号 head_now - capacity 的槽位），
+        # 因此序号 <= head_now - capacity 的记录都可能被写了一半
+        overwritten = int(self._head[0]) - self.capacity - start + 1
+        if overwritten > 0:
+            self.dropped += overwritten
+            out = out[overwritten:]
+        self._read = head
+        return out
+
+    def _gather(self, start: int, stop: int) -> np.ndarray:
+        """拷贝序号 [start, stop) 的记录（不做一致性检查）"""
+        return self._rec.take(np.arange(start, stop) % self.capacity)
+
+    def close(self) -> None:
+        """解除映射；创建方同时释放共享内存"""
+        self._head = self._rec = self._cols = None
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
+
+
+class RegimeSlot:
+    """共享内存中的最新 RegimeResult：单写者 seqlock，读端不加锁、不等待。"""
+
+    def __init__(self, name: Optional[str] = None):
+        self._owner = name is None
+        self.shm = SharedMemory(create=True, size=SLOT_DTYPE.itemsize) if self._owner else attach_shared_memory(name)
+        self._slot = np.ndarray((1,), dtype=SLOT_DTYPE, buffer=self.shm.buf)
+        # 各字段的视图，读写单个字段无需拷贝整条记录
+        self._seq = self._slot["seq"]
+        self._level = self._slot["level"]
+        self._score = self._slot["score"]
+        if self._owner:
+            self._slot[0] = np.zeros((), dtype=SLOT_DTYPE)
+            self._slot["fire_ts"] = np.nan
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def write(self, result: RegimeResult, ts: float, ticks: int, dropped: int) -> None:
+        """发布一次结果（写者：哨兵进程）"""
+        slot = self._slot[0]
+        seq = int(self._seq[0])
+        self._seq[0] = seq + 1
+        level = LEVEL_CODE[result["level"]]
+        slot["ts"] = ts
+        slot["score"] = result["score"]
+        slot["level"] = level
+        slot["ticks"] = ticks
+        slot["dropped"] = dropped
+        if level:
+            slot["fire_ts"] = ts
+            slot["fire_level"] = level
+        alerts = sorted(result["alerts"], key=lambda a: -a["score"])[:MAX_SLOT_ALERTS]
+        slot["n_alerts"] = len(alerts)
+        for i, a in enumerate(alerts):
+            slot["alerts"][i] = (a["name"], a["severity"], a["score"])
+        self._seq[0] = seq + 2
+
+    def _consistent(self, fn):
+        while True:
+            s0 = int(self._seq[0])
+            if s0 & 1:
+                continue
+            out = fn()
+            if int(self._seq[0]) == s0:
+                return out
+
+    @property
+    def level(self) -> str:
+        """最新等级（读端零拷贝）"""
+        return LEVELS[int(self._level[0])]
+
+    @property
+    def score(self) -> float:
+        return float(self._score[0])
+
+    def read(self) -> dict:
+        """一致地读取整条结果，返回 RegimeResult 形状的 dict（附 ts/ticks/dropped/fire_*）"""
+        rec = self._consistent(self._slot[0].copy)
+        n = int(rec["n_alerts"])
+        return {
+            "score": float(rec["score"]),
+            "level": LEVELS[int(rec["level"])],
+            "alerts": [
+                {"name": str(a["name"]), "severity": str(a["severity"]), "score": float(a["score"]),
+                 "ts": int(rec["ts"]), "detail": {}}
+                for a in rec["alerts"][:n]
+            ],
+            "ts": float(rec["ts"]),
+            "ticks": int(rec["ticks"]),
+            "dropped": int(rec["dropped"]),
+            "fire_ts": float(rec["fire_ts"]),
+            "fire_level": LEVELS[int(rec["fire_level"])],
+        }
+
+    def close(self) -> None:
+        self._slot = self._seq = self._level = self._score = None
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
+
+
+def _run_sentinel(cfg: dict, ring_name: str, slot_name: str, capacity: int, depth: int,
+                  stop, poll_sec: float) -> None:
+    """哨兵子进程主循环：消费 tick -> SentinelEngine.update -> 发布最新结果"""
+    from .engine import SentinelEngine
+
+    ring = TickRing(capacity, depth, name=ring_name)
+    slot = RegimeSlot(name=slot_name)
+    engine = SentinelEngine(cfg)
+    try:
+        while not stop.is_set():
+            rows = ring.read()
+            if not len(rows):
+                sleep(poll_sec)
+                continue
+            done = ring._read - len(rows)
+            for row in rows:
+                done += 1
+                bids = asks = None
+                if depth and row["n_bids"] >= 0 and row["n_asks"] >= 0:
+                    bids = row["bids"][:row["n_bids"]]
+                    asks = row["asks"][:row["n_asks"]]
+                res = engine.update(float(row["px_a"]), float(row["px_b"]), float(row["vol_a"]),
+                                    float(row["next_rate_a"]), bids, asks, ts=float(row["ts"]))
+                # 中间 tick 的 tighten/pause 也要发布，避免被同批后续 tick 覆盖
+                if res["level"] != "normal":
+                    slot.write(res, float(row["ts"]), done, ring.dropped)
+            slot.write(res, float(row["ts"]), done, ring.dropped)
+    finally:
+        engine.close()
+        ring.close()
+        slot.close()
+
+
+class SentinelProcess:
+    """在独立进程中运行 SentinelEngine：策略侧只写 tick、读等级，从不等待检测计算。"""
+
+    def __init__(self, cfg: dict, capacity: Optional[int] = None, depth: Optional[int] = None,
+                 poll_sec: Optional[float] = None):
+        """
+        Args:
+            cfg: 与 SentinelEngine 相同结构的配置字典；可含 process: {capacity, depth, poll_sec}
+            capacity: tick 环形缓冲条数（默认 4096）
+            depth: 随 tick 传递的盘口档数（默认取 ob_imbalance.depth，未配置时为 0）
+            poll_sec: 子进程无新数据时的休眠间隔
+        """
+        self.logger = logging.getLogger(__name__)
+        pcfg = cfg.get("process", {})
+        if depth is None:
+            depth = pcfg.get("depth", cfg.get("detectors", {}).get("ob_imbalance", {}).get("depth", 0))
+        self.ring = TickRing(capacity or pcfg.get("capacity", 4096), depth)
+        self.slot = RegimeSlot()
+        # spawn：子进程不继承父进程的线程/锁状态
+        ctx = get_context("spawn")
+        self._stop = ctx.Event()
+        self._proc = ctx.Process(
+            target=_run_sentinel,
+            args=(cfg, self.ring.name, self.slot.name, self.ring.capacity, self.ring.depth,
+                  self._stop, float(poll_sec or pcfg.get("poll_sec", 0.0005))),
+            name="sentinel",
+            daemon=True,
+        )
+        self._proc.start()
+        self.logger.info(f"SentinelProcess started (pid={self._proc.pid}, capacity={self.ring.capacity})")
+
+    def publish(self, px_a: float, px_b: float, vol_a: float, next_rate_a: float,
+                ts: Optional[float] = None, bids=None, asks=None) -> int:
+        """发布一条 tick（参数同 SentinelEngine.update 的行情部分）"""
+        return self.ring.publish(px_a, px_b, vol_a, next_rate_a, ts, bids, asks)
+
+    @property
+    def level(self) -> str:
+        """最新市场状态等级"""
+        return self.slot.level
+
+    @property
+    def score(self) -> float:
+        return self.slot.score
+
+    def result(self) -> dict:
+        """最新完整结果（见 RegimeSlot.read）"""
+        return self.slot.read()
+
+    @property
+    def lag(self) -> int:
+        """已发布但尚未被哨兵处理的 tick 数"""
+        return self.ring.head - int(self.slot._slot["ticks"][0])
+
+    @property
+    def alive(self) -> bool:
+        return self._proc.is_alive()
+
+    def wait(self, timeout: float = 5.0) -> bool:
+        """等待哨兵追上全部已发布 tick（测试/回放用）"""
+        deadline = time() + timeout
+        while self.lag > 0:
+            if time() > deadline or not self._proc.is_alive():
+                return False
+            sleep(0.0005)
+        return True
+
+    def close(self, timeout: float = 5.0) -> None:
+        """停止子进程并释放共享内存"""
+        if self._proc is None:
+            return
+        self._stop.set()
+        self._proc.join(timeout)
+        if self._proc.is_alive():
+            self._proc.terminate()
+            self._proc.join()
+        self._proc = None
+        self.ring.close()
+        self.slot.close()
+
+    def __enter__(self) -> "SentinelProcess":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
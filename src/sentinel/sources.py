@@ -0,0 +1,89 @@
+"""
+哨兵外部数据源
+Sentinel external data sources
+
+为新闻、链上等低频检测器提供可回放的本地数据源，便于测试与回测：
+- ReplaySource: 通用 JSONL 事件回放（按 ts 排序，按事件时间分批取出）
+- NewsReplaySource: 新闻标题回放（JSONL 或每行一条标题的纯文本）
+- TransferReplaySource: 链上转账/mempool 转储回放
+"""
+
+from __future__ import annotations
+import json
+from pathlib import Path
+from typing import Iterator, List, Optional, Union
+
+
+class ReplaySource:
+    """
+    本地事件回放源
+
+    文件为 JSONL：每行一个对象，可含 "ts"（秒）。
+    ts 缺失的条目在 poll 时总是立即可取。
+    """
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._items = self._load()
+        self._pos = 0
+
+    def _parse_line(self, line: str) -> dict:
+        return json.loads(line)
+
+    def _load(self) -> List[dict]:
+        items: List[dict] = []
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                items.append(self._parse_line(line))
+        # 按事件时间稳定排序，无时间戳的排在最前
+        items.sort(key=lambda it: float(it.get("ts", float("-inf"))))
+        return items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(self._items)
+
+    def poll(self, until_ts: Optional[float] = None) -> List[dict]:
+        """取出事件时间 <= until_ts 的尚未消费条目；until_ts 为空时取出全部"""
+        start = self._pos
+        items = self._items
+        end = start
+        while end < len(items) and (
+            until_ts is None or float(items[end].get("ts", float("-inf"))) <= until_ts
+        ):
+            end += 1
+        self._pos = end
+        return items[start:end]
+
+    def rewind(self) -> None:
+        """回到开头重新回放"""
+        self._pos = 0
+
+
+class NewsReplaySource(ReplaySource):
+    """
+    本地新闻回放源
+
+    文件格式：
+      - .jsonl：每行一个对象，至少含 "title"，可含 "text"/"ts"/"source"
+      - 其他：每行一条标题（无时间戳）
+    """
+
+    def _parse_line(self, line: str) -> dict:
+        if self.path.suffix == ".jsonl":
+            return json.loads(line)
+        return {"title": line}
+
+
+class TransferReplaySource(ReplaySource):
+    """
+    本地链上转账回放源（JSONL，每行一笔交易）
+
+    交易格式：{"ts", "txid", "inputs": [{"address", "value"}], "outputs": [...]}
+    或简化的 {"ts", "from", "to", "amount"}，金额单位 BTC。
+    """
@@ -0,0 +1,102 @@
+"""
+多关键词匹配模块
+Multi-pattern keyword matching module
+
+Aho-Corasick 自动机：由关键词表一次性构建，单遍扫描文本即可找出全部命中：
+- 大小写折叠（casefold）
+- 英文/数字关键词要求词边界（"war" 不匹配 "software"），中日韩等关键词不要求
+- 构建时展开为确定性转移表，扫描时每个字符一次字典查找
+"""
+
+from __future__ import annotations
+from collections import deque
+from typing import Dict, Iterable, List, Set, Tuple
+
+
+def _is_word_char(c: str) -> bool:
+    """需要词边界的字符：ASCII 字母/数字/下划线"""
+    return c.isascii() and (c.isalnum() or c == "_")
+
+
+class KeywordAutomaton:
+    """Aho-Corasick 关键词自动机（构建一次，多次扫描）。"""
+
+    def __init__(self, keywords: Iterable[str]):
+        # 去重并保持原始顺序；匹配按折叠后的形式进行
+        self.keywords: List[str] = []
+        folded: List[str] = []
+        seen: Set[str] = set()
+        for kw in keywords:
+            f = str(kw).casefold()
+            if f and f not in seen:
+                seen.add(f)
+                self.keywords.append(str(kw))
+                folded.append(f)
+        self._folded = folded
+        self._lens = [len(f) for f in folded]
+        # 两端是否需要词边界
+        self._bound_l = [_is_word_char(f[0]) for f in folded]
+        self._bound_r = [_is_word_char(f[-1]) for f in folded]
+        self._build(folded)
+
+    def _build(self, folded: List[str]) -> None:
+        goto: List[Dict[str, int]] = [{}]
+        out: List[List[int]] = [[]]
+        for kid, word in enumerate(folded):
+            s = 0
+            for c in word:
+                nxt = goto[s].get(c)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[s][c] = nxt
+                    goto.append({})
+                    out.append([])
+                s = nxt
+            out[s].append(kid)
+
+        # BFS 计算失败链接，并把转移表展开为 DFA（缺失转移沿失败链接补全）
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict(g) for g in goto]
+        q = deque(goto[0].values())
+        while q:
+            s = q.popleft()
+            f = fail[s]
+            out[s] = out[s] + out[f]
+            for c, t in delta[f].items():
+                delta[s].setdefault(c, t)
+            for c, t in goto[s].items():
+                fail[t] = delta[f].get(c, 0)
+                q.append(t)
+        self._delta = delta
+        self._out = [tuple(o) for o in out]
+
+    def __len__(self) -> int:
+        return len(self.keywords)
+
+    def find(self, text: str) -> List[Tuple[int, int, str]]:
+        """返回全部命中 (start, end, keyword)，位置基于折叠后的文本"""
+        text = text.casefold()
+        n = len(text)
+        delta = self._delta
+        out = self._out
+        hits: List[Tuple[int, int, str]] = []
+        s = 0
+        for i, c in enumerate(text):
+            s = delta[s].get(c, 0)
+            if out[s]:
+                end = i + 1
+                for kid in out[s]:
+                    start = end - self._lens[kid]
+                    if self._bound_l[kid] and start > 0 and _is_word_char(text[start - 1]):
+                        continue
+                    if self._bound_r[kid] and end < n and _is_word_char(text[end]):
+                        continue
+                    hits.append((start, end, self.keywords[kid]))
+        return hits
+
+    def matches(self, text: str) -> Dict[str, int]:
+        """返回命中关键词 -> 次数"""
+        counts: Dict[str, int] = {}
+        for _, _, kw in self.find(text):
+            counts[kw] = counts.get(kw, 0) + 1
+        return counts
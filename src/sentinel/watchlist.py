@@ -0,0 +1,106 @@
+"""
+链上地址观察名单
+On-chain address watchlist
+
+为链上鲸鱼检测提供地址索引：
+- AddressIndex: 地址 -> 簇标签（交易所冷钱包、早期矿工等）的哈希索引，O(1) 查询
+- BloomFilter: 可选的布隆过滤前置，绝大多数未关注地址只需位图判定即可排除
+"""
+
+from __future__ import annotations
+import csv
+import hashlib
+import json
+import math
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Tuple, Union
+
+
+class BloomFilter:
+    """布隆过滤器：bytearray 位图 + 双重哈希（blake2b 128 位拆成两个 64 位）。"""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(1, int(capacity))
+        self.m = max(8, int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))))
+        self.k = max(1, int(round(self.m / capacity * math.log(2))))
+        self._bits = bytearray((self.m + 7) // 8)
+
+    def _hashes(self, key: str) -> Tuple[int, int]:
+        d = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        return int.from_bytes(d[:8], "little"), int.from_bytes(d[8:], "little") | 1
+
+    def add(self, key: str) -> None:
+        h1, h2 = self._hashes(key)
+        bits, m = self._bits, self.m
+        for i in range(self.k):
+            p = (h1 + i * h2) % m
+            bits[p >> 3] |= 1 << (p & 7)
+
+    def __contains__(self, key: str) -> bool:
+        h1, h2 = self._hashes(key)
+        bits, m = self._bits, self.m
+        for i in range(self.k):
+            p = (h1 + i * h2) % m
+            if not bits[p >> 3] & (1 << (p & 7)):
+                return False
+        return True
+
+
+class AddressIndex:
+    """被关注地址索引：地址 -> 簇标签，可选布隆过滤前置。"""
+
+    def __init__(self, entries: Optional[Dict[str, str]] = None, bloom: bool = False,
+                 error_rate: float = 0.001):
+        self._map: Dict[str, str] = dict(entries or {})
+        self._bloom: Optional[BloomFilter] = None
+        if bloom:
+            self._bloom = BloomFilter(len(self._map), error_rate)
+            for addr in self._map:
+                self._bloom.add(addr)
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path], bloom: bool = False) -> "AddressIndex":
+        """
+        从文件加载名单
+
+        - .jsonl：每行 {"address": ..., "cluster": ...}
+        - .csv/.tsv：address,cluster 两列（无 cluster 列时以地址本身为簇）
+        """
+        path = Path(path)
+        entries: Dict[str, str] = {}
+        if path.suffix == ".jsonl":
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        row = json.loads(line)
+                        entries[row["address"]] = row.get("cluster", row["address"])
+        else:
+            delim = "\t" if path.suffix == ".tsv" else ","
+            with open(path, encoding="utf-8", newline="") as f:
+                for row in csv.reader(f, delimiter=delim):
+                    if not row or row[0].startswith("#") or row[0] == "address":
+                        continue
+                    entries[row[0].strip()] = row[1].strip() if len(row) > 1 and row[1].strip() else row[0].strip()
+        return cls(entries, bloom=bloom)
+
+    def add(self, address: str, cluster: Optional[str] = None) -> None:
+        """加入地址（启用布隆时同步写入位图）"""
+        self._map[address] = cluster or address
+        if self._bloom is not None:
+            self._bloom.add(address)
+
+    def cluster_of(self, address: str) -> Optional[str]:
+        """查询地址所属簇，未关注返回 None"""
+        if self._bloom is not None and address not in self._bloom:
+            return None
+        return self._map.get(address)
+
+    def __contains__(self, address: str) -> bool:
+        return self.cluster_of(address) is not None
+
+    def __len__(self) -> int:
+        return len(self._map)
+
+    def clusters(self) -> Iterable[str]:
+        return set(self._map.values())
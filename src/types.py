@@ -21,4 +21,9 @@ class Alert(TypedDict):
 class RegimeResult(TypedDict):
     score: float
     level: Literal["normal", "tighten", "pause"]
-    alerts: List[Alert]
\ No newline at end of file
+    alerts: List[Alert]
+
+class RegimeBatchResult(TypedDict):
+    score: Any    # np.ndarray[float]，每行总分数
+    level: Any    # np.ndarray[str]，每行等级
+    alerts: Any   # np.ndarray，稀疏告警表（idx/ts/name/severity/score）
\ No newline at end of file
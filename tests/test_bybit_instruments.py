@@ -0,0 +1,173 @@
+"""
+Bybit 合约元数据注册表测试
+Bybit instrument registry tests
+
+用假的分页函数驱动 InstrumentRegistry（不连网络）：
+- 按 nextPageCursor 分页拉取全部合约
+- 磁盘缓存落盘/恢复；新鲜缓存不触发拉取，过期缓存后台立即刷新
+- 无缓存时启动同步拉取一次
+- 构造 BybitExchange 不启动线程、不发请求，缓存目录在用户缓存目录下
+- 未知合约按需单独请求并补入内存，之后不再请求
+"""
+
+import json
+import threading
+from pathlib import Path
+
+import pytest
+
+from src.exchanges.bybit import bybit as bybit_mod
+from src.exchanges.bybit.instruments import InstrumentRegistry
+
+
+def _raw(symbol, tick="0.1"):
+    return {"symbol": symbol, "priceFilter": {"tickSize": tick}}
+
+
+def _parse(raw):
+    return (raw["symbol"], raw["priceFilter"]["tickSize"])
+
+
+class _Pages:
+    """按 cursor 返回预置分页，并记录调用"""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.cursors = []
+        self.called = threading.Event()
+
+    def __call__(self, cursor):
+        self.cursors.append(cursor)
+        self.called.set()
+        return self.pages[cursor]
+
+
+def _two_pages():
+    return _Pages({
+        None: {"list": [_raw("BTCUSDT"), _raw("ETHUSDT")], "nextPageCursor": "p2"},
+        "p2": {"list": [_raw("SOLUSDT", "0.01")], "nextPageCursor": ""},
+    })
+
+
+def test_refresh_follows_page_cursor(tmp_path):
+    pages = _two_pages()
+    reg = InstrumentRegistry(pages, _parse, path=tmp_path / "inst.json")
+    assert reg.refresh() == 3
+    assert pages.cursors == [None, "p2"]
+    assert len(reg) == 3
+    assert reg.get("SOLUSDT") == ("SOLUSDT", "0.01")
+    assert reg.get("XRPUSDT") is None
+    assert reg.age_sec < 5.0
+
+
+def test_refresh_rejects_empty_listing():
+    reg = InstrumentRegistry(lambda cursor: {"list": []}, _parse)
+    with pytest.raises(RuntimeError):
+        reg.refresh()
+    assert len(reg) == 0
+    assert reg.age_sec == float("inf")
+
+
+def test_disk_cache_roundtrip(tmp_path):
+    path = tmp_path / "inst.json"
+    reg = InstrumentRegistry(_two_pages(), _parse, path=path)
+    reg.refresh()
+
+    restored = InstrumentRegistry(lambda cursor: pytest.fail("fetched"), _parse, path=path)
+    assert restored.load_disk()
+    assert restored.loaded_at == pytest.approx(reg.loaded_at)
+    assert restored.get("ETHUSDT") == reg.get("ETHUSDT")
+    assert len(restored) == 3
+
+
+def test_corrupt_cache_is_ignored(tmp_path):
+    path = tmp_path / "inst.json"
+    path.write_text("{not json")
+    reg = InstrumentRegistry(_two_pages(), _parse, path=path)
+    assert not reg.load_disk()
+
+
+def test_start_with_fresh_cache_does_not_fetch(tmp_path):
+    path = tmp_path / "inst.json"
+    InstrumentRegistry(_two_pages(), _parse, path=path).refresh()
+
+    pages = _two_pages()
+    reg = InstrumentRegistry(pages, _parse, ttl_sec=3600.0, path=path)
+    reg.start()
+    try:
+        assert len(reg) == 3
+        assert not pages.called.wait(0.2)
+    finally:
+        reg.stop()
+    assert pages.cursors == []
+
+
+def test_start_with_stale_cache_refreshes_in_background(tmp_path):
+    path = tmp_path / "inst.json"
+    path.write_text(json.dumps({"loaded_at": 1.0, "list": [_raw("BTCUSDT", "0.5")]}))
+
+    pages = _two_pages()
+    reg = InstrumentRegistry(pages, _parse, ttl_sec=3600.0, path=path)
+    reg.start()
+    try:
+        # 过期缓存仍立即可用
+        assert reg.get("BTCUSDT") is not None
+        assert pages.called.wait(2.0)
+    finally:
+        reg.stop()
+    assert pages.cursors[0] is None
+    assert reg.get("BTCUSDT") == ("BTCUSDT", "0.1")
+    assert json.loads(path.read_text())["loaded_at"] > 1.0
+
+
+def test_start_without_cache_loads_synchronously(tmp_path):
+    pages = _two_pages()
+    reg = InstrumentRegistry(pages, _parse, ttl_sec=0.0, path=tmp_path / "missing" / "inst.json")
+    reg.start()
+    assert len(reg) == 3
+    assert reg._thread is None
+    assert (tmp_path / "missing" / "inst.json").exists()
+
+
+@pytest.fixture
+def exchange(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    ex = bybit_mod.BybitExchange(testnet=True)
+    yield ex
+    ex._instruments.stop()
+
+
+def test_construction_is_offline(exchange, tmp_path):
+    assert exchange._instruments._thread is None
+    assert len(exchange._instruments) == 0
+    path = exchange._instruments.path
+    assert tmp_path in path.parents
+    assert Path(bybit_mod.__file__).parent not in path.parents
+
+
+def test_unknown_symbol_fetched_once(exchange, monkeypatch):
+    calls = []
+
+    def fake_request(method, endpoint, params=None, auth=False, **kw):
+        calls.append((endpoint, dict(params or {})))
+        return {"list": [{
+            "symbol": params["symbol"],
+            "priceFilter": {"tickSize": "0.05"},
+            "lotSizeFilter": {"qtyStep": "0.1", "minOrderQty": "0.1"},
+        }]}
+
+    monkeypatch.setattr(exchange, "_request", fake_request)
+    info = exchange.get_symbol_info("NEWUSDT")
+    assert info["price_tick_size"] == 0.05
+    assert info["qty_step_size"] == 0.1
+    assert calls == [("/v5/market/instruments-info", {"category": "linear", "symbol": "NEWUSDT"})]
+
+    assert exchange.get_symbol_info("NEWUSDT") is info
+    assert len(calls) == 1
+
+
+def test_unknown_symbol_empty_listing_raises(exchange, monkeypatch):
+    monkeypatch.setattr(exchange, "_request", lambda *a, **kw: {"list": []})
+    with pytest.raises(bybit_mod.NonRetryableError):
+        exchange.get_symbol_info("NOPEUSDT")
+    assert "NOPEUSDT" not in exchange._instruments
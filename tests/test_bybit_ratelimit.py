@@ -0,0 +1,171 @@
+"""
+Bybit REST 限流测试
+Bybit REST rate limiter tests
+
+直接驱动 RateLimiter 与 BybitExchange._request（假 session，不连网络）：
+- 响应头校准分组桶额度，到重置时间（含时钟偏差换算）才恢复
+- 查询类请求不能动用 IP 级桶的保留额度
+- 同组等待时高优先级请求先取到令牌
+- 超过 max_wait_sec 直接返回 False
+- 10006 限流拒绝交给令牌桶等待、不额外退避；撤单显式使用最高优先级
+"""
+
+import threading
+import time
+
+import pytest
+
+from src.exchanges.bybit import bybit as bybit_mod
+from src.exchanges.bybit.ratelimit import (
+    IP_GROUP, PRIO_CRITICAL, PRIO_ORDER, PRIO_QUERY, RateLimiter,
+)
+
+
+def _reset_ms(delay_sec, skew_ms=0):
+    return str(int((time.time() + delay_sec) * 1000) + skew_ms)
+
+
+def test_headers_calibrate_bucket_until_reset():
+    lim = RateLimiter(default_limit=50, ip_limit=0, max_wait_sec=2.0)
+    lim.update("/v5/order/create", {
+        "X-Bapi-Limit": "5",
+        "X-Bapi-Limit-Status": "2",
+        "X-Bapi-Limit-Reset-Timestamp": _reset_ms(0.3),
+    })
+    st = lim.state()["/v5/order/create"]
+    assert st["limit"] == 5.0
+    assert st["tokens"] == 2.0
+    assert 0.15 < st["reset_in"] <= 0.3
+
+    t0 = time.monotonic()
+    assert lim.acquire("/v5/order/create", PRIO_ORDER)
+    assert lim.acquire("/v5/order/create", PRIO_ORDER)
+    assert time.monotonic() - t0 < 0.1
+    # 剩余额度用尽：等到重置时间后恢复满额
+    assert lim.acquire("/v5/order/create", PRIO_ORDER)
+    assert time.monotonic() - t0 >= 0.15
+    st = lim.state()["/v5/order/create"]
+    assert st["tokens"] == pytest.approx(4.0, abs=0.1)
+    assert st["reset_in"] is None
+    assert lim.waits == 1
+
+
+def test_reset_timestamp_uses_exchange_clock():
+    lim = RateLimiter(ip_limit=0)
+    # 交易所时钟快 10 秒：重置时间按同一偏差换算回本地
+    lim.update("g", {"X-Bapi-Limit-Status": "0",
+                     "X-Bapi-Limit-Reset-Timestamp": _reset_ms(0.5, skew_ms=10_000)},
+               skew_ms=10_000)
+    assert 0.3 < lim.state()["g"]["reset_in"] <= 0.5
+
+
+def test_update_without_limit_headers_is_ignored():
+    lim = RateLimiter(default_limit=7, ip_limit=0)
+    lim.update("g", {"Content-Type": "application/json"})
+    assert "g" not in lim.state()
+
+
+def test_query_cannot_spend_ip_reserve():
+    lim = RateLimiter(default_limit=100, ip_limit=10, ip_window_sec=1000.0,
+                      reserve_frac=0.2, max_wait_sec=0.0)
+    # 10 * 0.2 = 2 个令牌只留给下单/撤单
+    granted = sum(lim.acquire(f"q{i}", PRIO_QUERY) for i in range(10))
+    assert granted == 8
+    assert lim.acquire("order", PRIO_ORDER)
+    assert lim.acquire("cancel", PRIO_CRITICAL)
+    assert not lim.acquire("cancel", PRIO_CRITICAL)
+    assert lim.state()[IP_GROUP]["tokens"] < 1.0
+
+
+def test_higher_priority_waiter_goes_first():
+    lim = RateLimiter(default_limit=10, ip_limit=0, max_wait_sec=3.0)
+    lim.update("g", {"X-Bapi-Limit": "2", "X-Bapi-Limit-Status": "0",
+                     "X-Bapi-Limit-Reset-Timestamp": _reset_ms(0.3)})
+    order = []
+
+    def worker(name, prio):
+        assert lim.acquire("g", prio)
+        order.append(name)
+
+    query = threading.Thread(target=worker, args=("query", PRIO_QUERY))
+    query.start()
+    time.sleep(0.05)
+    critical = threading.Thread(target=worker, args=("critical", PRIO_CRITICAL))
+    critical.start()
+    query.join(3.0)
+    critical.join(3.0)
+    assert order == ["critical", "query"]
+
+
+def test_max_wait_returns_false():
+    lim = RateLimiter(default_limit=1, window_sec=10.0, ip_limit=0, max_wait_sec=0.05)
+    assert lim.acquire("g", PRIO_ORDER)
+    t0 = time.monotonic()
+    assert not lim.acquire("g", PRIO_ORDER)
+    # 预计等待超出上限时立即放弃，不空等
+    assert time.monotonic() - t0 < 0.05
+
+
+class _Resp:
+    def __init__(self, body):
+        self.body = body
+        self.headers = {}
+
+    def json(self):
+        return self.body
+
+
+class _Session:
+    def __init__(self, bodies):
+        self.bodies = list(bodies)
+        self.calls = 0
+
+    def get(self, url, **kw):
+        self.calls += 1
+        return _Resp(self.bodies.pop(0))
+
+    post = get
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    out = []
+    monkeypatch.setattr(bybit_mod.time, "sleep", out.append)
+    return out
+
+
+def test_rate_limit_reject_retries_without_backoff(sleeps, monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    session = _Session([{"retCode": 10006, "retMsg": "Too many visits!"},
+                        {"retCode": 0, "result": {"ok": 1}}])
+    ex = bybit_mod.BybitExchange(testnet=True, session=session)
+    assert ex._request("GET", "/v5/market/time", auth=False) == {"ok": 1}
+    assert session.calls == 2
+    assert sleeps == []
+
+
+def test_other_retryable_errors_back_off(sleeps, monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    session = _Session([{"retCode": 10016, "retMsg": "Server error"},
+                        {"retCode": 0, "result": {}}])
+    ex = bybit_mod.BybitExchange(testnet=True, session=session)
+    ex._request("GET", "/v5/market/time", auth=False)
+    assert sleeps == [ex.cfg.retry_backoff_sec]
+
+
+def test_cancels_request_critical_priority(monkeypatch, tmp_path):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    ex = bybit_mod.BybitExchange(testnet=True)
+    seen = {}
+
+    def fake_request(method, endpoint, *, params=None, auth=True, priority=None, full=False):
+        seen[endpoint] = priority
+        return {}
+
+    monkeypatch.setattr(ex, "_request", fake_request)
+    assert ex.cancel_order("BTCUSDT", order_id="1")["ok"]
+    assert ex.cancel_all("BTCUSDT")
+    assert seen == {"/v5/order/cancel": PRIO_CRITICAL, "/v5/order/cancel-all": PRIO_CRITICAL}
@@ -0,0 +1,64 @@
+"""
+Bybit 行情快照缓存测试
+Bybit ticker cache tests
+
+- 未知/已下架合约走负缓存，不重复拉全量
+- REST 快照不覆盖更新的 WebSocket 记录
+- REST 记录的 ts 取交易所响应时间
+"""
+
+from src.exchanges.bybit.tickers import TickerCache
+
+
+def _row(symbol, last):
+    return {"symbol": symbol, "lastPrice": str(last), "markPrice": str(last),
+            "fundingRate": "0.0001", "nextFundingTime": "1700006400000"}
+
+
+class _Rest:
+    def __init__(self, rows, time_ms):
+        self.rows, self.time_ms, self.calls = rows, time_ms, 0
+
+    def __call__(self):
+        self.calls += 1
+        return {"list": [dict(r) for r in self.rows], "time": self.time_ms}
+
+
+def test_unknown_symbol_is_negatively_cached():
+    rest = _Rest([_row("BTCUSDT", 60000)], 1_700_000_000_000)
+    cache = TickerCache(rest, max_age_sec=0.0, miss_ttl_sec=60)
+    assert cache.get("NOPEUSDT") is None
+    assert cache.get("NOPEUSDT") is None
+    assert rest.calls == 1
+    # 出现在 WebSocket 推送中后立即可用
+    cache.on_ws_ticker({"topic": "tickers.NOPEUSDT", "type": "snapshot", "ts": 1_700_000_000_500,
+                        "data": _row("NOPEUSDT", 1.5)})
+    assert cache.get("NOPEUSDT", max_age_sec=10).last == 1.5
+    assert rest.calls == 1
+
+
+def test_delisted_symbol_is_dropped_on_refresh():
+    rest = _Rest([_row("BTCUSDT", 60000), _row("OLDUSDT", 1)], 1_700_000_000_000)
+    cache = TickerCache(rest, max_age_sec=0.0)
+    assert cache.get("OLDUSDT").last == 1.0
+    rest.rows, rest.time_ms = [_row("BTCUSDT", 60100)], 1_700_000_060_000
+    assert cache.get("OLDUSDT") is None
+    assert cache.get("OLDUSDT") is None
+    assert rest.calls == 2
+
+
+def test_rest_refresh_keeps_newer_ws_record_and_uses_exchange_time():
+    rest = _Rest([_row("BTCUSDT", 60000), _row("ETHUSDT", 3000)], 1_700_000_000_000)
+    cache = TickerCache(rest, max_age_sec=0.0)
+    cache.on_ws_ticker({"topic": "tickers.BTCUSDT", "type": "snapshot", "ts": 1_700_000_000_900,
+                        "data": _row("BTCUSDT", 60500)})
+    cache.refresh()
+    btc, eth = cache._records["BTCUSDT"], cache._records["ETHUSDT"]
+    assert btc.last == 60500 and btc.ts == 1_700_000_000_900
+    assert eth.last == 3000 and eth.ts == 1_700_000_000_000
+
+    # 更新的 REST 快照则替换
+    rest.rows, rest.time_ms = [_row("BTCUSDT", 61000), _row("ETHUSDT", 3100)], 1_700_000_001_000
+    cache.refresh()
+    assert cache._records["BTCUSDT"].last == 61000
+    assert cache._records["BTCUSDT"].ts == 1_700_000_001_000
@@ -0,0 +1,263 @@
+"""
+Bybit WebSocket 测试
+Bybit WebSocket tests
+
+向 PrivateStream / PublicStream 直接喂入合成的回执、成交与盘口消息（不连网络）：
+- 重连前后 execId 去重，重连后按最后成交时间补齐
+- 尚未收到任何成交时从启动时间补齐
+- 去重窗口只淘汰最早的 execId
+- 订阅/鉴权失败回执记 error 日志
+- 重连只在已核对的 pybit 版本上使用其内部接口
+- 盘口快照 + 增量、update_id 过期/跳号、重连后新快照重建；get_orderbook 读本地盘口或回退 REST
+"""
+
+import logging
+import threading
+
+import pytest
+
+from src.exchanges.bybit import bybit as bybit_mod
+from src.exchanges.bybit import ws as bybit_ws
+from src.exchanges.bybit.ws import PrivateStream, PublicStream
+
+
+class _FakeWebSocket:
+    """替代 pybit WebSocket：记录订阅，不建立连接"""
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.topics = []
+        self.auth = False
+        self.attempting_connection = False
+
+    def __getattr__(self, name):
+        if name.endswith("_stream"):
+            return lambda *args: self.topics.append(name)
+        raise AttributeError(name)
+
+    def is_connected(self):
+        return True
+
+    def exit(self):
+        pass
+
+
+@pytest.fixture
+def make_stream(monkeypatch):
+    monkeypatch.setattr(bybit_ws, "WebSocket", _FakeWebSocket)
+    streams = []
+
+    def make(fetched=(), **kwargs):
+        got, calls, synced = [], [], threading.Event()
+
+        def fetch(since_ms):
+            calls.append(since_ms)
+            return [dict(r) for r in fetched]
+
+        stream = PrivateStream(api_key="k", api_secret="s", testnet=True, check_sec=60,
+                               on_execution=got.append, fetch_executions=fetch,
+                               on_resync=synced.set, **kwargs)
+        streams.append(stream)
+        return stream, got, calls, synced
+
+    yield make
+    for s in streams:
+        s.close()
+
+
+def _auth(success=True):
+    return {"op": "auth", "success": success, "ret_msg": "" if success else "invalid sign", "conn_id": "c1"}
+
+
+def _executions(*rows):
+    return {"topic": "execution", "creationTime": 1, "data": [dict(r) for r in rows]}
+
+
+def _exec(eid, t):
+    return {"execId": eid, "execTime": str(t), "symbol": "BTCUSDT", "execQty": "0.01"}
+
+
+def test_dedup_across_reconnect_and_catch_up(make_stream):
+    stream, got, calls, synced = make_stream(fetched=[_exec("e2", 1200), _exec("e3", 1300), _exec("e4", 1400)])
+    stream._on_message(_auth())
+    assert stream.ws.auth and stream.auths == 1 and not calls
+
+    stream._on_message(_executions(_exec("e1", 1000), _exec("e2", 1200)))
+    assert stream.last_exec_ms == 1200
+
+    # 重连后的鉴权回执触发补齐（从最后成交时间起，含边界）
+    stream._on_message(_auth())
+    assert synced.wait(5)
+    assert calls == [1200]
+    assert stream.recovered == 2
+
+    # 补齐后 WebSocket 重放的成交被去重
+    stream._on_message(_executions(_exec("e3", 1300), _exec("e5", 1500)))
+    assert [r["execId"] for r in got] == ["e1", "e2", "e3", "e4", "e5"]
+    assert stream.duplicates == 2
+    assert stream.last_exec_ms == 1500
+
+
+def test_catch_up_before_any_execution_uses_start_time(make_stream):
+    stream, got, calls, synced = make_stream(fetched=[_exec("e1", 1000)])
+    assert stream.last_exec_ms == 0
+    assert stream.catch_up() == 1
+    assert calls == [stream.started_ms]
+    assert synced.is_set()
+    assert [r["execId"] for r in got] == ["e1"]
+
+
+def test_dedup_window_evicts_oldest_first(make_stream):
+    stream, got, _, _ = make_stream(dedup_size=3)
+    stream._on_message(_executions(*(_exec(f"e{i}", 1000 + i) for i in range(1, 5))))
+    # e1 已被淘汰，e2..e4 仍在窗口内
+    stream._on_message(_executions(_exec("e2", 1002), _exec("e4", 1004), _exec("e1", 1001)))
+    assert [r["execId"] for r in got] == ["e1", "e2", "e3", "e4", "e1"]
+    assert stream.duplicates == 2
+    assert list(stream._seen) == ["e3", "e4", "e1"]
+
+
+def test_failed_control_messages_are_logged(make_stream, caplog):
+    stream, _, calls, _ = make_stream()
+    with caplog.at_level(logging.ERROR):
+        stream._on_message({"op": "subscribe", "success": False, "ret_msg": "error:handler not found"})
+        stream._on_message(_auth(success=False))
+    errors = [r.getMessage() for r in caplog.records if r.levelno == logging.ERROR]
+    assert any("subscribe failed" in m and "handler not found" in m for m in errors)
+    assert any("auth failed" in m for m in errors)
+    assert stream.auths == 0 and not stream.ws.auth and not calls
+
+
+def test_reconnect_only_on_verified_pybit(monkeypatch):
+    calls = []
+
+    class _Ws:
+        WS_URL = "wss://stream.bybit.com/v5/private"
+
+        def _reset(self):
+            calls.append("reset")
+
+        def _connect(self, url):
+            calls.append(url)
+
+    monkeypatch.setattr(bybit_ws, "PYBIT_VERSION", "6.0.0")
+    assert not bybit_ws._reconnect(_Ws())
+    assert calls == []
+    monkeypatch.setattr(bybit_ws, "PYBIT_VERSION", "5.12.0")
+    assert bybit_ws._reconnect(_Ws())
+    assert calls == ["reset", _Ws.WS_URL]
+
+
+# ---------------- 公共频道盘口 ----------------
+
+@pytest.fixture
+def public_stream(monkeypatch):
+    monkeypatch.setattr(bybit_ws, "WebSocket", _FakeWebSocket)
+    books = []
+    stream = PublicStream(["BTCUSDT"], testnet=True, depth=50, check_sec=60,
+                          map_in=lambda s: s.replace("USDT", "-USDT"), on_orderbook=books.append)
+    yield stream, books
+    stream.close()
+
+
+def _book_msg(kind, u, seq, bids, asks, symbol="BTCUSDT", ts=1000):
+    return {"topic": f"orderbook.50.{symbol}", "type": kind, "ts": ts, "cts": ts - 5,
+            "data": {"s": symbol, "b": [[str(p), str(q)] for p, q in bids],
+                     "a": [[str(p), str(q)] for p, q in asks], "u": u, "seq": seq}}
+
+
+SNAPSHOT = _book_msg("snapshot", 10, 500, [(100.0, 1.0), (99.5, 2.0)], [(100.5, 1.5), (101.0, 3.0)])
+
+
+def test_public_snapshot_then_deltas(public_stream):
+    stream, books = public_stream
+    assert sorted(stream.ws.topics) == ["orderbook_stream", "ticker_stream"]
+    stream._on_message(SNAPSHOT)
+    book = stream.books["BTCUSDT"]
+    assert book.levels(50) == ([[100.0, 1.0], [99.5, 2.0]], [[100.5, 1.5], [101.0, 3.0]])
+    assert (book.update_id, book.seq, book.ts) == (10, 500, 995)
+
+    # 删档、新增、改量
+    stream._on_message(_book_msg("delta", 11, 503, [(100.0, 0), (99.8, 4.0)], [(100.5, 2.5)], ts=1020))
+    assert book.levels(50) == ([[99.8, 4.0], [99.5, 2.0]], [[100.5, 2.5], [101.0, 3.0]])
+    assert (book.update_id, book.seq) == (11, 503)
+    assert book.levels(1) == ([[99.8, 4.0]], [[100.5, 2.5]])
+
+    # 回调收到内部符号与归一化档位
+    assert [ob["symbol"] for ob in books] == ["BTC-USDT", "BTC-USDT"]
+    assert books[-1]["bids"] == [[99.8, 4.0], [99.5, 2.0]]
+    assert books[-1]["ts"] == 1015
+
+
+def test_public_drops_stale_and_preliminary_deltas(public_stream):
+    stream, books = public_stream
+    # 快照之前的增量无从应用
+    stream._on_message(_book_msg("delta", 9, 499, [(98.0, 1.0)], []))
+    assert "BTCUSDT" not in stream.books and not books
+
+    stream._on_message(SNAPSHOT)
+    stream._on_message(_book_msg("delta", 11, 503, [(99.8, 4.0)], []))
+    # 重复/过期推送（update_id 未前进）被丢弃
+    stream._on_message(_book_msg("delta", 11, 503, [(99.8, 9.0)], []))
+    stream._on_message(_book_msg("delta", 10, 501, [(100.0, 0)], []))
+    book = stream.books["BTCUSDT"]
+    assert book.levels(50)[0] == [[100.0, 1.0], [99.8, 4.0], [99.5, 2.0]]
+    assert stream.stale_deltas == 3
+    assert book.update_id == 11
+    assert len(books) == 2
+
+
+def test_public_update_id_gap_is_counted(public_stream, caplog):
+    stream, _ = public_stream
+    stream._on_message(SNAPSHOT)
+    with caplog.at_level(logging.WARNING):
+        stream._on_message(_book_msg("delta", 13, 510, [], [(100.5, 0)]))
+    assert stream.gaps == 1
+    assert any("update_id gap: 10 -> 13" in r.getMessage() for r in caplog.records)
+    assert stream.books["BTCUSDT"].levels(50)[1] == [[101.0, 3.0]]
+
+
+def test_public_new_snapshot_rebuilds_book(public_stream):
+    stream, _ = public_stream
+    stream._on_message(SNAPSHOT)
+    stream._on_message(_book_msg("delta", 11, 503, [(99.0, 7.0)], [(102.0, 1.0)]))
+    # 重连后的新快照整体替换，旧档位不残留
+    stream._on_message(_book_msg("snapshot", 4000, 9000, [(105.0, 1.0)], [(105.5, 2.0)], ts=5000))
+    book = stream.books["BTCUSDT"]
+    assert book.levels(50) == ([[105.0, 1.0]], [[105.5, 2.0]])
+    assert (book.update_id, book.seq) == (4000, 9000)
+    # 服务重启：u=1 的推送按快照处理，即使 update_id 回退
+    stream._on_message(_book_msg("delta", 1, 9100, [(104.0, 3.0)], [(104.5, 1.0)], ts=6000))
+    assert book.levels(50) == ([[104.0, 3.0]], [[104.5, 1.0]])
+    stream._on_message(_book_msg("delta", 2, 9101, [(103.5, 1.0)], []))
+    assert book.levels(50)[0] == [[104.0, 3.0], [103.5, 1.0]]
+    assert stream.stale_deltas == 0
+
+
+def test_get_orderbook_reads_local_book(monkeypatch, tmp_path):
+    monkeypatch.setattr(bybit_ws, "WebSocket", _FakeWebSocket)
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    ex = bybit_mod.BybitExchange(testnet=True)
+    rest = []
+
+    def fake_request(method, endpoint, *, params=None, **kw):
+        rest.append(params["limit"])
+        return {"b": [["1", "1"]], "a": [["2", "1"]], "ts": 7}
+
+    monkeypatch.setattr(ex, "_request", fake_request)
+    try:
+        ex.ws_sub_public(["BTCUSDT"])
+        stream = ex._ws_public[0]
+        # 尚无快照：回退 REST
+        assert ex.get_orderbook("BTCUSDT", depth=1)["ts"] == 7
+        stream._on_message(SNAPSHOT)
+        ob = ex.get_orderbook("BTCUSDT", depth=1)
+        assert (ob["bids"], ob["asks"], ob["ts"]) == ([[100.0, 1.0]], [[100.5, 1.5]], 995)
+        assert rest == [1]
+        # 超出订阅档数或连接断开：回退 REST
+        ex.get_orderbook("BTCUSDT", depth=200)
+        monkeypatch.setattr(stream.ws, "is_connected", lambda: False)
+        ex.get_orderbook("BTCUSDT", depth=1)
+        assert rest == [1, 200, 1]
+    finally:
+        ex.close()
@@ -0,0 +1,124 @@
+"""
+多标的哨兵组测试
+Sentinel bank tests
+
+- RollingQuantileBank / RollingStatsBank 按列结果与只含有效样本的窗口一致
+- 某标的的 NaN/缺失 tick 不污染该标的窗口，也不影响其他标的
+"""
+
+import logging
+
+import numpy as np
+import pytest
+
+from src.sentinel import SentinelBank
+from src.sentinel.rolling import RollingQuantileBank, RollingStatsBank
+
+CFG = {
+    "cooldown_sec": 30,
+    "score_thresholds": {"tighten": 50, "pause": 80},
+    "detectors": {
+        "vol_spike": {"win": 60, "z": 3.0, "vol_z": 1.0},
+        "spread_blowout": {"win": 40, "z": 3.0},
+        "funding_shock": {"win": 24, "delta_bps": 1.0},
+    },
+}
+
+
+@pytest.fixture(autouse=True)
+def _quiet():
+    logging.disable(logging.CRITICAL)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+def _windows(rows: np.ndarray, valid: np.ndarray, size: int):
+    """各列最近 size 个有效样本"""
+    return [rows[valid[:, j], j][-size:] for j in range(rows.shape[1])]
+
+
+def test_quantile_bank_matches_valid_window():
+    rng = np.random.default_rng(0)
+    size, n, steps = 7, 5, 400
+    # 取值离散、大量重复，覆盖新旧值相等与并列
+    rows = rng.integers(-3, 4, (steps, n)).astype(float)
+    rows[rng.random((steps, n)) < 0.1] = np.nan
+    mask = rng.random((steps, n)) > 0.2
+    bank = RollingQuantileBank(size, n)
+    for t in range(steps):
+        bank.push(rows[t], mask[t])
+        valid = mask[: t + 1] & np.isfinite(rows[: t + 1])
+        wins = _windows(rows[: t + 1], valid, size)
+        assert list(bank.count) == [len(w) for w in wins]
+        expect = [np.median(w) if len(w) else np.nan for w in wins]
+        np.testing.assert_array_equal(bank.median(), expect)
+        q = [np.quantile(w, 0.9) if len(w) else np.nan for w in wins]
+        np.testing.assert_allclose(bank.quantile(0.9), q, rtol=0, atol=1e-12)
+
+
+def test_stats_bank_matches_valid_window():
+    rng = np.random.default_rng(1)
+    size, n, steps = 9, 4, 600
+    rows = rng.normal(5, 2, (steps, n))
+    rows[rng.random((steps, n)) < 0.15] = np.nan
+    bank = RollingStatsBank(size, n, reanchor_every=50)
+    for t in range(steps):
+        bank.push(rows[t])
+        wins = _windows(rows[: t + 1], np.isfinite(rows[: t + 1]), size)
+        assert list(bank.full) == [len(w) == size for w in wins]
+        for j, w in enumerate(wins):
+            if len(w):
+                assert bank.mean[j] == pytest.approx(w.mean(), abs=1e-9)
+                assert bank.var[j] == pytest.approx(w.var(), abs=1e-9)
+                assert bank.last[j] == w[-1]
+    vals = bank.values()
+    for j, w in enumerate(wins):
+        np.testing.assert_array_equal(vals[-len(w):, j], w)
+
+
+def _ticks(steps: int, n: int, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    px_a = 100 * np.exp(np.cumsum(rng.standard_t(3, (steps, n)) * 1e-3, axis=0))
+    return {
+        "px_a": px_a,
+        "px_b": px_a * (1 + rng.standard_t(3, (steps, n)) * 1e-4),
+        "vol_a": rng.lognormal(0, 1, (steps, n)),
+        "next_rate_a": np.round(np.repeat(rng.normal(1e-4, 2e-4, (steps // 20 + 1, n)), 20, axis=0)[:steps], 6),
+        "ts": 1.7e9 + np.arange(steps, dtype=float),
+    }
+
+
+def _run(bank: SentinelBank, ticks: dict, rows=None):
+    keys = ("px_a", "px_b", "vol_a", "next_rate_a")
+    rows = range(len(ticks["ts"])) if rows is None else rows
+    return [bank.update(*(ticks[k][i] for k in keys), ts=ticks["ts"][i]) for i in rows]
+
+
+def test_missing_ticks_are_masked_per_symbol():
+    steps = 1500
+    ticks = _ticks(steps, 3)
+    gaps = ticks.copy()
+    for k in ("px_a", "px_b", "vol_a", "next_rate_a"):
+        gaps[k] = ticks[k].copy()
+    lost = np.random.default_rng(2).random(steps) < 0.05
+    for k in ("px_a", "px_b", "vol_a", "next_rate_a"):
+        gaps[k][lost, 0] = np.nan
+    # 单独缺费率也只影响资金费窗口
+    only_rate = np.zeros(steps, dtype=bool)
+    only_rate[700:705] = True
+    gaps["next_rate_a"][only_rate & ~lost, 1] = np.nan
+
+    clean = _run(SentinelBank(["A", "B", "C"], CFG), ticks)
+    masked = _run(SentinelBank(["A", "B", "C"], CFG), gaps)
+    score = np.array([r["score"] for r in masked])
+    assert np.isfinite(score).all()
+
+    # 缺失的 tick 不出分；其他标的逐 tick 与无缺失时一致
+    assert (score[lost, 0] == 0).all()
+    np.testing.assert_array_equal(score[:, 2], [r["score"][2] for r in clean])
+
+    # 标的 A 等价于只喂入其有效 tick
+    solo_ticks = {k: v[:, :1] if v.ndim == 2 else v for k, v in ticks.items()}
+    solo = _run(SentinelBank(["A"], CFG), solo_ticks, np.flatnonzero(~lost))
+    np.testing.assert_allclose(score[~lost, 0], [r["score"][0] for r in solo], rtol=0, atol=1e-9)
+    assert any(r["score"][0] > 0 for r in solo), "data should exercise the detectors"
@@ -0,0 +1,76 @@
+"""
+数组化盘口测试
+Array-backed order book tests
+
+- BookSide 随机快照 + 增量序列与字典参考盘口逐步一致：档位顺序、最优价、前 N 档名义金额
+- 删除不存在的档、数量为 0 的快照档位被忽略；容量不足时自动扩容
+"""
+
+import numpy as np
+import pytest
+
+from src.sentinel.book import BookSide
+
+
+def _reference(levels: dict, is_bid: bool, depth: int):
+    """按定义排序并对前 depth 档求名义金额"""
+    prices = sorted(levels, reverse=is_bid)
+    qtys = [levels[p] for p in prices]
+    top = sum(p * q for p, q in zip(prices[:depth], qtys[:depth]))
+    return prices, qtys, top
+
+
+@pytest.mark.parametrize("is_bid", [True, False], ids=["bid", "ask"])
+@pytest.mark.parametrize("depth", [1, 5, 25])
+def test_book_side_matches_reference(is_bid, depth):
+    rng = np.random.default_rng(depth + is_bid)
+    side = BookSide(is_bid=is_bid, depth=depth, capacity=4, resum_every=10**9)
+    grid = np.round(100.0 + 0.5 * np.arange(-40, 41), 1)
+
+    snap_p = rng.choice(grid, 30, replace=False)
+    snap_q = rng.choice([0.0, 0.5, 1.0, 2.5], 30)
+    side.snapshot(snap_p, snap_q)
+    levels = {float(p): float(q) for p, q in zip(snap_p, snap_q) if q > 0}
+
+    for step in range(3000):
+        p = float(rng.choice(grid))
+        q = float(rng.choice([0.0, 0.0, 0.1, 1.0, 3.0, 7.5]))
+        side.set_level(p, q)
+        if q > 0:
+            levels[p] = q
+        else:
+            levels.pop(p, None)
+        prices, qtys, top = _reference(levels, is_bid, depth)
+        assert len(side) == len(levels)
+        np.testing.assert_array_equal(side.prices(), prices)
+        np.testing.assert_array_equal(side.qtys(), qtys)
+        assert side.best() == (prices[0] if prices else None)
+        # 不重算，只靠增量维护
+        assert side.top_notional == pytest.approx(top, rel=1e-9, abs=1e-6)
+
+
+def test_book_side_periodic_resum_and_batch_apply():
+    side = BookSide(is_bid=False, depth=3, resum_every=7)
+    side.snapshot(np.array([101.0, 100.0, 103.0, 102.0]), np.array([1.0, 2.0, 0.0, 4.0]))
+    np.testing.assert_array_equal(side.prices(), [100.0, 101.0, 102.0])
+    assert side.top_notional == pytest.approx(200.0 + 101.0 + 408.0)
+
+    side.apply(np.array([[100.0, 0.0], [99.5, 1.0], [104.0, 5.0], [250.0, 0.0]]))
+    np.testing.assert_array_equal(side.prices(), [99.5, 101.0, 102.0, 104.0])
+    assert side.top_notional == pytest.approx(99.5 + 101.0 + 408.0)
+    for _ in range(10):
+        side.set_level(101.0, 3.0)
+    # 删除不存在的档位不计数：3 + 10 次更新，第 7 次时重算
+    assert side._since_resum == 6
+    assert side.top_notional == pytest.approx(99.5 + 303.0 + 408.0)
+
+
+def test_book_side_state_roundtrip():
+    side = BookSide(is_bid=True, depth=2)
+    side.snapshot(np.array([99.0, 100.0, 98.0]), np.array([1.0, 2.0, 3.0]))
+    other = BookSide(is_bid=True, depth=2)
+    other.load_state(side.state())
+    np.testing.assert_array_equal(other.prices(), [100.0, 99.0, 98.0])
+    assert other.top_notional == side.top_notional == pytest.approx(299.0)
+    empty = BookSide(is_bid=True, depth=2)
+    assert empty.best() is None and empty.top_notional == 0.0
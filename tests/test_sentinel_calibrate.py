@@ -0,0 +1,60 @@
+"""
+哨兵参数标定测试
+Sentinel calibration tests
+
+- tighten/pause 次数与持续时间占比与 SentinelEngine 逐行等级序列一致（冷却 / 衰减两种模式）
+- 工作进程附着共享内存时不向 resource_tracker 登记
+"""
+
+import logging
+
+import numpy as np
+import pytest
+from multiprocessing import resource_tracker
+
+from src.sentinel import SentinelEngine, calibrate as cal
+from tests.test_sentinel_engine import CFG, _columns, _tick_loop
+
+DECAY_CFG = dict(CFG, decay={"enabled": True, "half_life_sec": 20, "dedup_sec": 5},
+                 score_thresholds={"tighten": 150, "pause": 250})
+
+_LEVELS = {"normal": 0, "tighten": 1, "pause": 2}
+
+
+@pytest.fixture(autouse=True)
+def _quiet():
+    logging.disable(logging.CRITICAL)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+@pytest.mark.parametrize("cfg", [CFG, DECAY_CFG], ids=["cooldown", "decay"])
+def test_level_time_fractions_match_engine(cfg):
+    cols = _columns()
+    res = cal.evaluate(cal.precompute(*(cols[k] for k in ("px_a", "px_b", "vol_a", "next_rate_a", "ts"))), cfg)
+
+    level = np.array([_LEVELS[r["level"]] for r in _tick_loop(SentinelEngine(cfg), cols)])
+    ts = cols["ts"]
+    dur, span = np.diff(ts), ts[-1] - ts[0]
+    entered = (level > 0) & (level != np.r_[0, level[:-1]])
+    fired = (level > 0) if "decay" not in cfg else entered
+    assert res["tighten"] == np.count_nonzero(fired & (level == 1))
+    assert res["pause"] == np.count_nonzero(fired & (level == 2))
+    assert res["tighten"] and res["pause"]
+    assert res["tighten_frac"] == pytest.approx(dur[level[:-1] == 1].sum() / span)
+    assert res["pause_frac"] == pytest.approx(dur[level[:-1] == 2].sum() / span)
+
+
+def test_worker_attach_does_not_register_segment(monkeypatch):
+    shm, layout = cal._pack({"x": np.arange(4.0)})
+    registered = []
+    monkeypatch.setattr(resource_tracker, "register", lambda name, rtype: registered.append(name))
+    try:
+        cal._attach(shm.name, layout)
+        assert list(cal._WORKER_DATA["x"]) == [0.0, 1.0, 2.0, 3.0]
+        assert registered == []
+    finally:
+        cal._WORKER_SHM.close()
+        cal._WORKER_DATA = cal._WORKER_SHM = None
+        shm.close()
+        shm.unlink()
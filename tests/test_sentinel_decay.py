@@ -0,0 +1,103 @@
+"""
+衰减分数测试
+Decayed score tests
+
+- _DecayedScore 按半衰期闭式衰减，总分与各检测器分数一致
+- 同一 dedup_sec 桶内只补差额，新桶重新全额计入
+- 乱序时间戳不回放衰减；快照恢复后结果一致
+- 开启 decay 且配置了 cooldown_sec 时启动告警（cooldown 不生效）
+"""
+
+import logging
+import math
+
+import pytest
+
+from src.sentinel import SentinelEngine
+from src.sentinel.engine import _DecayedScore
+from tests.test_sentinel_engine import CFG
+
+
+def test_half_life_decay():
+    d = _DecayedScore(["a", "b"], half_life_sec=10.0)
+    d.add("a", 40.0, 100.0)
+    d.add("b", 20.0, 110.0)
+    assert d.total(100.0) == pytest.approx(40.0)
+    assert d.by_detector(110.0) == pytest.approx({"a": 20.0, "b": 20.0})
+    assert d.total(110.0) == pytest.approx(40.0)
+    assert d.total(130.0) == pytest.approx(10.0)
+    # 查询不推进状态
+    assert d.total(110.0) == pytest.approx(40.0)
+
+
+def test_matches_brute_force_sum():
+    events = [("a", 10.0, 0.0), ("b", 25.0, 3.5), ("a", 7.0, 9.0), ("b", 4.0, 30.0), ("a", 12.0, 31.0)]
+    d = _DecayedScore(["a", "b"], half_life_sec=6.0)
+    for name, s, t in events:
+        d.add(name, s, t)
+    tau = 6.0 / math.log(2)
+    for now in (31.0, 40.0, 75.5):
+        ref = {n: sum(s * math.exp(-(now - t) / tau) for m, s, t in events if m == n) for n in "ab"}
+        assert d.by_detector(now) == pytest.approx(ref)
+        assert d.total(now) == pytest.approx(sum(ref.values()))
+
+
+def test_dedup_bucket_adds_only_the_difference():
+    d = _DecayedScore(["a", "b"], half_life_sec=1e9, dedup_sec=5.0)
+    assert d.add("a", 30.0, 10.0) == 30.0
+    assert d.add("a", 20.0, 11.0) == 0.0
+    assert d.add("a", 45.0, 14.9) == pytest.approx(15.0)
+    # 其他检测器各自去重
+    assert d.add("b", 30.0, 12.0) == 30.0
+    # 下一个桶重新全额计入
+    assert d.add("a", 10.0, 15.0) == 10.0
+    assert d.total(15.0) == pytest.approx(85.0)
+    assert d.by_detector(15.0) == pytest.approx({"a": 55.0, "b": 30.0})
+
+
+def test_no_dedup_counts_every_alert():
+    d = _DecayedScore(["a"], half_life_sec=1e9, dedup_sec=0.0)
+    for t in range(5):
+        assert d.add("a", 10.0, float(t)) == 10.0
+    assert d.total(5.0) == pytest.approx(50.0)
+
+
+def test_out_of_order_alert_does_not_rewind():
+    d = _DecayedScore(["a"], half_life_sec=10.0)
+    d.add("a", 40.0, 100.0)
+    d.add("a", 10.0, 90.0)
+    assert d.total(100.0) == pytest.approx(50.0)
+    assert d.total(110.0) == pytest.approx(25.0)
+
+
+def test_state_roundtrip():
+    d = _DecayedScore(["a", "b"], half_life_sec=10.0, dedup_sec=5.0)
+    d.add("a", 30.0, 1.0)
+    d.add("b", 12.0, 4.0)
+    restored = _DecayedScore(["a", "b"], half_life_sec=10.0, dedup_sec=5.0)
+    restored.load_state(d.state())
+    assert restored.total(20.0) == pytest.approx(d.total(20.0))
+    # 恢复后同桶去重状态保留
+    assert restored.add("a", 35.0, 3.0) == pytest.approx(5.0)
+    # 检测器集合不一致时丢弃
+    other = _DecayedScore(["a"], half_life_sec=10.0)
+    other.load_state(d.state())
+    assert other.total(20.0) == 0.0
+
+
+def test_rejects_non_positive_half_life():
+    with pytest.raises(ValueError):
+        _DecayedScore(["a"], half_life_sec=0.0)
+
+
+def test_decay_with_cooldown_warns(caplog):
+    cfg = dict(CFG, decay={"enabled": True, "half_life_sec": 60, "dedup_sec": 5})
+    with caplog.at_level(logging.WARNING, logger="src.sentinel.engine"):
+        SentinelEngine(cfg)
+    assert any("cooldown_sec=30 is ignored" in r.getMessage() for r in caplog.records)
+
+    caplog.clear()
+    with caplog.at_level(logging.WARNING, logger="src.sentinel.engine"):
+        SentinelEngine(dict(cfg, cooldown_sec=0))
+        SentinelEngine(CFG)
+    assert not any("is ignored" in r.getMessage() for r in caplog.records)
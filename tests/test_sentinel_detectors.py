@@ -0,0 +1,440 @@
+"""
+哨兵检测器测试
+Sentinel detector tests
+
+- 已实现波动率：EWMA / bipower 估计与按定义逐项求和一致，bipower 对单次跳跃不敏感；默认不运行
+- 领先-滞后：FFT 互相关与直接求和一致，平移序列恢复出滞后的符号与大小；每 stride 行才重算；默认不运行
+- 链上鲸鱼：按簇轧差聚合与窗口淘汰、按簇独立冷却、布隆前置的地址索引、积压分多个 tick 消化
+- 强平冲击：基线积累满 min_baseline_sec 前不告警，窗口/基线金额与逐条求和一致，快照保留积累时长
+- VPIN：跨桶拆分的大单与按累计成交量插值切桶的暴力计算一致；逐笔与批量回调一致
+"""
+
+import logging
+import math
+import time
+
+import numpy as np
+import pytest
+
+from src.sentinel import SentinelEngine
+from src.sentinel import detectors
+from src.sentinel.detectors import (
+    LeadLagCfg, LeadLagDetector, LiquidationCfg, LiquidationDetector,
+    RealizedVolCfg, RealizedVolDetector, VpinCfg, VpinDetector, WhaleOnchainCfg, WhaleOnchainDetector,
+)
+from src.sentinel.watchlist import AddressIndex, BloomFilter
+from tests.test_sentinel_engine import CFG, _batch, _columns, _tick_loop
+
+YEAR = 365 * 86400
+
+
+@pytest.fixture(autouse=True)
+def _quiet():
+    logging.disable(logging.CRITICAL)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+# ---------------- 已实现波动率 ----------------
+
+def _rv_reference(ret: np.ndarray, ts: np.ndarray, h: float) -> dict:
+    """按定义求和：第 0 个样本只提供起始时间，权重 exp(-(t_n - t_i)/h)"""
+    r, dt = ret[1:], np.diff(ts)
+    w = np.exp(-(ts[-1] - ts[1:]) / h)
+    bp = np.r_[0.0, 0.5 * math.pi * np.abs(r[1:]) * np.abs(r[:-1])]
+    t = (dt * w).sum()
+    return {
+        "ewma": math.sqrt((r * r * w).sum() / t * YEAR),
+        "bipower": math.sqrt((bp * w).sum() / t * YEAR),
+    }
+
+
+def _rv_series(n: int = 2000, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    ts = 1.7e9 + np.cumsum(rng.uniform(0.2, 3.0, n))
+    ret = rng.standard_t(4, n) * 2e-4
+    return ret, ts
+
+
+def test_realized_vol_estimates_match_definition():
+    ret, ts = _rv_series()
+    det = RealizedVolDetector(RealizedVolCfg(horizons=[60, 300, 3600]))
+    for r, t in zip(ret, ts):
+        det.update(t, ret=r)
+    est = det.estimates()
+    for h in (60, 300, 3600):
+        ref = _rv_reference(ret, ts, h)
+        assert est[f"{h}s"]["ewma"] == pytest.approx(ref["ewma"], rel=1e-9)
+        assert est[f"{h}s"]["bipower"] == pytest.approx(ref["bipower"], rel=1e-9)
+        assert est[f"{h}s"]["ready"] == (ts[-1] - ts[0] >= h)
+
+
+def test_bipower_is_robust_to_single_jump():
+    ret, ts = _rv_series(600)
+    det = RealizedVolDetector(RealizedVolCfg(horizons=[300], gate_horizon=300, vmax=5.0))
+    base = None
+    for i, (r, t) in enumerate(zip(ret, ts)):
+        if i == len(ret) - 5:
+            base = det.estimates()["300s"]
+            r = 0.02
+        det.update(t, ret=r)
+    est = det.estimates()["300s"]
+    jump_ewma = est["ewma"] / base["ewma"]
+    jump_bipower = est["bipower"] / base["bipower"]
+    assert jump_ewma > 3
+    assert jump_bipower < jump_ewma / 3
+
+
+def test_realized_vol_batch_matches_updates():
+    ret, ts = _rv_series(1500)
+    ret[::97] = np.nan
+    cfg = RealizedVolCfg(vmax=0.5, estimator="ewma")
+    loop, batch = RealizedVolDetector(cfg), RealizedVolDetector(cfg)
+    fired = [loop.update(t, ret=None if np.isnan(r) else r) is not None for r, t in zip(ret, ts)]
+    res = batch.update_batch(ret, ts)
+    assert any(fired)
+    assert list(res["fired"]) == fired
+    for k, v in loop.state().items():
+        np.testing.assert_allclose(batch.state()[k], v, rtol=1e-9)
+
+
+def test_realized_vol_is_opt_in():
+    cols = _columns(3000)
+    engine = SentinelEngine(CFG)
+    _tick_loop(engine, cols)
+    assert engine._stats["realized_vol"].calls == 0
+
+    on = dict(CFG, detectors=dict(CFG["detectors"], realized_vol={"enabled": True, "vmax": 0.3,
+                                                                  "horizons": [60], "gate_horizon": 60}))
+    ref = _tick_loop(SentinelEngine(on), cols)
+    assert any(a["name"] == "realized_vol" for r in ref for a in r["alerts"])
+    res = _batch(SentinelEngine(on), cols, 0, len(cols["ts"]))
+    np.testing.assert_allclose(res["score"], [r["score"] for r in ref], rtol=0, atol=1e-6)
+
+
+# ---------------- 领先-滞后 ----------------
+
+def _shifted(n: int, lag: int, seed: int = 0):
+    """b 比 a 晚 lag 个 tick（lag < 0 时 b 领先）"""
+    rng = np.random.default_rng(seed)
+    x = rng.normal(0, 1e-3, n + abs(lag))
+    if lag >= 0:
+        return x[lag:], x[:n]
+    return x[:n], x[-lag:]
+
+
+@pytest.mark.parametrize("lag", [5, -7, 0])
+def test_xcorr_peak_recovers_lag(lag):
+    win, max_lag = 256, 20
+    a, b = _shifted(win, lag)
+    nfft = LeadLagDetector(LeadLagCfg(win=win, max_lag=max_lag)).nfft
+    got, peak, corr0 = detectors._xcorr_peak(a[None, :], b[None, :], max_lag, nfft)
+    assert got[0] == lag
+    assert peak[0] == pytest.approx(1 - abs(lag) / win, abs=0.1)
+
+    # 与按定义的非循环互相关逐项一致
+    da, db = a - a.mean(), b - b.mean()
+    norm = math.sqrt((da * da).sum() * (db * db).sum())
+    ref = [sum(da[t] * db[t + k] for t in range(max(0, -k), min(win, win - k))) / norm
+           for k in range(-max_lag, max_lag + 1)]
+    assert peak[0] == pytest.approx(max(ref), abs=1e-12)
+    assert corr0[0] == pytest.approx(ref[max_lag], abs=1e-12)
+
+
+def test_lead_lag_recomputes_every_stride(monkeypatch):
+    cfg = LeadLagCfg(win=64, stride=8, max_lag=10, min_lag=3)
+    calls = []
+    real = detectors._xcorr_peak
+    monkeypatch.setattr(detectors, "_xcorr_peak", lambda *a: calls.append(1) or real(*a))
+    ra, rb = _shifted(300, 4, seed=1)
+    px_a, px_b = 100 * np.exp(np.cumsum(ra)), 100 * np.exp(np.cumsum(rb))
+    det = LeadLagDetector(cfg)
+    last = []
+    for i in range(300):
+        res = det.update(px_a[i], px_b[i], ts=float(i))
+        last.append(det._last)
+        # 第 i 行推入的是第 i 个收益率（第 0 行只记录价格）
+        pushed = i
+        recompute = pushed >= cfg.win and pushed % cfg.stride == 0
+        assert len(calls) == sum(1 for p in range(cfg.win, pushed + 1) if p % cfg.stride == 0)
+        if i and not recompute:
+            assert det._last is last[-2]
+    assert det._last[0] == 4 and det._last[3] == pytest.approx(4.0)
+    assert res is not None and res["detail"]["leader"] == "a"
+
+
+def test_lead_lag_is_opt_in():
+    cols = _columns(3000)
+    ra, rb = _shifted(3000, 5, seed=2)
+    cols["px_a"], cols["px_b"] = 100 * np.exp(np.cumsum(ra)), 100 * np.exp(np.cumsum(rb))
+    engine = SentinelEngine(CFG)
+    _tick_loop(engine, cols)
+    assert engine._stats["lead_lag"].calls == 0
+
+    on = dict(CFG, detectors=dict(CFG["detectors"], lead_lag={"enabled": True, "win": 128, "stride": 16}))
+    ref = _tick_loop(SentinelEngine(on), cols)
+    assert any(a["name"] == "lead_lag" for r in ref for a in r["alerts"])
+    res = _batch(SentinelEngine(on), cols, 0, len(cols["ts"]))
+    np.testing.assert_allclose(res["score"], [r["score"] for r in ref], rtol=0, atol=1e-6)
+
+
+# ---------------- 链上鲸鱼 ----------------
+
+_WATCH = {"cold1": "exA", "cold2": "exA", "miner": "early", "fund": "fundX"}
+
+
+def _tx(ts, inputs, outputs):
+    return {"ts": ts, "inputs": [{"address": a, "value": v} for a, v in inputs],
+            "outputs": [{"address": a, "value": v} for a, v in outputs]}
+
+
+def test_whale_clusters_net_within_tx_and_window():
+    det = WhaleOnchainDetector(WhaleOnchainCfg(min_btc=1000, win_sec=600, cooldown_sec=0),
+                               AddressIndex(_WATCH))
+    # 簇内找零轧差：exA 净流出 400，fundX 流入 400
+    assert det.update(_tx(0, [("cold1", 1000)], [("cold2", 600), ("fund", 400)])) is None
+    assert det._sums["exA"] == [400.0, -400.0, 1]
+    assert det._sums["fundX"] == [400.0, 400.0, 1]
+    # 窗口内累计总流量达到阈值才告警
+    alert = det.update(_tx(100, [("x", 700)], [("fund", 700)]))
+    assert alert["detail"]["cluster"] == "fundX" and alert["detail"]["gross_btc"] == 1100
+    # 同一笔触及多个簇：各自检查，按总流量排序
+    alert = det.update(_tx(200, [("cold1", 650)], [("fund", 650)]))
+    assert [c["cluster"] for c in alert["detail"]["clusters"]] == ["fundX", "exA"]
+    assert alert["detail"]["clusters"][0]["gross_btc"] == 1750
+    assert alert["detail"]["clusters"][1]["net_btc"] == -1050
+    # ts=0 的记录在 ts=600 时移出窗口
+    det.update(_tx(600, [("z", 1)], [("miner", 1)]))
+    assert det._sums["exA"] == [650.0, -650.0, 1]
+    assert det._sums["fundX"] == [1350.0, 1350.0, 2]
+    # 未命中名单的大额转移归入 unlabeled
+    alert = det.update({"ts": 700, "from": "p", "to": "q", "amount": 2500})
+    assert alert["detail"]["cluster"] == WhaleOnchainDetector.UNLABELED
+
+
+def test_whale_cooldown_is_per_cluster():
+    det = WhaleOnchainDetector(WhaleOnchainCfg(min_btc=1000, win_sec=3600, cooldown_sec=300),
+                               AddressIndex(_WATCH))
+    assert det.update(_tx(0, [("x", 1200)], [("fund", 1200)]))["detail"]["cluster"] == "fundX"
+    assert det.update(_tx(100, [("x", 10)], [("fund", 10)])) is None
+    # 另一簇不受 fundX 冷却影响
+    assert det.update(_tx(150, [("miner", 1500)], [("x", 1500)]))["detail"]["cluster"] == "early"
+    assert det.update(_tx(300, [("x", 10)], [("fund", 10)]))["detail"]["cluster"] == "fundX"
+
+
+def test_address_index_bloom_prefilter():
+    rng = np.random.default_rng(0)
+    members = {f"bc1q{i:08x}": f"c{i % 7}" for i in range(2000)}
+    plain, bloomed = AddressIndex(members), AddressIndex(members, bloom=True, error_rate=0.01)
+    probes = list(members) + [f"1x{rng.integers(1 << 62):x}" for _ in range(5000)]
+    assert [plain.cluster_of(a) for a in probes] == [bloomed.cluster_of(a) for a in probes]
+    bloomed.add("late", "c9")
+    assert bloomed.cluster_of("late") == "c9"
+
+    bf = BloomFilter(2000, 0.01)
+    for a in members:
+        bf.add(a)
+    assert all(a in bf for a in members)
+    false_pos = sum(f"other{i}" in bf for i in range(20000)) / 20000
+    assert false_pos < 0.03
+
+
+def test_whale_backlog_is_drained_across_ticks():
+    cfg = WhaleOnchainCfg(min_btc=1000, max_records_per_update=100, max_ingest_ms=0)
+    det = WhaleOnchainDetector(cfg, AddressIndex(_WATCH))
+    block = [_tx(i, [("x", 1)], [("fund", 1)]) for i in range(1050)]
+    det.update({"records": block})
+    assert det.pending == 950
+    ticks = 1
+    while det.pending:
+        alert = det.drain()
+        ticks += 1
+        if alert is not None:
+            assert det.pending <= 50
+    assert ticks == 11
+    assert det._sums["fundX"][0] == 1050
+
+    # 时间预算：处理慢时提前结束，余下留给下一次
+    slow = WhaleOnchainDetector(WhaleOnchainCfg(max_ingest_ms=0.5), AddressIndex(_WATCH))
+    real = slow._ingest
+
+    def _ingest(rec, touched):
+        t = time.perf_counter() + 1e-4
+        while time.perf_counter() < t:
+            pass
+        return real(rec, touched)
+
+    slow._ingest = _ingest
+    slow.update({"records": block[:400]})
+    assert 0 < 400 - slow.pending < 400
+
+
+# ---------------- 强平冲击 ----------------
+
+LIQ_CFG = LiquidationCfg(bucket_sec=1.0, win_sec=60, baseline_sec=3600, min_baseline_sec=600,
+                         min_notional=1_000_000, surge_mult=5.0)
+
+
+def test_liquidation_silent_during_baseline_warmup():
+    det = LiquidationDetector(LIQ_CFG)
+    t0 = 10_000.0
+    det.observe_liquidation(100.0, 10.0, "Buy", t0 * 1e3)
+    # 基线未积累：窗口内的大额强平不告警
+    for t in np.arange(t0, t0 + 660, 10.0):
+        det.observe_liquidation(50_000.0, 100.0, "Sell", t * 1e3)
+        assert det.update(t) is None
+        assert not det.ready
+    # 窗口外已有 600 秒基线后，相对基线激增才告警
+    t = t0 + 1200
+    det.update(t)
+    assert det.ready
+    det.observe_liquidation(50_000.0, 2_000.0, "Buy", t * 1e3)
+    alert = det.update(t)
+    assert alert is not None and alert["name"] == "liquidation"
+    assert alert["detail"]["liq_long"] == pytest.approx(1e8)
+
+
+def _liq_reference(events, now, cfg):
+    """逐条求和：窗口金额、窗口外已积累的基线秒数及其折算到一个窗口的期望金额"""
+    head = int(now // cfg.bucket_sec)
+    n = int(cfg.baseline_sec / cfg.bucket_sec)
+    w = int(cfg.win_sec / cfg.bucket_sec)
+    buckets = [(int(t // cfg.bucket_sec), x) for t, x in events]
+    win = sum(x for b, x in buckets if head - w < b <= head)
+    base = sum(x for b, x in buckets if head - n < b <= head - w)
+    base_sec = (min(n, head - buckets[0][0] + 1) - w) * cfg.bucket_sec
+    return win, base_sec, base / base_sec * cfg.win_sec if base_sec > 0 else 0.0
+
+
+def test_liquidation_surge_matches_brute_force():
+    cfg = LiquidationCfg(bucket_sec=2.0, win_sec=60, baseline_sec=1200, min_baseline_sec=300,
+                         min_notional=1e-3, surge_mult=1e-6)
+    det = LiquidationDetector(cfg)
+    rng = np.random.default_rng(7)
+    events = []
+    checked = 0
+    for t in np.sort(50_000.0 + rng.uniform(0, 3000, 600)):
+        x = float(rng.lognormal(10, 1.5))
+        events.append((t, x))
+        det.observe_liquidation(x, 1.0, "Buy" if rng.random() < 0.5 else "Sell", t * 1e3)
+        if rng.random() > 0.1:
+            continue
+        alert = det.update(t)
+        win, base_sec, expected = _liq_reference(events, t, cfg)
+        assert float(det.liq.win_sum.sum()) == pytest.approx(win, rel=1e-9)
+        if base_sec < cfg.min_baseline_sec:
+            assert alert is None
+            continue
+        assert alert is not None
+        assert alert["detail"]["surge"] == pytest.approx(
+            win / max(expected, cfg.min_notional / cfg.surge_mult), rel=1e-9)
+        checked += 1
+    assert checked > 20
+
+
+def test_liquidation_gap_restarts_warmup():
+    det = LiquidationDetector(LIQ_CFG)
+    det.observe_liquidation(100.0, 1.0, "Buy", 0.0)
+    det.update(1000.0)
+    assert det.ready
+    # 超过整个基线的空档后旧数据失效，重新积累
+    det.observe_liquidation(50_000.0, 2_000.0, "Buy", 10_000 * 1e3)
+    assert det.update(10_000.0) is None
+    assert not det.ready
+
+
+def test_liquidation_snapshot_keeps_warmup():
+    det = LiquidationDetector(LIQ_CFG)
+    det.observe_liquidation(100.0, 1.0, "Buy", 0.0)
+    det.update(1000.0)
+    st = det.state()
+
+    restored = LiquidationDetector(LIQ_CFG)
+    restored.load_state(st)
+    assert restored.ready
+    # 旧快照无积累起点：从恢复点重新预热
+    legacy = LiquidationDetector(LIQ_CFG)
+    legacy.load_state({k: v for k, v in st.items() if k != "liq.start"})
+    assert not legacy.ready
+
+
+def test_open_interest_drop_does_not_wait_for_liquidation_baseline():
+    det = LiquidationDetector(LIQ_CFG)
+    t0 = 20_000.0
+    for k in range(61):
+        det.observe_open_interest(1_000_000.0, (t0 + 5 * k) * 1e3)
+    det.observe_open_interest(970_000.0, (t0 + 305) * 1e3)
+    alert = det.update(t0 + 305)
+    assert alert is not None
+    assert alert["detail"]["oi_change_pct"] == pytest.approx(-3.0)
+
+
+# ---------------- VPIN ----------------
+
+def _vpin_reference(qty: np.ndarray, is_buy: np.ndarray, V: float, n: int):
+    """按累计成交量在 k·V 处插值切桶：各完成桶 |买量-卖量|，及最近 n 桶的 VPIN"""
+    cum = np.r_[0.0, np.cumsum(qty)]
+    buy = np.r_[0.0, np.cumsum(np.where(is_buy, qty, 0.0))]
+    edges = np.arange(0.0, cum[-1] + 1e-9, V)
+    b = np.interp(edges, cum, buy)
+    db = np.diff(b)
+    imb = np.abs(db - (V - db))
+    tail = imb[-n:]
+    return imb, (tail.sum() / (len(tail) * V) if len(tail) else float("nan"))
+
+
+@pytest.mark.parametrize("qty_scale", [0.5, 3.0, 40.0], ids=["small", "mixed", "block"])
+def test_vpin_matches_volume_clock_reference(qty_scale):
+    rng = np.random.default_rng(int(qty_scale * 10))
+    V, n = 10.0, 20
+    # 0.5 的整数倍：桶边界精确落在成交量网格上
+    qty = np.maximum(0.5, np.round(rng.exponential(qty_scale, 3000) * 2) / 2)
+    is_buy = rng.random(len(qty)) < 0.6
+    det = VpinDetector(VpinCfg(bucket_volume=V, n_buckets=n, thresh=0.0))
+    for i, (q, b) in enumerate(zip(qty, is_buy)):
+        det.observe_trade(q, "Buy" if b else "Sell")
+        if i % 97 == 0 or i == len(qty) - 1:
+            imb, ref = _vpin_reference(qty[:i + 1], is_buy[:i + 1], V, n)
+            assert det.buckets == len(imb)
+            assert det.ready == (len(imb) >= n)
+            np.testing.assert_allclose(det.state()["imbalance"], imb[-n:], atol=1e-9)
+            if len(imb):
+                assert det.vpin == pytest.approx(ref, rel=1e-12)
+            else:
+                assert math.isnan(det.vpin)
+    assert det.trades == len(qty)
+
+
+def test_vpin_block_trade_spans_buckets():
+    det = VpinDetector(VpinCfg(bucket_volume=10.0, n_buckets=3, thresh=0.5))
+    det.observe_trade(4.0, "Sell")
+    det.observe_trade(35.0, "Buy")
+    # 第一桶 6 买 4 卖，其后两个整桶全买，余 9 买留在当前桶
+    np.testing.assert_array_equal(det.state()["imbalance"], [2.0, 10.0, 10.0])
+    np.testing.assert_array_equal(det.state()["current"], [9.0, 0.0])
+    assert det.vpin == pytest.approx(22.0 / 30.0)
+    alert = det.update(ts=100.0)
+    assert alert is not None and alert["detail"]["buckets_done"] == 3
+    assert alert["score"] == pytest.approx(60 + 50 * (22.0 / 30.0 - 0.5))
+
+    restored = VpinDetector(det.cfg)
+    restored.load_state(det.state())
+    restored.observe_trade(1.0, "Sell")
+    det.observe_trade(1.0, "Sell")
+    assert restored.vpin == det.vpin
+    np.testing.assert_array_equal(restored.state()["imbalance"], det.state()["imbalance"])
+
+
+def test_vpin_batch_callback_matches_single_trades():
+    rng = np.random.default_rng(5)
+    rows = [{"v": str(round(float(v), 3)), "S": "Buy" if b else "Sell"}
+            for v, b in zip(rng.exponential(4.0, 500), rng.random(500) < 0.5)]
+    one = VpinDetector(VpinCfg(bucket_volume=25.0, n_buckets=10))
+    batch = VpinDetector(VpinCfg(bucket_volume=25.0, n_buckets=10))
+    for r in rows:
+        one.observe_trade(float(r["v"]), r["S"])
+    for k in range(0, len(rows), 50):
+        batch.on_bybit_trades({"topic": "publicTrade.BTCUSDT", "data": rows[k:k + 50]})
+    assert batch.trades == one.trades == 500
+    assert batch.buckets == one.buckets
+    assert batch.vpin == one.vpin
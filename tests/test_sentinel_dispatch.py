@@ -0,0 +1,166 @@
+"""
+告警 webhook 分发器测试
+Webhook dispatcher tests
+
+以本地 http.server 作为 webhook 接收端：
+- 同一间隔内的告警合并为一个 payload
+- 5xx 响应按退避重试
+- 队列满时合并进溢出表，不阻塞提交
+- 多次失败后丢弃并计数
+- 关闭时发送剩余告警
+"""
+
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.sentinel.dispatch import WebhookDispatcher
+
+
+class _StandIn:
+    """本地 webhook 接收端：记录收到的 payload，前 fail_first 次返回 500"""
+
+    def __init__(self, fail_first: int = 0):
+        self.payloads = []
+        self.hits = 0
+        self.fail_first = fail_first
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers["Content-Length"]))
+                stand_in.hits += 1
+                if stand_in.hits <= stand_in.fail_first:
+                    self.send_response(500)
+                else:
+                    stand_in.payloads.append(json.loads(body))
+                    self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/hook"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stand_in():
+    servers = []
+
+    def make(fail_first: int = 0) -> _StandIn:
+        s = _StandIn(fail_first)
+        servers.append(s)
+        return s
+
+    yield make
+    for s in servers:
+        s.close()
+
+
+def _alert(name: str, score: float, severity: str = "warn") -> dict:
+    return {"name": name, "severity": severity, "score": score, "ts": 1, "detail": {}}
+
+
+def _wait(cond, timeout: float = 5.0) -> bool:
+    deadline = time.time() + timeout
+    while not cond():
+        if time.time() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+
+def test_alerts_within_interval_are_coalesced(stand_in):
+    srv = stand_in()
+    d = WebhookDispatcher(srv.url, interval_sec=0.3)
+    try:
+        for i in range(20):
+            d.submit([_alert("vol_spike", 50 + i), _alert("spread_blowout", 40)], 60.0 + i, "tighten")
+        assert _wait(lambda: srv.payloads)
+        time.sleep(0.1)
+        assert len(srv.payloads) == 1
+        payload = srv.payloads[0]
+        assert payload["events"] == 20
+        assert payload["level"] == "tighten"
+        assert payload["score"] == 79.0
+        by_name = {a["name"]: a for a in payload["alerts"]}
+        assert by_name["vol_spike"]["count"] == 20
+        assert by_name["vol_spike"]["score"] == 69.0
+        assert by_name["spread_blowout"]["count"] == 20
+    finally:
+        d.close()
+
+
+def test_5xx_is_retried_with_backoff(stand_in):
+    srv = stand_in(fail_first=2)
+    d = WebhookDispatcher(srv.url, interval_sec=60, backoff_sec=0.05)
+    try:
+        d.submit([_alert("funding_shock", 70)], 70.0, "tighten")
+        t0 = time.time()
+        assert d.flush()
+        # 两次退避：0.05 + 0.1
+        assert time.time() - t0 >= 0.15
+        assert srv.hits == 3
+        assert len(srv.payloads) == 1
+        stats = d.stats
+        assert stats["retries"] == 2 and stats["sent"] == 1 and stats["failed"] == 0
+    finally:
+        d.close()
+
+
+def test_full_queue_merges_without_blocking(stand_in):
+    srv = stand_in()
+    d = WebhookDispatcher(srv.url, interval_sec=60, max_queue=2)
+    try:
+        t0 = time.time()
+        for i in range(10):
+            d.submit([_alert("ob_imbalance", 30 + i)], 30.0 + i, "normal")
+        assert time.time() - t0 < 0.1
+        stats = d.stats
+        assert stats["submitted"] == 10 and stats["merged"] == 8
+        assert d.flush()
+        payload = srv.payloads[0]
+        assert payload["events"] == 10
+        assert payload["alerts"][0]["count"] == 10
+        assert payload["alerts"][0]["score"] == 39.0
+    finally:
+        d.close()
+
+
+def test_payload_dropped_after_final_retry_is_logged_and_counted(stand_in, caplog):
+    srv = stand_in(fail_first=100)
+    d = WebhookDispatcher(srv.url, interval_sec=60, max_retries=1, backoff_sec=0.01)
+    try:
+        d.submit([_alert("vpin", 80), _alert("vol_spike", 60)], 90.0, "pause")
+        d.submit([_alert("vpin", 85)], 95.0, "pause")
+        with caplog.at_level(logging.ERROR, logger="src.sentinel.dispatch"):
+            assert not d.flush()
+        assert srv.hits == 2
+        stats = d.stats
+        assert stats["failed"] == 1 and stats["dropped"] == 3 and stats["sent"] == 0
+        assert any(r.levelno == logging.ERROR and "dropped" in r.getMessage() for r in caplog.records)
+    finally:
+        d.close()
+
+
+def test_close_flushes_pending_alerts(stand_in):
+    srv = stand_in()
+    d = WebhookDispatcher(srv.url, interval_sec=60)
+    d.submit([_alert("liquidation", 90, "critical")], 90.0, "pause")
+    assert not srv.payloads
+    d.close()
+    assert len(srv.payloads) == 1
+    assert srv.payloads[0]["level"] == "pause"
+    assert d.pending() == 0
@@ -0,0 +1,190 @@
+"""
+哨兵引擎测试
+Sentinel engine tests
+
+- update_batch 与逐行 _tick 的结果、告警表和后续状态一致
+- 检测器 update_batch 遇到事件时间窗口时报 ValueError
+- 快照 -> 恢复 -> 补齐：检测器窗口追上，衰减分数/等级/运行指标不被历史行污染
+- 调度：跳过的检测器只沿用分数不重复告警；默认不改变资金费窗口统计
+"""
+
+import logging
+
+import numpy as np
+import pytest
+
+from src.sentinel import SentinelEngine
+from src.sentinel.detectors import VolSpikeCfg, VolSpikeDetector
+
+CFG = {
+    "cooldown_sec": 30,
+    "score_thresholds": {"tighten": 50, "pause": 80},
+    "weights": {"spread_blowout": 1.2, "funding_shock": 0.8},
+    "detectors": {
+        "vol_spike": {"win": 120, "z": 3.0, "vol_z": 1.0},
+        "spread_blowout": {"win": 60, "z": 3.0},
+        "funding_shock": {"win": 24, "delta_bps": 1.0},
+    },
+}
+
+# 衰减分数 + 调度：update_batch 退化为逐行回放
+DECAY_CFG = dict(CFG, decay={"enabled": True, "half_life_sec": 60, "dedup_sec": 5},
+                 schedule={"enabled": True})
+
+
+@pytest.fixture(autouse=True)
+def _quiet():
+    logging.disable(logging.CRITICAL)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+def _columns(n: int = 6000, seed: int = 0) -> dict:
+    rng = np.random.default_rng(seed)
+    px_a = 100 * np.exp(np.cumsum(rng.standard_t(3, n) * 1e-3))
+    return {
+        "px_a": px_a,
+        "px_b": px_a * (1 + rng.standard_t(3, n) * 1e-4),
+        "vol_a": rng.lognormal(0, 1, n),
+        "next_rate_a": np.round(np.repeat(rng.normal(1e-4, 2e-4, n // 100 + 1), 100)[:n], 6),
+        "ts": 1.7e9 + np.arange(n, dtype=float),
+    }
+
+
+def _tick_loop(engine: SentinelEngine, cols: dict, start: int = 0, stop: int = None):
+    out = []
+    for i in range(start, len(cols["ts"]) if stop is None else stop):
+        out.append(engine._tick(float(cols["px_a"][i]), float(cols["px_b"][i]), float(cols["vol_a"][i]),
+                                float(cols["next_rate_a"][i]), ts=float(cols["ts"][i]), emit=False))
+    return out
+
+
+def _batch(engine: SentinelEngine, cols: dict, start: int, stop: int):
+    return engine.update_batch(*(cols[k][start:stop] for k in ("px_a", "px_b", "vol_a", "next_rate_a", "ts")))
+
+
+def test_update_batch_matches_tick_loop():
+    cols = _columns()
+    n, k = len(cols["ts"]), 2345
+    loop, batch = SentinelEngine(CFG), SentinelEngine(CFG)
+    ref = _tick_loop(loop, cols)
+    # 分两段批量回放，检验批间状态衔接
+    r1, r2 = _batch(batch, cols, 0, k), _batch(batch, cols, k, n)
+
+    score = np.concatenate([r1["score"], r2["score"]])
+    level = np.concatenate([r1["level"], r2["level"]])
+    np.testing.assert_allclose(score, [r["score"] for r in ref], rtol=0, atol=1e-9)
+    assert list(level) == [r["level"] for r in ref]
+    assert {"tighten", "pause"} & set(level), "data should exercise the cooldown path"
+
+    ref_alerts = [(i, a["name"], a["severity"], round(a["score"], 9)) for i, r in enumerate(ref) for a in r["alerts"]]
+    batch_alerts = [(int(a["idx"]) + off, str(a["name"]), str(a["severity"]), round(float(a["score"]), 9))
+                    for off, res in ((0, r1), (k, r2)) for a in res["alerts"]]
+    assert ref_alerts and ref_alerts == batch_alerts
+
+    # 批量之后继续逐行，两者状态一致
+    assert loop._last_fire_ts == batch._last_fire_ts
+    more = _columns(300, seed=1)
+    more["ts"] = cols["ts"][-1] + 1 + np.arange(300, dtype=float)
+    for x, y in zip(_tick_loop(loop, more), _tick_loop(batch, more)):
+        assert x["score"] == pytest.approx(y["score"], abs=1e-9)
+        assert x["level"] == y["level"]
+
+
+def test_update_batch_with_time_window_replays_rows():
+    cfg = dict(CFG, detectors=dict(CFG["detectors"], vol_spike={"win": 120, "z": 3.0, "vol_z": 1.0, "win_sec": 120}))
+    cols = _columns(1500)
+    ref = _tick_loop(SentinelEngine(cfg), cols)
+    res = _batch(SentinelEngine(cfg), cols, 0, len(cols["ts"]))
+    np.testing.assert_allclose(res["score"], [r["score"] for r in ref])
+    assert list(res["level"]) == [r["level"] for r in ref]
+
+
+def test_detector_batch_rejects_time_window():
+    det = VolSpikeDetector(VolSpikeCfg(win_sec=60))
+    with pytest.raises(ValueError):
+        det.update_batch(np.ones(10), np.ones(10))
+
+
+def _assert_same_state(a: SentinelEngine, b: SentinelEngine) -> None:
+    for name, det in a._detectors().items():
+        st_a, st_b = det.state(), b._detectors_map[name].state()
+        assert st_a.keys() == st_b.keys(), name
+        for k in st_a:
+            np.testing.assert_array_equal(st_a[k], st_b[k], err_msg=f"{name}.{k}")
+
+
+@pytest.mark.parametrize("cfg", [CFG, DECAY_CFG], ids=["cooldown", "decay"])
+def test_snapshot_restore_roundtrip(tmp_path, cfg):
+    cols = _columns(3000)
+    k = 2000
+    live = SentinelEngine(cfg)
+    _tick_loop(live, cols, 0, k)
+    path = str(tmp_path / "sentinel.npz")
+    live.snapshot(path)
+
+    warm = SentinelEngine(cfg)
+    assert warm.restore(path)
+    _assert_same_state(live, warm)
+    assert warm._last_level == live._last_level
+    for x, y in zip(_tick_loop(live, cols, k), _tick_loop(warm, cols, k)):
+        assert x["score"] == pytest.approx(y["score"], abs=1e-9)
+        assert x["level"] == y["level"]
+
+
+def test_restore_with_backfill_does_not_replay_alerts_into_live_state(tmp_path):
+    cols = _columns(3000)
+    k = 2000
+    live = SentinelEngine(DECAY_CFG)
+    _tick_loop(live, cols, 0, k)
+    path = str(tmp_path / "sentinel.npz")
+    live.snapshot(path)
+    decay_before = live._decay.state()
+
+    warm = SentinelEngine(DECAY_CFG)
+    assert warm.restore(path, backfill=cols)
+    assert warm._last_event_ts == cols["ts"][-1]
+
+    # 检测器窗口与全量逐行运行一致
+    full = SentinelEngine(DECAY_CFG)
+    _tick_loop(full, cols)
+    _assert_same_state(full, warm)
+    assert full._decay.total(cols["ts"][-1]) != pytest.approx(warm._decay.total(cols["ts"][-1]))
+
+    # 衰减分数、等级、冷却与运行指标保持快照时的值
+    for key, v in warm._decay.state().items():
+        np.testing.assert_array_equal(v, decay_before[key])
+    assert warm._last_level == live._last_level
+    assert warm._last_fire_ts == live._last_fire_ts
+    assert warm._tick_stats.calls == 0
+    assert all(st.calls == 0 for st in warm._stats.values())
+    assert all(slot.skipped == 0 for slot in warm._schedule.values())
+
+    # 只回放晚于快照的行：再次补齐不做任何事
+    assert warm.prefill(cols["px_a"], cols["px_b"], cols["vol_a"], cols["next_rate_a"], cols["ts"]) == 0
+
+
+def test_schedule_default_keeps_per_tick_results():
+    cols = _columns(3000)
+    plain = _tick_loop(SentinelEngine(CFG), cols)
+    sched = _tick_loop(SentinelEngine(dict(CFG, schedule={"enabled": True})), cols)
+    assert [r["score"] for r in plain] == [r["score"] for r in sched]
+    assert [[a["name"] for a in r["alerts"]] for r in plain] == [[a["name"] for a in r["alerts"]] for r in sched]
+
+
+def test_skipped_detector_holds_score_without_reemitting_alert():
+    cfg = dict(CFG, schedule={"enabled": True},
+               detectors=dict(CFG["detectors"], funding_shock={"win": 24, "delta_bps": 1.0, "sample_on_change": True}))
+    engine = SentinelEngine(cfg)
+    t0 = 1.7e9
+    rates = [1e-4 + i * 1e-9 for i in range(30)] + [5e-4] * 30
+    out = [engine._tick(100.0, 100.0, 1.0, r, ts=t0 + i, emit=False) for i, r in enumerate(rates)]
+
+    funding = [i for i, r in enumerate(out) if any(a["name"] == "funding_shock" for a in r["alerts"])]
+    assert funding == [30]
+    fired = out[30]["score"]
+    assert fired > 0
+    # 之后 29 个 tick 费率未变、未满 60 秒：跳过评估，分数沿用但不再告警
+    assert all(r["score"] == fired and not r["alerts"] for r in out[31:])
+    assert engine._schedule["funding_shock"].skipped == 29
+    assert engine._stats["funding_shock"].alerts == 1
@@ -0,0 +1,99 @@
+"""
+检测器运行指标测试
+Detector instrumentation tests
+
+- 对数分桶：桶边界连续、单调，相对宽度不超过 1/SUB，超长耗时落入最后一个桶
+- DetectorStats 分位数与对排序样本取所在桶上界的暴力计算一致；计数/快照口径一致
+- DecayingHistogram 按 0.5^(Δt/half_life) 连续衰减，分位数随时间平滑移动
+"""
+
+import math
+
+import numpy as np
+import pytest
+
+from src.sentinel.instrument import (
+    N_BUCKETS, SUB, DecayingHistogram, DetectorStats, bucket_index, bucket_upper_ns,
+)
+
+
+def _bucket_lower_ns(idx: int) -> int:
+    return bucket_upper_ns(idx - 1) if idx else 0
+
+
+def test_bucket_edges_are_contiguous():
+    for idx in range(1, N_BUCKETS):
+        lo, hi = _bucket_lower_ns(idx), bucket_upper_ns(idx)
+        assert hi > lo
+        # 每个 2 倍区间分 SUB 档：桶宽不超过下界的 1/SUB
+        if idx >= SUB:
+            assert hi - lo <= lo / SUB
+        assert bucket_index(lo) == idx
+        assert bucket_index(hi - 1) == idx
+
+
+def test_bucket_index_brute_force():
+    rng = np.random.default_rng(0)
+    samples = list(range(0, 5000)) + [int(x) for x in rng.integers(0, 2**36, 5000)]
+    for dt in samples:
+        k = bucket_index(dt)
+        assert _bucket_lower_ns(k) <= dt < bucket_upper_ns(k)
+    assert bucket_index(2**40) == N_BUCKETS - 1
+    assert bucket_index(2**36 - 1) < N_BUCKETS
+
+
+def test_detector_stats_percentiles_match_sorted_samples():
+    rng = np.random.default_rng(11)
+    samples = rng.lognormal(9.0, 1.2, 20_000).astype(np.int64)
+    fired = rng.random(len(samples)) < 0.07
+    st = DetectorStats("vol_spike")
+    for dt, f in zip(samples.tolist(), fired.tolist()):
+        st.record(dt, f)
+
+    srt = np.sort(samples)
+    for q in (0.01, 0.25, 0.5, 0.9, 0.99, 0.999, 1.0):
+        # 第 ceil(q·n) 个样本所在桶的上界，不超过最大值
+        s = int(srt[math.ceil(q * len(srt)) - 1])
+        assert st.percentile_ns(q) == min(bucket_upper_ns(bucket_index(s)), int(srt[-1]))
+
+    assert st.calls == len(samples)
+    assert st.alerts == int(fired.sum())
+    assert st.total_ns == int(samples.sum())
+    assert st.max_ns == int(samples.max())
+    assert st.mean_ns == pytest.approx(samples.mean())
+
+    snap = st.snapshot()
+    assert sum(snap["histogram_ns"].values()) == len(samples)
+    for upper, c in snap["histogram_ns"].items():
+        k = bucket_index(upper - 1)
+        assert c == int(np.count_nonzero((samples >= _bucket_lower_ns(k)) & (samples < upper)))
+    assert snap["hit_rate"] == pytest.approx(fired.mean())
+    assert snap["p99_ns"] == st.percentile_ns(0.99)
+    assert st.summary()["p99_us"] == round(st.percentile_ns(0.99) / 1e3, 3)
+
+    st.reset()
+    assert st.calls == 0 and st.percentile_ns(0.5) == 0 and not any(st.buckets)
+
+
+def test_decaying_histogram_decays_continuously():
+    hist = DecayingHistogram(half_life=1800)
+    for _ in range(100):
+        hist.add(1_000, now=0.0)
+    hist.add(1_000, now=900.0)
+    assert hist.total == pytest.approx(100 * 0.5 ** 0.5 + 1)
+
+    # 不到一个半衰期，旧基线已按时间衰减：新样本数尚不及旧样本时中位数即已移动
+    low = hist.percentile(0.5)
+    t = 900
+    while hist.percentile(0.5) == low:
+        t += 1
+        hist.add(100_000, now=float(t))
+    assert t - 900 < 100
+
+
+def test_decaying_histogram_ignores_clock_going_back():
+    hist = DecayingHistogram(half_life=60)
+    hist.add(5, now=100.0)
+    hist.add(5, now=90.0)
+    assert hist.total == 2.0
+    assert hist._last_decay == 100.0
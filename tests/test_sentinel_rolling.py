@@ -0,0 +1,220 @@
+"""
+滑动窗口内核测试
+Rolling-window kernel tests
+
+- RollingStats 与逐窗口 numpy 均值/方差一致；大偏移数据上定期重锚使误差不随长度累积
+- RollingQuantile 有序环与逐窗口 np.median / np.quantile 一致（含大量重复值）
+- TimeWindowStats / TimeWindowQuantile 与按事件时间逐个筛选窗口样本的暴力计算一致
+- 窗口边界：ts <= now - win_sec 的样本被淘汰；相同时间戳同进同出
+- 乱序样本按时间插入，已在窗口外的丢弃
+- 空档后窗口清空，重新积累时从零开始
+"""
+
+import numpy as np
+import pytest
+
+from src.sentinel.rolling import RollingQuantile, RollingStats, TimeWindowQuantile, TimeWindowStats
+
+
+# ---------------- 定长窗口 ----------------
+
+def test_rolling_stats_matches_numpy_windows():
+    rng = np.random.default_rng(1)
+    xs = rng.standard_t(3, 3000) * 10 + 5
+    size = 50
+    rs = RollingStats(size, reanchor_every=37)
+    for i, x in enumerate(xs):
+        rs.push(x)
+        ref = xs[max(0, i + 1 - size):i + 1]
+        assert rs.count == len(ref)
+        assert rs.full == (len(ref) == size)
+        assert rs.last == x
+        assert rs.mean == pytest.approx(ref.mean(), rel=1e-9, abs=1e-9)
+        assert rs.var == pytest.approx(ref.var(), rel=1e-9)
+        assert rs.zscore() == pytest.approx((x - ref.mean()) / (ref.std() + 1e-12), rel=1e-6, abs=1e-9)
+    np.testing.assert_array_equal(rs.values(), xs[-size:])
+
+
+def test_rolling_stats_reanchor_bounds_drift():
+    rng = np.random.default_rng(2)
+    # 大偏移 + 小方差：滑动增删的舍入误差最容易累积
+    xs = 1e8 + rng.normal(0.0, 1e-2, 200_000)
+    size = 100
+    anchored = RollingStats(size, reanchor_every=1000)
+    drifting = RollingStats(size, reanchor_every=10**9)
+    for x in xs:
+        anchored.push(x)
+        drifting.push(x)
+    ref = xs[-size:]
+    var_ref = np.var(ref - 1e8)
+    assert anchored.mean == pytest.approx(ref.mean(), rel=1e-15)
+    assert anchored.var == pytest.approx(var_ref, rel=1e-4)
+    assert abs(anchored.var - var_ref) < abs(drifting.var - var_ref)
+    # 每 reanchor_every 次满窗更新重锚一次
+    assert anchored._since_anchor == (len(xs) - size) % 1000
+
+
+def test_rolling_stats_state_roundtrip_shrinks_window():
+    rs = RollingStats(20)
+    rs.extend(np.arange(30.0))
+    small = RollingStats(5)
+    small.load_state(rs.state())
+    np.testing.assert_array_equal(small.values(), np.arange(25.0, 30.0))
+    assert small.mean == 27.0 and small.var == 2.0
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 64])
+def test_rolling_quantile_matches_numpy_windows(size):
+    rng = np.random.default_rng(size)
+    # 取整制造大量重复值，检验有序表按值删除的正确性
+    xs = np.round(rng.normal(0.0, 3.0, 1500))
+    rq = RollingQuantile(size)
+    for i, x in enumerate(xs):
+        rq.push(x)
+        ref = xs[max(0, i + 1 - size):i + 1]
+        assert rq._sorted == sorted(ref)
+        assert rq.median() == np.median(ref)
+        for q in (0.0, 0.05, 0.25, 0.5, 0.9, 1.0):
+            assert rq.quantile(q) == pytest.approx(np.quantile(ref, q), rel=1e-12, abs=1e-12)
+        assert rq.rank(x) == np.mean(ref <= x)
+        assert rq.last == x
+    np.testing.assert_array_equal(rq.values(), xs[-size:])
+
+
+def test_rolling_quantile_empty_and_invalid_q():
+    rq = RollingQuantile(3)
+    with pytest.raises(IndexError):
+        rq.median()
+    rq.push(1.0)
+    with pytest.raises(ValueError):
+        rq.quantile(1.5)
+    rq.extend([5.0, 3.0, 4.0])
+    restored = RollingQuantile(2)
+    restored.load_state(rq.state())
+    np.testing.assert_array_equal(restored.values(), [3.0, 4.0])
+    assert restored.median() == 3.5
+
+
+def _window(events, now, win):
+    """按定义筛选：事件时间落在 (now - win, now] 内的样本"""
+    return np.array([x for t, x in events if now - win < t <= now])
+
+
+def _check(stats, quant, events, now, win):
+    ref = _window(events, now, win)
+    assert stats.count == quant.count == len(ref)
+    if not len(ref):
+        assert stats.mean == 0.0 and stats.var == 0.0
+        with pytest.raises(IndexError):
+            quant.median()
+        return
+    assert stats.mean == pytest.approx(ref.mean(), rel=1e-9, abs=1e-12)
+    assert stats.var == pytest.approx(ref.var(), rel=1e-7, abs=1e-12)
+    assert quant.median() == np.median(ref)
+    for q in (0.0, 0.1, 0.5, 0.9, 1.0):
+        assert quant.quantile(q) == pytest.approx(np.quantile(ref, q), rel=1e-12)
+    assert quant.rank(float(ref[0])) == pytest.approx(np.mean(ref <= ref[0]))
+
+
+def test_time_windows_match_brute_force():
+    rng = np.random.default_rng(3)
+    win = 30.0
+    stats, quant = TimeWindowStats(win, reanchor_every=64), TimeWindowQuantile(win)
+    # 不均匀间隔，含大量相同时间戳与超过窗口的空档
+    gaps = rng.choice([0.0, 0.5, 1.0, 3.0, 45.0], size=2000, p=[0.2, 0.3, 0.3, 0.19, 0.01])
+    ts = 1000.0 + np.cumsum(gaps)
+    xs = rng.normal(50.0, 5.0, len(ts))
+    events = []
+    for t, x in zip(ts, xs):
+        stats.push(x, t)
+        quant.push(x, t)
+        events.append((t, x))
+        _check(stats, quant, events, t, win)
+        np.testing.assert_array_equal(stats.values(), _window(events, t, win))
+        np.testing.assert_array_equal(quant.times(), [e for e, _ in events if t - win < e <= t])
+
+
+def test_eviction_boundary_and_equal_timestamps():
+    stats, quant = TimeWindowStats(10.0), TimeWindowQuantile(10.0)
+    for w in (stats, quant):
+        w.push(1.0, 100.0)
+        w.push(2.0, 100.0)
+        w.push(3.0, 105.0)
+        # 恰好 win_sec 之前的样本（含同一时间戳的全部样本）被淘汰
+        w.push(4.0, 110.0)
+        np.testing.assert_array_equal(w.values(), [3.0, 4.0])
+        w.evict(114.9)
+        assert w.count == 2
+        w.evict(115.0)
+        np.testing.assert_array_equal(w.values(), [4.0])
+    assert stats.mean == 4.0 and stats.var == 0.0
+    assert quant.median() == 4.0
+
+
+def test_out_of_order_samples():
+    win = 10.0
+    stats, quant = TimeWindowStats(win), TimeWindowQuantile(win)
+    pushes = [(1.0, 100.0), (2.0, 104.0), (3.0, 103.0), (4.0, 104.0), (5.0, 90.0), (6.0, 108.0), (7.0, 112.0)]
+    events = []
+    for x, t in pushes:
+        stats.push(x, t)
+        quant.push(x, t)
+        if t > max(e for e, _ in events or [(t, 0)]) - win:
+            events.append((t, x))
+        now = max(e for e, _ in events)
+        _check(stats, quant, events, now, win)
+    # 乱序样本按时间排入队列（同时间戳排在已有样本之后），过期的 5.0 被丢弃
+    np.testing.assert_array_equal(quant.times(), [103.0, 104.0, 104.0, 108.0, 112.0])
+    np.testing.assert_array_equal(stats.values(), [3.0, 2.0, 4.0, 6.0, 7.0])
+    assert stats.last == quant.last == 7.0
+    # 插在中间的样本按自己的时间戳淘汰
+    stats.evict(113.0)
+    quant.evict(113.0)
+    np.testing.assert_array_equal(quant.values(), [2.0, 4.0, 6.0, 7.0])
+    assert stats.mean == pytest.approx(4.75)
+
+
+def test_late_first_sample_extends_warmup_span():
+    stats = TimeWindowStats(10.0)
+    stats.push(1.0, 105.0)
+    stats.push(2.0, 100.0)
+    stats.push(3.0, 110.0)
+    assert stats.full
+
+
+def test_empty_window_after_gap():
+    stats, quant = TimeWindowStats(5.0), TimeWindowQuantile(5.0)
+    for w in (stats, quant):
+        for t in range(10):
+            w.push(float(t * t), 100.0 + t)
+        w.evict(200.0)
+        assert w.count == 0 and len(w) == 0
+        with pytest.raises(IndexError):
+            w.last
+    assert stats.mean == 0.0 and stats.var == 0.0 and stats.std == 0.0
+    with pytest.raises(IndexError):
+        quant.quantile(0.5)
+    with pytest.raises(IndexError):
+        quant.rank(1.0)
+
+    # 空档后重新积累不受旧样本影响；首样本时间保留，full 只看观测时长
+    events = [(201.0, 7.0), (202.0, 9.0), (202.5, 2.0)]
+    for t, x in events:
+        stats.push(x, t)
+        quant.push(x, t)
+    _check(stats, quant, events, 202.5, 5.0)
+    assert stats.full and quant.full
+
+
+def test_state_roundtrip_keeps_window_and_warmup():
+    stats, quant = TimeWindowStats(20.0), TimeWindowQuantile(20.0)
+    for t in range(50):
+        stats.push(np.sin(t), 1000.0 + t)
+        quant.push(np.sin(t), 1000.0 + t)
+    s2, q2 = TimeWindowStats(20.0), TimeWindowQuantile(20.0)
+    s2.load_state(stats.state())
+    q2.load_state(quant.state())
+    assert s2.full and q2.full
+    assert s2.mean == pytest.approx(stats.mean) and s2.var == pytest.approx(stats.var)
+    assert q2.median() == quant.median()
+    np.testing.assert_array_equal(q2.times(), quant.times())
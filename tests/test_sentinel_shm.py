@@ -0,0 +1,94 @@
+"""
+共享内存 tick 环形缓冲测试
+Shared-memory tick ring tests
+
+- 生产者写入中途被读取时，半写记录不得交给消费者
+- 生产者套圈消费者时，收到 + 丢弃 = 已发布，且每条记录字段一致
+"""
+
+from multiprocessing import get_context
+
+import numpy as np
+
+from src.sentinel.shm import TickRing
+
+
+def _consistent(rows: np.ndarray) -> bool:
+    # 测试写入的每条记录所有字段都等于其序号
+    return all(np.array_equal(rows["ts"], rows[f]) for f in ("px_a", "px_b", "vol_a", "next_rate_a"))
+
+
+def _publish_seq(ring: TickRing, seq: int) -> None:
+    ring.publish(seq, seq, seq, seq, ts=seq)
+
+
+class _MidWriteRing(TickRing):
+    """拷贝前让生产者写了一半下一条记录（尚未发布 head）"""
+
+    def _gather(self, start, stop):
+        seq = self.head
+        i = seq % self.capacity
+        self._rec["ts"][i] = seq
+        self._rec["px_a"][i] = seq
+        return super()._gather(start, stop)
+
+
+def test_read_drops_slot_being_written():
+    ring = _MidWriteRing(capacity=8)
+    try:
+        for seq in range(8):
+            _publish_seq(ring, seq)
+        rows = ring.read()
+        # 序号 0 的槽位正被序号 8 覆盖，必须丢弃
+        assert ring.dropped == 1
+        assert list(rows["ts"]) == list(range(1, 8))
+        assert _consistent(rows)
+    finally:
+        ring.close()
+
+
+def test_read_after_lap_counts_dropped():
+    ring = TickRing(capacity=8)
+    try:
+        for seq in range(20):
+            _publish_seq(ring, seq)
+        rows = ring.read()
+        assert _consistent(rows)
+        assert len(rows) + ring.dropped == 20
+        assert list(rows["ts"]) == list(range(20 - len(rows), 20))
+        assert len(ring.read()) == 0
+    finally:
+        ring.close()
+
+
+def _producer(name: str, capacity: int, n: int) -> None:
+    ring = TickRing(capacity, name=name)
+    try:
+        for seq in range(n):
+            _publish_seq(ring, seq)
+    finally:
+        ring.close()
+
+
+def test_producer_lapping_consumer_never_yields_torn_rows():
+    n, capacity = 200_000, 16
+    ring = TickRing(capacity=capacity)
+    try:
+        proc = get_context("spawn").Process(target=_producer, args=(ring.name, capacity, n))
+        proc.start()
+        received, last = 0, -1
+        while proc.is_alive() or ring.head > ring._read:
+            rows = ring.read()
+            if not len(rows):
+                continue
+            assert _consistent(rows)
+            ts = rows["ts"]
+            assert ts[0] > last and np.all(np.diff(ts) == 1)
+            last = ts[-1]
+            received += len(rows)
+        proc.join()
+        assert proc.exitcode == 0
+        assert received + ring.dropped == n
+        assert last == n - 1
+    finally:
+        ring.close()
@@ -0,0 +1,74 @@
+"""
+关键词自动机测试
+Keyword automaton tests
+
+- KeywordAutomaton 命中与逐位置逐关键词比较的暴力匹配一致（重叠、嵌套、共享前后缀）
+- 大小写折叠；ASCII 关键词要求词边界，中日韩关键词不要求
+"""
+
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from src.sentinel.textmatch import KeywordAutomaton, _is_word_char
+
+
+def _brute_force(keywords, text):
+    """逐位置比较折叠后的文本，按与自动机相同的词边界规则过滤"""
+    text = text.casefold()
+    hits, seen = [], set()
+    for kw in keywords:
+        f = kw.casefold()
+        if not f or f in seen:
+            continue
+        seen.add(f)
+        for start in range(len(text) - len(f) + 1):
+            end = start + len(f)
+            if text[start:end] != f:
+                continue
+            if _is_word_char(f[0]) and start > 0 and _is_word_char(text[start - 1]):
+                continue
+            if _is_word_char(f[-1]) and end < len(text) and _is_word_char(text[end]):
+                continue
+            hits.append((start, end, kw))
+    return hits
+
+
+def test_classic_overlapping_matches():
+    ac = KeywordAutomaton(["he", "she", "his", "hers"])
+    text = "ushers he his she-hers"
+    assert Counter(ac.find(text)) == Counter(_brute_force(ac.keywords, text))
+    # 词内的 she / he / hers 不满足词边界
+    assert sorted(ac.find(text)) == [(7, 9, "he"), (10, 13, "his"), (14, 17, "she"), (18, 22, "hers")]
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_random_texts_match_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    alphabet = list("abAB _-") + ["中", "文", "币"]
+    keywords = ["a", "ab", "bab", "abab", "BA", "b-a", "中文", "文", "文币", "a中", "ab"]
+    ac = KeywordAutomaton(keywords)
+    assert len(ac) == 10
+    for _ in range(300):
+        text = "".join(rng.choice(alphabet, int(rng.integers(0, 40))))
+        assert Counter(ac.find(text)) == Counter(_brute_force(keywords, text))
+        ref = Counter(kw for _, _, kw in _brute_force(keywords, text))
+        assert ac.matches(text) == dict(ref)
+
+
+def test_case_folding_and_word_boundaries():
+    ac = KeywordAutomaton(["War", "SEC", "黑客", "hack"])
+    assert ac.matches("Software update; WAR declared. sec filing") == {"War": 1, "SEC": 1}
+    assert ac.matches("交易所遭黑客攻击，hacker 与 hack_x 不算，hack! 算") == {"黑客": 1, "hack": 1}
+    # 折叠后长度变化的字符：位置基于折叠后的文本
+    ac = KeywordAutomaton(["strasse"])
+    assert ac.find("Hauptstraße") == [] and ac.find("STRASSE 1") == [(0, 7, "strasse")]
+    assert ac.find("Straße") == [(0, 7, "strasse")]
+
+
+def test_empty_and_duplicate_keywords():
+    ac = KeywordAutomaton(["", "Fed", "fed", "FED"])
+    assert ac.keywords == ["Fed"]
+    assert ac.matches("the fed and the FED") == {"Fed": 2}
+    assert KeywordAutomaton([]).find("anything") == []